@@ -0,0 +1,69 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from rest_framework.permissions import SAFE_METHODS
+
+from api.views import IngredientViewSet, RecipeViewSet
+from recipes.views import get_short_link, resolve_short_code
+
+
+def _run_read(view, request, *args, **kwargs):
+    """Выполняет sync-представление в рабочем потоке как отдельный запрос."""
+    # Для потоков исполнителя Django не шлёт request_started/finished,
+    # поэтому соединения этого потока обслуживаем сами.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, "render", None)):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def offload_reads(view):
+    """
+    Асинхронная обёртка над sync-представлением для ASGI.
+
+    Чтение (GET/HEAD/OPTIONS) уходит в общий пул потоков
+    (thread_sensitive=False), поэтому медленная БД занимает поток,
+    а не весь воркер, а медленные клиенты обслуживаются event loop'ом.
+    Запись идёт обычным для Django путём (thread_sensitive=True).
+    """
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await sync_to_async(_run_read, thread_sensitive=False)(
+                view, request, *args, **kwargs
+            )
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    return async_view
+
+
+recipe_list = offload_reads(
+    RecipeViewSet.as_view(
+        {"get": "list", "post": "create"}, basename="recipes"
+    )
+)
+recipe_detail = offload_reads(
+    RecipeViewSet.as_view(
+        {
+            "get": "retrieve",
+            "put": "update",
+            "patch": "partial_update",
+            "delete": "destroy",
+        },
+        basename="recipes",
+    )
+)
+ingredient_list = offload_reads(
+    IngredientViewSet.as_view({"get": "list"}, basename="ingredient")
+)
+ingredient_detail = offload_reads(
+    IngredientViewSet.as_view({"get": "retrieve"}, basename="ingredient")
+)
+short_link = offload_reads(get_short_link)
+short_code = offload_reads(resolve_short_code)
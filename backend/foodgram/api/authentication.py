@@ -0,0 +1,106 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+from api.caches import TTLCache
+from foodgram.shared_memory import SharedCounters
+
+_token_cache = TTLCache(
+    settings.TOKEN_CACHE["MAX_SIZE"], settings.TOKEN_CACHE["TTL"]
+)
+
+
+@lru_cache(maxsize=None)
+def token_generations():
+    """Поколения токенов, общие для всех воркеров узла."""
+    return SharedCounters("token-generations")
+
+
+@lru_cache(maxsize=None)
+def user_generations():
+    """Поколения пользователей (по id), общие для всех воркеров узла."""
+    return SharedCounters("user-generations")
+
+
+def revoke_cached_token(key):
+    """Сбрасывает закэшированный токен во всех воркерах узла."""
+    token_generations().incr(key)
+    _token_cache.pop(key)
+
+
+def revoke_cached_user(user_id):
+    """Делает устаревшими закэшированные копии пользователя на узле."""
+    user_generations().incr(user_id)
+
+
+def _snapshot(instance):
+    fields = instance._meta.concrete_fields
+    return tuple(getattr(instance, field.attname) for field in fields)
+
+
+def _restore(model, values):
+    field_names = [f.attname for f in model._meta.concrete_fields]
+    return model.from_db(DEFAULT_DB_ALIAS, field_names, values)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication с кэшем «токен → пользователь» в памяти процесса.
+
+    Кэш ограничен по размеру и времени жизни (TOKEN_CACHE). При выходе
+    (удалении токена) увеличивается поколение токена, а при любом
+    сохранении пользователя (смена пароля, профиля, деактивация) —
+    поколение пользователя; оба хранятся в общей памяти, и запись
+    перестаёт быть валидной во всех воркерах узла. В кэше хранятся
+    значения полей, а не сами объекты, поэтому каждый запрос получает
+    собственный экземпляр пользователя.
+    """
+
+    def authenticate_credentials(self, key):
+        # Поколение читаем до запроса к БД: отзыв токена, случившийся
+        # во время запроса, сделает новую запись кэша устаревшей.
+        generation = token_generations().get(key)
+        cached = _token_cache.get(key)
+        if cached is not None and cached[0] == generation:
+            _, user_id, user_generation, user_values, token_values = cached
+            if user_generations().get(user_id) == user_generation:
+                user = _restore(get_user_model(), user_values)
+                token = _restore(self.get_model(), token_values)
+                token.user = user
+                return user, token
+
+        user, token = super().authenticate_credentials(key)
+        # id пользователя до запроса неизвестен, поэтому его поколение
+        # читаем после; сохранение увеличивает его после фиксации
+        # транзакции, так что прочитанная до неё строка устареет.
+        user_generation = user_generations().get(user.pk)
+        entry = (generation, user.pk, user_generation, _snapshot(user))
+        _token_cache.set(key, entry + (_snapshot(token),))
+        return user, token
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация для режима AUTH_MODE=jwt.
+
+    На безопасных запросах пользователь строится из claims токена
+    (TokenUser) без обращения к БД. На запросах с изменениями
+    пользователь загружается из БД: он нужен как объект модели
+    (автор рецепта, владелец подписки и т.п.).
+    Отозвать такой токен до истечения ACCESS_TOKEN_LIFETIME нельзя.
+    """
+
+    def authenticate(self, request):
+        self.stateless = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self.stateless:
+            return TokenUser(validated_token)
+        return super().get_user(validated_token)
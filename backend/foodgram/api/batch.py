@@ -0,0 +1,97 @@
+"""
+Пакетные изменения избранного, корзины и подписок.
+
+Весь пакет применяется в одной транзакции фиксированным числом запросов
+независимо от числа id: добавление — один INSERT ... ON CONFLICT DO
+NOTHING RETURNING, удаление — один DELETE ... RETURNING (api.relations).
+Статусы added и removed получают только id из RETURNING, поэтому связь,
+которую параллельный запрос успел создать или удалить раньше, получит
+exists или absent, и журнал изменений и лента не обновятся дважды.
+Отдельные запросы делаются только на заполнение ленты новыми рецептами
+каждого автора, на которого подписались. Для каждого id возвращается
+статус:
+
+- added / removed — связь создана / удалена;
+- exists / absent — связь уже была / её и не было;
+- not_found — рецепта или пользователя с таким id нет;
+- self — подписка на самого себя.
+"""
+
+from django.db import transaction
+
+from api.feed import backfill_feed
+from api.memberships import invalidate
+from api.relations import (
+    add_recipe_relations,
+    add_subscriptions,
+    remove_recipe_relations,
+    remove_subscriptions,
+)
+from recipes.models import FeedEntry
+
+ADDED = "added"
+REMOVED = "removed"
+EXISTS = "exists"
+ABSENT = "absent"
+NOT_FOUND = "not_found"
+SELF = "self"
+
+
+def _results(ids, statuses):
+    return [{"id": pk, "status": statuses[pk]} for pk in ids]
+
+
+def _added(ids, found, added):
+    statuses = {}
+    for pk in ids:
+        if pk not in found:
+            statuses[pk] = NOT_FOUND
+        elif pk in added:
+            statuses[pk] = ADDED
+        else:
+            statuses[pk] = EXISTS
+    return statuses
+
+
+def _removed(ids, removed):
+    return {pk: REMOVED if pk in removed else ABSENT for pk in ids}
+
+
+def batch_recipe_relations(model, user, add=(), remove=()):
+    """Пакет для Favorite или ShoppingCart: {"add": [...], "remove": [...]}."""
+    with transaction.atomic():
+        found, added = (
+            add_recipe_relations(model, user.pk, add) if add else ((), ())
+        )
+        removed = (
+            remove_recipe_relations(model, user.pk, remove) if remove else ()
+        )
+    invalidate(user.pk)
+    return {
+        "add": _results(add, _added(add, found, added)),
+        "remove": _results(remove, _removed(remove, removed)),
+    }
+
+
+def batch_subscriptions(user, add=(), remove=()):
+    """Пакетная подписка и отписка от авторов с обновлением ленты."""
+    authors = [pk for pk in add if pk != user.pk]
+    with transaction.atomic():
+        found, subscriptions = (
+            add_subscriptions(user.pk, authors) if authors else ((), [])
+        )
+        unsubscribed = remove_subscriptions(user.pk, remove) if remove else ()
+        if unsubscribed:
+            FeedEntry.objects.filter(
+                user_id=user.pk, recipe__author_id__in=unsubscribed
+            ).delete()
+        for subscription in subscriptions:
+            backfill_feed(subscription)
+    invalidate(user.pk)
+    added = {subscription.author_id for subscription in subscriptions}
+    statuses = _added(authors, found, added)
+    statuses.update({pk: SELF for pk in add if pk == user.pk})
+    return {
+        "add": _results(add, statuses),
+        "remove": _results(remove, _removed(remove, unsubscribed)),
+    }
@@ -0,0 +1,191 @@
+"""
+Тестовый каталог и EXPLAIN для проверки планов запросов на PostgreSQL.
+
+Каталог наполняется одним INSERT ... SELECT generate_series на таблицу,
+поэтому миллион рецептов создаётся за минуты, а не часы. Популярность
+ингредиентов неравномерна (random()^2), как в реальных рецептах.
+Созданные записи помечены префиксом bench и удаляются clear_catalog().
+"""
+
+import re
+
+from django.db import connection
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    User,
+)
+
+PREFIX = "bench"
+SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def seed_catalog(recipes, authors):
+    """Создаёт authors пользователей и recipes рецептов с ингредиентами."""
+    if not Ingredient.objects.exists():
+        raise ValueError(
+            "Сначала загрузите ингредиенты: manage.py fill_test_data."
+        )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {_table(User)} (
+                password, is_superuser, username, first_name, last_name,
+                email, is_staff, is_active, date_joined
+            )
+            SELECT '!', false, %(prefix)s || '_' || i, 'Bench', 'User',
+                   %(prefix)s || '_' || i || '@example.com', false, true, now()
+            FROM generate_series(1, %(authors)s) AS i
+            ON CONFLICT DO NOTHING
+            """,
+            {"prefix": PREFIX, "authors": authors},
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {_table(Recipe)} (
+                author_id, name, text, cooking_time, image
+            )
+            SELECT authors.ids[1 + i %% array_length(authors.ids, 1)],
+                   %(prefix)s || ' ' || i, '', 1 + (random() * 180)::int,
+                   'recipes/images/bench.png'
+            FROM generate_series(1, %(recipes)s) AS i,
+                 (SELECT array_agg(id) AS ids FROM {_table(User)}
+                  WHERE username LIKE %(prefix)s || '\\_%%') AS authors
+            """,
+            {"prefix": PREFIX, "recipes": recipes},
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {_table(RecipeIngredient)} (
+                recipe_id, ingredient_id, amount
+            )
+            SELECT recipe.id,
+                   ingredients.ids[(
+                       1 + floor(
+                           random() ^ 2 * array_length(ingredients.ids, 1)
+                       )
+                   )::int],
+                   1 + (random() * 500)::int
+            FROM {_table(Recipe)} AS recipe,
+                 (SELECT array_agg(id ORDER BY id) AS ids
+                  FROM {_table(Ingredient)}) AS ingredients,
+                 generate_series(1, 3 + recipe.id %% 8)
+            WHERE recipe.name LIKE %(prefix)s || ' %%'
+              AND NOT EXISTS (
+                  SELECT 1 FROM {_table(RecipeIngredient)}
+                  WHERE recipe_id = recipe.id
+              )
+            ON CONFLICT DO NOTHING
+            """,
+            {"prefix": PREFIX},
+        )
+        _seed_relations(cursor, recipes, authors)
+        for model in (
+            User,
+            Recipe,
+            RecipeIngredient,
+            Favorite,
+            ShoppingCart,
+            Subscription,
+        ):
+            cursor.execute(f"ANALYZE {_table(model)}")
+
+
+def _seed_relations(cursor, recipes, authors):
+    """Избранное, корзины и подписки тестовых пользователей."""
+    bench_users = f"""
+        SELECT array_agg(id) AS ids FROM {_table(User)}
+        WHERE username LIKE %(prefix)s || '\\_%%'
+    """
+    bench_recipes = f"""
+        SELECT min(id) AS low, max(id) AS high FROM {_table(Recipe)}
+        WHERE name LIKE %(prefix)s || ' %%'
+    """
+    for model, rows in ((Favorite, recipes * 2), (ShoppingCart, recipes // 2)):
+        cursor.execute(
+            f"""
+            INSERT INTO {_table(model)} (user_id, recipe_id, created)
+            SELECT pick.user_id, recipe.id,
+                   now() - random() * interval '30 days'
+            FROM (
+                SELECT
+                    users.ids[
+                        1 + (random() * (array_length(users.ids, 1) - 1))::int
+                    ] AS user_id,
+                    bounds.low
+                    + (random() * (bounds.high - bounds.low))::int AS recipe_id
+                FROM ({bench_users}) AS users,
+                     ({bench_recipes}) AS bounds,
+                     generate_series(1, %(rows)s)
+            ) AS pick
+            JOIN {_table(Recipe)} AS recipe ON recipe.id = pick.recipe_id
+            ON CONFLICT DO NOTHING
+            """,
+            {"prefix": PREFIX, "rows": rows},
+        )
+    cursor.execute(
+        f"""
+        INSERT INTO {_table(Subscription)} (user_id, author_id, fan_out)
+        SELECT users.ids[1 + i %% array_length(users.ids, 1)],
+               users.ids[
+                   1 + (random() * (array_length(users.ids, 1) - 1))::int
+               ],
+               true
+        FROM ({bench_users}) AS users, generate_series(1, %(rows)s) AS i
+        ON CONFLICT DO NOTHING
+        """,
+        {"prefix": PREFIX, "rows": authors * 20},
+    )
+
+
+def clear_catalog():
+    """Удаляет тестовый каталог без выборки миллиона объектов в ORM."""
+    bench_recipes = (
+        f"SELECT id FROM {_table(Recipe)} WHERE name LIKE %(prefix)s || ' %%'"
+    )
+    bench_users = (
+        f"SELECT id FROM {_table(User)} "
+        "WHERE username LIKE %(prefix)s || '\\_%%'"
+    )
+    statements = [
+        f"DELETE FROM {_table(model)} WHERE recipe_id IN ({bench_recipes})"
+        for model in (RecipeIngredient, Favorite, ShoppingCart)
+    ]
+    statements += [
+        f"DELETE FROM {_table(Subscription)} WHERE user_id IN ({bench_users})",
+        f"DELETE FROM {_table(Recipe)} WHERE id IN ({bench_recipes})",
+        f"DELETE FROM {_table(User)} WHERE id IN ({bench_users})",
+    ]
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement, {"prefix": PREFIX})
+
+
+def table_rows():
+    """Оценка числа строк в таблицах по статистике планировщика."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, reltuples FROM pg_class "
+            "WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+        )
+        return dict(cursor.fetchall())
+
+
+def explain(queryset):
+    """Возвращает (план EXPLAIN ANALYZE, таблицы с Seq Scan)."""
+    plan = queryset.explain(analyze=True, buffers=True)
+    return plan, sorted(set(SEQ_SCAN.findall(plan)))
+
+
+def execution_ms(plan):
+    match = re.search(r"Execution Time: ([\d.]+) ms", plan)
+    return float(match.group(1)) if match else None
@@ -0,0 +1,115 @@
+"""
+Карточки рецептов (RecipeCard) — денормализованная модель для чтения.
+
+Список и страница рецепта читают профиль автора и ингредиенты из
+карточки одним запросом с JOIN по первичному ключу вместо JOIN автора
+и prefetch RecipeIngredient → Ingredient. Карточка обновляется в той же
+транзакции, что и данные, из которых она собрана:
+
+- рецепт и его ингредиенты — представление и админка после сохранения;
+- профиль автора — сигнал post_save User, одним UPDATE всех карточек;
+- ингредиент — сигналы Ingredient, карточки рецептов с ним.
+
+Рецепт без карточки (созданный до появления карточек) отдаётся прежним
+путём. Недостающие карточки собирает команда boot при запуске, все
+заново — команда refresh_recipe_cards.
+"""
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from api.serializers import (
+    IngredientInRecipeReadSerializer,
+    UserProfileSerializer,
+)
+from recipes.models import Recipe, RecipeCard, RecipeIngredient
+
+AUTHOR_FIELDS = tuple(
+    name
+    for name in UserProfileSerializer.Meta.fields
+    if name != "is_subscribed"
+)
+# Изменение этих полей пользователя меняет карточки его рецептов.
+USER_CARD_FIELDS = {"username", "first_name", "last_name", "email", "avatar"}
+BATCH_SIZE = 500
+
+
+def author_data(user):
+    return dict(UserProfileSerializer(user, fields=AUTHOR_FIELDS).data)
+
+
+def build_cards(recipe_ids):
+    recipes = (
+        Recipe.objects.filter(pk__in=recipe_ids)
+        .select_related("author")
+        .prefetch_related(
+            Prefetch(
+                "recipe_ingredients",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient"
+                ).order_by("id"),
+            )
+        )
+    )
+    return [
+        RecipeCard(
+            recipe=recipe,
+            author=author_data(recipe.author),
+            ingredients=IngredientInRecipeReadSerializer(
+                recipe.recipe_ingredients.all(), many=True
+            ).data,
+        )
+        for recipe in recipes
+    ]
+
+
+@transaction.atomic
+def refresh_recipe_cards(recipe_ids):
+    """Пересобирает карточки рецептов; возвращает {id рецепта: карточка}."""
+    cards = build_cards(recipe_ids)
+    existing = set(
+        RecipeCard.objects.filter(
+            pk__in=[card.pk for card in cards]
+        ).values_list("pk", flat=True)
+    )
+    RecipeCard.objects.bulk_update(
+        [card for card in cards if card.pk in existing],
+        ["author", "ingredients"],
+    )
+    # Карточку могла только что создать параллельная транзакция: она
+    # собрана из тех же данных, конфликт пропускаем.
+    RecipeCard.objects.bulk_create(
+        [card for card in cards if card.pk not in existing],
+        ignore_conflicts=True,
+    )
+    return {card.pk: card for card in cards}
+
+
+def refresh_recipe_card(recipe):
+    """Обновляет карточку рецепта и кладёт её в recipe.card."""
+    card = refresh_recipe_cards([recipe.pk]).get(recipe.pk)
+    if card is not None:
+        recipe.card = card
+
+
+def refresh_cards_in_batches(recipe_ids):
+    """Карточки множества рецептов (например, с изменённым ингредиентом)."""
+    recipe_ids = sorted(set(recipe_ids))
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        stop = start + BATCH_SIZE
+        refresh_recipe_cards(recipe_ids[start:stop])
+
+
+def refresh_missing_cards():
+    """Собирает карточки рецептов, у которых их нет; возвращает их число."""
+    recipe_ids = list(
+        Recipe.objects.filter(card__isnull=True).values_list("id", flat=True)
+    )
+    refresh_cards_in_batches(recipe_ids)
+    return len(recipe_ids)
+
+
+def refresh_author_cards(user):
+    RecipeCard.objects.filter(recipe__author_id=user.pk).update(
+        author=author_data(user)
+    )
@@ -0,0 +1,160 @@
+"""
+Журнал изменений для инкрементальной синхронизации клиентов.
+
+Каждое создание, изменение и удаление рецепта и каждое добавление и
+удаление рецепта в избранном и корзине пишет строку Change в той же
+транзакции, что и само изменение (api.signals, api.batch,
+api.relations). Клиент
+запрашивает /api/changes/?since=<курсор> и получает по порядку свои
+изменения и новые рецепты авторов, на которых подписан, — работа
+пропорциональна числу изменений, а не размеру каталога.
+
+Строки журнала вставляются до фиксации транзакций, и строка с меньшим
+id может стать видна позже строки с большим — в том числе через
+секунды, если транзакция длинная (рассылка рецепта по лентам). Поэтому
+каждая строка хранит номер своей транзакции (txid_current()), журнал
+читается в порядке (txid, id) и только до самой старой незавершённой
+транзакции (txid_snapshot_xmin): все транзакции с меньшими номерами уже
+завершены, и новые строки перед курсором появиться не могут. Время
+записи тоже ставит БД, а не часы сервера приложения.
+
+Курсор — "<txid>.<id>.<время>" в base36: последняя отданная запись и
+момент чтения. Записи старше CHANGES["RETENTION_DAYS"] удаляет команда
+purge_changes; курсор, после которого записи могли быть удалены,
+устарел — клиенту нужна полная синхронизация (410 Gone).
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import BigIntegerField, Func, Q
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from recipes.models import Change, Favorite, ShoppingCart, Subscription
+
+CHANGE_KINDS = {Favorite: Change.FAVORITE, ShoppingCart: Change.SHOPPING_CART}
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+# Самая старая незавершённая транзакция: все транзакции с меньшим
+# номером уже зафиксированы или отменены.
+OLDEST_RUNNING_SQL = "txid_snapshot_xmin(txid_current_snapshot())"
+
+
+class CurrentTransaction(Func):
+    """Номер текущей транзакции PostgreSQL."""
+
+    template = "txid_current()"
+    output_field = BigIntegerField()
+
+
+class OldestRunningTransaction(Func):
+    template = OLDEST_RUNNING_SQL
+    output_field = BigIntegerField()
+
+
+class CursorExpired(Exception):
+    """Записи после курсора могли быть удалены по сроку хранения."""
+
+
+def _base36(number):
+    digits = []
+    while True:
+        number, digit = divmod(number, 36)
+        digits.append(DIGITS[digit])
+        if not number:
+            return "".join(reversed(digits))
+
+
+def encode_cursor(txid, change_id, seen_at):
+    return ".".join(
+        _base36(value) for value in (txid, change_id, int(seen_at.timestamp()))
+    )
+
+
+def decode_cursor(cursor):
+    """(txid, id, время) из курсора; ValueError для неверного курсора."""
+    parts = cursor.split(".")
+    if len(parts) != 3:
+        raise ValueError(cursor)
+    txid, change_id, seen_at = (int(part, 36) for part in parts)
+    try:
+        seen_at = datetime.fromtimestamp(seen_at, tz=dt_timezone.utc)
+    except (OverflowError, OSError) as error:
+        raise ValueError(cursor) from error
+    return txid, change_id, seen_at
+
+
+def _change(kind, action, owner, object_id):
+    return Change(
+        kind=kind,
+        action=action,
+        owner=owner,
+        object_id=object_id,
+        txid=CurrentTransaction(),
+        created=Now(),
+    )
+
+
+def log_change(kind, action, owner, object_id):
+    _change(kind, action, owner, object_id).save(force_insert=True)
+
+
+def user_changes(user):
+    """Изменения пользователя и новые рецепты авторов из его подписок."""
+    authors = Subscription.objects.filter(user_id=user.pk).values("author_id")
+    return Change.objects.filter(
+        Q(owner=user.pk)
+        | Q(kind=Change.RECIPE, action=Change.CREATED, owner__in=authors)
+    )
+
+
+def head_cursor():
+    """Курсор на конец журнала: с него начинают после полной загрузки."""
+    # Незавершённые транзакции могут не попасть в полную загрузку,
+    # поэтому курсор ставим перед самой старой из них.
+    with connections[router.db_for_read(Change)].cursor() as cursor:
+        cursor.execute(f"SELECT {OLDEST_RUNNING_SQL}")
+        oldest_running = cursor.fetchone()[0]
+    return encode_cursor(oldest_running, 0, timezone.now())
+
+
+def read_changes(user, cursor, limit):
+    """
+    Возвращает (изменения, следующий курсор, есть ли ещё) после cursor.
+    Бросает ValueError для неверного курсора и CursorExpired для устаревшего.
+    """
+    txid, since, seen_at = decode_cursor(cursor)
+    now = timezone.now()
+    if seen_at < now - timedelta(days=settings.CHANGES["RETENTION_DAYS"]):
+        raise CursorExpired(cursor)
+
+    rows = list(
+        user_changes(user)
+        .filter(Q(txid__gt=txid) | Q(txid=txid, id__gt=since))
+        .filter(txid__lt=OldestRunningTransaction())
+        .order_by("txid", "id")[: limit + 1]
+    )
+    changes = rows[:limit]
+    has_more = len(rows) > limit
+    if changes:
+        txid, since = changes[-1].txid, changes[-1].id
+    # Если отдано не всё, срок хранения отсчитываем от последней записи.
+    seen_at = changes[-1].created if has_more else now
+    return changes, encode_cursor(txid, since, seen_at), has_more
+
+
+def purge_changes(batch_size=10000):
+    """Удаляет записи старше срока хранения; возвращает их число."""
+    retention = timedelta(days=settings.CHANGES["RETENTION_DAYS"])
+    cutoff = timezone.now() - retention
+    expired = Change.objects.filter(created__lt=cutoff)
+    deleted = 0
+    while True:
+        # Порциями, чтобы не держать долгих блокировок на большом журнале.
+        ids = list(expired.values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Change.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,161 @@
+"""
+Лента подписок: fan-out on write с pull-слиянием для популярных авторов.
+
+При публикации рецепта записи FeedEntry создаются для всех подписчиков
+автора. Если подписчиков больше FEED["FANOUT_LIMIT"], автор считается
+популярным: его подписки помечаются fan_out=False, и его рецепты
+подмешиваются в ленту при чтении. Когда подписчиков становится не больше
+половины лимита, автор возвращается к fan-out при следующей публикации.
+"""
+
+from django.conf import settings
+from django.db import connection
+
+from recipes.models import FeedEntry, Recipe, Subscription
+
+
+def fan_out_recipe(recipe):
+    """
+    Разносит новый рецепт по лентам подписчиков автора.
+
+    Автор переходит в pull-режим, когда подписчиков больше
+    FEED["FANOUT_LIMIT"], и возвращается к fan-out, когда их становится
+    не больше половины лимита: подпискам снова ставится fan_out=True,
+    а в ленты добавляются последние рецепты автора (как при подписке).
+    """
+    subscriptions = Subscription.objects.filter(author_id=recipe.author_id)
+    limit = settings.FEED["FANOUT_LIMIT"]
+    follower_ids = list(
+        subscriptions.values_list("user_id", flat=True)[: limit + 1]
+    )
+    if len(follower_ids) > limit:
+        subscriptions.filter(fan_out=True).update(fan_out=False)
+        return
+    if subscriptions.filter(fan_out=False).exists():
+        if len(follower_ids) > limit // 2:
+            return
+        subscriptions.filter(fan_out=False).update(fan_out=True)
+        recipe_ids = list(
+            Recipe.objects.filter(author_id=recipe.author_id)
+            .order_by("-id")
+            .values_list("id", flat=True)[: settings.FEED["BACKFILL"]]
+        )
+    else:
+        recipe_ids = [recipe.pk]
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for user_id in follower_ids
+            for recipe_id in recipe_ids
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def is_pull_author(author):
+    return Subscription.objects.filter(author=author, fan_out=False).exists()
+
+
+def backfill_feed(subscription):
+    """Добавляет в ленту нового подписчика последние рецепты автора."""
+    if not subscription.fan_out:
+        return
+    recipe_ids = (
+        Recipe.objects.filter(author_id=subscription.author_id)
+        .order_by("-id")
+        .values_list("id", flat=True)[: settings.FEED["BACKFILL"]]
+    )
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=subscription.user_id, recipe_id=recipe_id)
+            for recipe_id in recipe_ids
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def remove_author_from_feed(user, author):
+    FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+def feed_page(user_id, before=None, limit=10):
+    """
+    Запрос страницы ленты: limit + 1 рецептов с id меньше before.
+
+    Страница — keyset по id рецепта (id растут с публикацией) и читается
+    одним запросом: id из записей ленты (индекс (user_id, recipe_id))
+    и из рецептов pull-авторов (индекс (author_id, id)) объединяются
+    в подзапросе, а рецепты приходят вместе с карточками (RecipeCard),
+    из которых сериализатор берёт автора и ингредиенты.
+    """
+    entries = FeedEntry.objects.filter(user_id=user_id)
+    pulled = Recipe.objects.filter(
+        author_id__in=Subscription.objects.filter(
+            user_id=user_id, fan_out=False
+        ).values("author_id")
+    )
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+        pulled = pulled.filter(id__lt=before)
+
+    candidates = (
+        entries.order_by("-recipe_id")
+        .values_list("recipe_id", flat=True)[: limit + 1]
+        .union(
+            pulled.order_by("-id").values_list("id", flat=True)[: limit + 1],
+            all=True,
+        )
+    )
+    return (
+        Recipe.objects.filter(id__in=candidates)
+        .select_related("card")
+        .order_by("-id")[: limit + 1]
+    )
+
+
+def get_feed_page(user, before=None, limit=10):
+    """Возвращает (рецепты страницы, есть ли следующая страница)."""
+    page = list(feed_page(user.pk, before, limit))
+    return page[:limit], len(page) > limit
+
+
+def trim_feeds(max_length, batch_size=1000):
+    """Оставляет в каждой ленте не больше max_length последних записей."""
+    table = connection.ops.quote_name(FeedEntry._meta.db_table)
+    user_ids = (
+        FeedEntry.objects.order_by()
+        .values_list("user_id", flat=True)
+        .distinct()
+        .iterator()
+    )
+    deleted = 0
+    batch = []
+    for user_id in user_ids:
+        batch.append(user_id)
+        if len(batch) == batch_size:
+            deleted += _trim_batch(table, batch, max_length)
+            batch = []
+    if batch:
+        deleted += _trim_batch(table, batch, max_length)
+    return deleted
+
+
+def _trim_batch(table, user_ids, max_length):
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DELETE FROM {table} WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY user_id ORDER BY recipe_id DESC
+                    ) AS position
+                    FROM {table}
+                    WHERE user_id IN ({placeholders})
+                ) ranked
+                WHERE position > %s
+            )
+            """,
+            [*user_ids, max_length],
+        )
+        return cursor.rowcount
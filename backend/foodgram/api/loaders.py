@@ -0,0 +1,143 @@
+"""
+Пакетная загрузка данных для сериализаторов в пределах одного запроса.
+
+Вложенные сериализаторы и SerializerMethodField берут связанные данные
+не запросом на объект, а через загрузчик: сериализатор списка
+(BatchListSerializer) сначала регистрирует ключи всех объектов страницы
+(prime), и первый же load загружает их все одним запросом id__in.
+Загруженное хранится до конца запроса (identity map): автор двадцати
+рецептов страницы загружается один раз, а повторный load не делает
+запросов.
+
+Загрузчики создаются лениво и живут в request._loaders. Если ключ
+зарегистрирован, но ни разу не понадобился (например, флаг ответили
+api.memberships), запроса не будет.
+"""
+
+from functools import partial
+from itertools import groupby
+
+from django.db.models import Count, OuterRef, Subquery
+
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    User,
+)
+
+
+class DataLoader:
+    """
+    Загрузчик по ключам: batch_load(ключи) → {ключ: значение}. Ключи,
+    которых нет в ответе, получают default.
+    """
+
+    def __init__(self, batch_load, default=None):
+        self.batch_load = batch_load
+        self.default = default
+        self.cache = {}
+        self.pending = set()
+
+    def prime(self, keys):
+        self.pending.update(key for key in keys if key not in self.cache)
+
+    def load(self, key):
+        if key not in self.cache:
+            self.pending.add(key)
+            self.dispatch()
+        return self.cache[key]
+
+    def dispatch(self):
+        keys, self.pending = self.pending, set()
+        loaded = self.batch_load(keys)
+        for key in keys:
+            self.cache[key] = loaded.get(key, self.default)
+
+
+def load_users(request, keys):
+    return User.objects.in_bulk(keys)
+
+
+def load_recipe_ingredients(request, keys):
+    rows = (
+        RecipeIngredient.objects.filter(recipe_id__in=keys)
+        .select_related("ingredient")
+        .order_by("recipe_id", "id")
+    )
+    return {
+        recipe_id: list(group)
+        for recipe_id, group in groupby(rows, key=lambda row: row.recipe_id)
+    }
+
+
+def load_relation_flags(model, column, request, keys):
+    """Есть ли у текущего пользователя связь model с объектами keys."""
+    found = set(
+        model.objects.filter(
+            user_id=request.user.pk, **{f"{column}__in": keys}
+        ).values_list(column, flat=True)
+    )
+    return {key: key in found for key in keys}
+
+
+def load_author_recipes(request, keys):
+    """Рецепты авторов, не больше ?recipes_limit= на автора, одним запросом."""
+    recipes = Recipe.objects.filter(author_id__in=keys)
+    limit = request.query_params.get("recipes_limit", "")
+    if limit.isdecimal():
+        first = Recipe.objects.filter(
+            author_id=OuterRef("author_id")
+        ).values("id")
+        recipes = recipes.filter(id__in=Subquery(first[: int(limit)]))
+    loaded = {}
+    for recipe in recipes:
+        loaded.setdefault(recipe.author_id, []).append(recipe)
+    return loaded
+
+
+def load_recipes_count(request, keys):
+    return dict(
+        Recipe.objects.filter(author_id__in=keys)
+        .values_list("author_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+
+
+LOADERS = {
+    "users": (load_users, None),
+    "recipe_ingredients": (load_recipe_ingredients, ()),
+    "subscribed": (
+        partial(load_relation_flags, Subscription, "author_id"),
+        False,
+    ),
+    "favorited": (partial(load_relation_flags, Favorite, "recipe_id"), False),
+    "in_shopping_cart": (
+        partial(load_relation_flags, ShoppingCart, "recipe_id"),
+        False,
+    ),
+    "author_recipes": (load_author_recipes, ()),
+    "recipes_count": (load_recipes_count, 0),
+}
+
+
+def get_loader(request, name):
+    if not hasattr(request, "_loaders"):
+        request._loaders = {}
+    if name not in request._loaders:
+        batch_load, default = LOADERS[name]
+        request._loaders[name] = DataLoader(
+            partial(batch_load, request), default
+        )
+    return request._loaders[name]
+
+
+def prime(request, name, keys):
+    get_loader(request, name).prime(keys)
+
+
+def load(request, name, key):
+    return get_loader(request, name).load(key)
@@ -0,0 +1,196 @@
+import asyncio
+import io
+import statistics
+import sys
+import threading
+import time
+from queue import Empty, Queue
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db.backends.signals import connection_created
+from django.test import override_settings
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает WSGI (N sync-воркеров) и ASGI (один event loop) "
+        "на горячих GET-эндпоинтах при высокой конкуренции, медленных "
+        "клиентах и медленной БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=400)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument(
+            "--wsgi-workers",
+            type=int,
+            default=4,
+            help="Число sync-воркеров gunicorn.",
+        )
+        parser.add_argument(
+            "--client-latency",
+            type=float,
+            default=0.05,
+            help="Задержка клиента на отправку запроса и чтение ответа, с.",
+        )
+        parser.add_argument(
+            "--db-latency",
+            type=float,
+            default=0.005,
+            help="Задержка каждого SQL, с.",
+        )
+
+    def handle(self, *args, **options):
+        recipe_id = Recipe.objects.values_list("id", flat=True).first() or 1
+        self.urls = [
+            "/api/recipes/?limit=10",
+            f"/api/recipes/{recipe_id}/",
+            "/api/ingredients/?name=%D0%B0",
+            f"/s/{recipe_id}/",
+        ]
+        self._add_db_latency(options["db_latency"])
+
+        runners = (("wsgi", self._run_wsgi), ("asgi", self._run_asgi))
+        for name, runner in runners:
+            started = time.perf_counter()
+            latencies, statuses = runner(options)
+            elapsed = time.perf_counter() - started
+            latencies.sort()
+            self.stdout.write(
+                f"{name}: {len(latencies) / elapsed:7.1f} req/s, "
+                f"p50 {statistics.median(latencies) * 1000:7.1f} мс, "
+                f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.1f} мс, "
+                f"статусы {sorted(set(statuses))}"
+            )
+
+    @staticmethod
+    def _add_db_latency(delay):
+        def slow_execute(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def install(sender, connection, **kwargs):
+            if slow_execute not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_execute)
+
+        connection_created.connect(install, weak=False)
+
+    def _environ(self, url):
+        parts = urlsplit(url)
+        return {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": parts.path,
+            "QUERY_STRING": parts.query,
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "localhost",
+            "REMOTE_ADDR": "127.0.0.1",
+            "wsgi.input": io.BytesIO(),
+            "wsgi.errors": sys.stderr,
+            "wsgi.url_scheme": "http",
+        }
+
+    def _run_wsgi(self, options):
+        """
+        concurrency клиентов на wsgi_workers sync-воркеров: воркер занят
+        запросом целиком, включая медленную отправку и чтение клиентом.
+        """
+        handler = WSGIHandler()
+        jobs = Queue()
+        for index in range(options["requests"]):
+            jobs.put(self.urls[index % len(self.urls)])
+        workers = threading.BoundedSemaphore(options["wsgi_workers"])
+        latencies, statuses = [], []
+        lock = threading.Lock()
+
+        def client():
+            while True:
+                try:
+                    url = jobs.get_nowait()
+                except Empty:
+                    return
+                started = time.perf_counter()
+                status = []
+                with workers:
+                    time.sleep(options["client_latency"])
+                    body = handler(
+                        self._environ(url), lambda s, h: status.append(s)
+                    )
+                    b"".join(body)
+                    time.sleep(options["client_latency"])
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    statuses.append(int(status[0].split()[0]))
+
+        threads = [
+            threading.Thread(target=client)
+            for _ in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, statuses
+
+    def _run_asgi(self, options):
+        from foodgram.asgi import ReadPathASGIHandler
+
+        middleware = [
+            path for path in settings.MIDDLEWARE if "whitenoise" not in path
+        ]
+        with override_settings(MIDDLEWARE=middleware):
+            handler = ReadPathASGIHandler()
+        return asyncio.run(self._asgi_load(handler, options))
+
+    async def _asgi_load(self, handler, options):
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        latencies, statuses = [], []
+
+        async def one(url):
+            async with semaphore:
+                started = time.perf_counter()
+                parts = urlsplit(url)
+                scope = {
+                    "type": "http",
+                    "asgi": {"version": "3.0"},
+                    "http_version": "1.1",
+                    "method": "GET",
+                    "scheme": "http",
+                    "path": parts.path,
+                    "raw_path": parts.path.encode(),
+                    "root_path": "",
+                    "query_string": parts.query.encode(),
+                    "headers": [(b"host", b"localhost")],
+                    "server": ("localhost", 80),
+                    "client": ("127.0.0.1", 50000),
+                }
+
+                async def receive():
+                    await asyncio.sleep(options["client_latency"])
+                    return {
+                        "type": "http.request",
+                        "body": b"",
+                        "more_body": False,
+                    }
+
+                async def send(message):
+                    if message["type"] == "http.response.start":
+                        statuses.append(message["status"])
+                    elif not message.get("more_body"):
+                        await asyncio.sleep(options["client_latency"])
+
+                await handler(scope, receive, send)
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(
+            *(
+                one(self.urls[index % len(self.urls)])
+                for index in range(options["requests"])
+            )
+        )
+        return latencies, statuses
@@ -0,0 +1,94 @@
+import copy
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import load_backend
+
+from recipes.models import Recipe
+
+MODES = {
+    # Новое соединение на каждый запрос (поведение без CONN_MAX_AGE).
+    "fresh": {"CONN_MAX_AGE": 0, "POOL": {"ENABLED": False}},
+    # Постоянное соединение на поток с проверкой в начале запроса.
+    "persistent": {
+        "CONN_MAX_AGE": 60,
+        "CONN_HEALTH_CHECKS": True,
+        "POOL": {"ENABLED": False},
+    },
+    # Общий пул процесса, соединение возвращается в конце запроса.
+    "pool": {"CONN_MAX_AGE": 0, "POOL": {"ENABLED": True, "MAX_SIZE": 4}},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает задержку коротких запросов (как get_short_link) "
+        "с новым, постоянным и пуловым соединением с БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument(
+            "--modes",
+            default=",".join(MODES),
+            help="Через запятую: " + ", ".join(MODES),
+        )
+
+    def handle(self, *args, **options):
+        base_settings = connections["default"].settings_dict
+        backend = load_backend(base_settings["ENGINE"])
+        recipe_id = Recipe.objects.values_list("id", flat=True).first() or 1
+        sql = f"SELECT 1 FROM {Recipe._meta.db_table} WHERE id = %s LIMIT 1"
+
+        for mode in options["modes"].split(","):
+            settings_dict = copy.deepcopy(base_settings)
+            settings_dict.update(copy.deepcopy(MODES[mode]))
+            latencies = []
+            lock = threading.Lock()
+            per_thread = options["requests"] // options["threads"]
+
+            def worker():
+                wrapper = backend.DatabaseWrapper(
+                    settings_dict, alias=f"bench_{mode}"
+                )
+                local = []
+                for _ in range(per_thread):
+                    started = time.perf_counter()
+                    # Те же шаги, что Django делает на request_started
+                    # и request_finished.
+                    wrapper.close_if_unusable_or_obsolete()
+                    with wrapper.cursor() as cursor:
+                        cursor.execute(sql, [recipe_id])
+                        cursor.fetchone()
+                    wrapper.close_if_unusable_or_obsolete()
+                    local.append(time.perf_counter() - started)
+                wrapper.close()
+                with lock:
+                    latencies.extend(local)
+
+            threads = [
+                threading.Thread(target=worker)
+                for _ in range(options["threads"])
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            latencies.sort()
+            self.stdout.write(
+                f"{mode:>10}: {len(latencies) / elapsed:8.0f} req/s, "
+                f"p50 {self._ms(statistics.median(latencies))}, "
+                f"p95 {self._ms(latencies[int(len(latencies) * 0.95)])}, "
+                f"p99 {self._ms(latencies[int(len(latencies) * 0.99)])}"
+            )
+
+    @staticmethod
+    def _ms(seconds):
+        return f"{seconds * 1000:6.2f} мс"
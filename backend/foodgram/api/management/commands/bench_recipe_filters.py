@@ -0,0 +1,105 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import RequestFactory
+
+from api.benchmarks import clear_catalog, execution_ms, explain, seed_catalog
+from api.views import RecipeFilter, RecipePagination
+from recipes.models import Recipe, RecipeIngredient
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN ANALYZE запросов списка рецептов с фильтрами "
+        "по ингредиентам, времени и авторам (страница и count, как в API)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Создать N тестовых рецептов перед замером.",
+        )
+        parser.add_argument("--authors", type=int, default=10000)
+        parser.add_argument(
+            "--clear", action="store_true", help="Удалить тестовый каталог."
+        )
+        parser.add_argument("--page", type=int, default=1)
+        parser.add_argument(
+            "--verbose-plans",
+            action="store_true",
+            help="Печатать планы целиком.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError(
+                "Планы запросов проверяются только на PostgreSQL."
+            )
+        if options["clear"]:
+            clear_catalog()
+            self.stdout.write(self.style.SUCCESS("Тестовый каталог удалён."))
+            return
+        if options["seed"]:
+            self.stdout.write(f"Создаём {options['seed']} рецептов...")
+            seed_catalog(options["seed"], options["authors"])
+
+        popular = list(
+            RecipeIngredient.objects.values("ingredient_id")
+            .annotate(uses=Count("id"))
+            .order_by("-uses")
+            .values_list("ingredient_id", flat=True)[:50]
+        )
+        authors = list(
+            Recipe.objects.order_by("-id").values_list(
+                "author_id", flat=True
+            )[:3]
+        )
+        if len(popular) < 50 or not authors:
+            raise CommandError("Мало данных: запустите с --seed.")
+
+        cases = {
+            "по умолчанию": {},
+            "время 10–20 мин": {
+                "cooking_time_min": 10,
+                "cooking_time_max": 20,
+            },
+            "ингредиенты (все из)": {"ingredients": popular[:2]},
+            "редкие ингредиенты": {"ingredients": popular[-2:]},
+            "без ингредиентов": {"exclude_ingredients": popular[:3]},
+            "несколько авторов": {"author": authors},
+            "всё вместе": {
+                "author": authors,
+                "ingredients": popular[:1],
+                "exclude_ingredients": popular[1:2],
+                "cooking_time_max": 60,
+            },
+        }
+        page_size = RecipePagination.page_size
+        start = (options["page"] - 1) * page_size
+        end = start + page_size
+        for name, params in cases.items():
+            request = RequestFactory().get("/api/recipes/", params)
+            request.user = AnonymousUser()
+            queryset = RecipeFilter(
+                request.GET, queryset=Recipe.objects.all(), request=request
+            ).qs
+            # count пагинатора — те же условия без сортировки.
+            for kind, query in (
+                ("страница", queryset[start:end]),
+                ("count", queryset.order_by().values("pk")),
+            ):
+                plan, seq_scans = explain(query)
+                status = (
+                    self.style.ERROR(f"Seq Scan: {', '.join(seq_scans)}")
+                    if seq_scans
+                    else self.style.SUCCESS("индексы")
+                )
+                elapsed = execution_ms(plan) or 0
+                self.stdout.write(
+                    f"{name:24} {kind:9} {elapsed:9.2f} мс  {status}"
+                )
+                if options["verbose_plans"]:
+                    self.stdout.write(plan + "\n")
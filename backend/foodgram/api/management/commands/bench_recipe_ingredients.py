@@ -0,0 +1,161 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.request import Request
+
+from api.serializers import RecipeWriteSerializer
+from recipes.models import Ingredient, Recipe, RecipeIngredient, User
+
+
+class LegacyIngredientSerializer(serializers.Serializer):
+    """Прежняя проверка: отдельный запрос Ingredient на каждую позицию."""
+
+    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    amount = serializers.IntegerField(min_value=1)
+
+
+def legacy_update(recipe, ingredients):
+    """Прежнее обновление: удалить все строки и создать заново."""
+    recipe.recipe_ingredients.all().delete()
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe, ingredient_id=item["id"], amount=item["amount"]
+        )
+        for item in ingredients
+    )
+
+
+def diff_update(recipe, ingredients):
+    serializer = RecipeWriteSerializer()
+    serializer._update_recipe_ingredients(
+        recipe,
+        [
+            {"ingredient_id": item["id"], "amount": item["amount"]}
+            for item in ingredients
+        ],
+    )
+
+
+def measure(func, repeat):
+    """(среднее время, мс; число запросов за вызов)."""
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000, len(queries)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает прежнюю и текущую запись ингредиентов рецепта: проверку "
+        "id и обновление (удалить всё и создать заново против разницы) "
+        "на рецепте с большим числом ингредиентов. Изменения откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ingredients", type=int, default=60)
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **options):
+        size = options["ingredients"]
+        ingredient_ids = list(
+            Ingredient.objects.order_by("id").values_list("id", flat=True)[
+                : size + 5
+            ]
+        )
+        if len(ingredient_ids) < size + 5:
+            raise CommandError(
+                f"Нужно не меньше {size + 5} ингредиентов: "
+                "загрузите их командой fill_test_data."
+            )
+        base = [{"id": pk, "amount": 100} for pk in ingredient_ids[:size]]
+        one_amount = [dict(item) for item in base]
+        one_amount[0]["amount"] = 150
+        replaced = base[5:] + [
+            {"id": pk, "amount": 100} for pk in ingredient_ids[size:]
+        ]
+        repeat = options["repeat"]
+
+        request = Request(RequestFactory().post("/api/recipes/"))
+        request.user = AnonymousUser()
+        data = {
+            "name": "bench",
+            "text": "bench",
+            "cooking_time": 10,
+            "image": "data:image/gif;base64,"
+            "R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7",
+            "ingredients": base,
+        }
+
+        def validate_current():
+            serializer = RecipeWriteSerializer(
+                data=data, context={"request": request}
+            )
+            serializer.is_valid(raise_exception=True)
+
+        def validate_legacy():
+            LegacyIngredientSerializer(data=base, many=True).is_valid(
+                raise_exception=True
+            )
+
+        with transaction.atomic():
+            author = User.objects.create(
+                username="bench_ingredients", email="b@b.b"
+            )
+            recipe = Recipe.objects.create(
+                author=author,
+                name="bench",
+                text="",
+                cooking_time=1,
+                image="x.png",
+            )
+            legacy_update(recipe, base)
+
+            self.stdout.write(f"Рецепт с {size} ингредиентами.")
+            for name, func in (
+                ("проверка id: по одному", validate_legacy),
+                ("проверка id: id__in", validate_current),
+            ):
+                ms, queries = measure(func, repeat)
+                self.stdout.write(
+                    f"{name:34} {ms:8.2f} мс  запросов {queries}"
+                )
+
+            for case, target in (
+                ("без изменений", base),
+                ("изменено одно количество", one_amount),
+                ("заменены 5 ингредиентов", replaced),
+            ):
+                for name, update in (
+                    ("удалить и создать", legacy_update),
+                    ("разница", diff_update),
+                ):
+
+                    def run():
+                        # Каждый замер начинается с исходного состава.
+                        legacy_update(recipe, base)
+                        update(recipe, target)
+
+                    ms, _ = measure(run, repeat)
+                    reset_ms, _ = measure(
+                        lambda: legacy_update(recipe, base), repeat
+                    )
+                    legacy_update(recipe, base)
+                    with CaptureQueriesContext(connection) as queries:
+                        update(recipe, target)
+                    writes = sum(
+                        not query["sql"].lstrip().upper().startswith("SELECT")
+                        for query in queries.captured_queries
+                    )
+                    elapsed = max(ms - reset_ms, 0)
+                    self.stdout.write(
+                        f"{case:26} {name:18} {elapsed:8.2f} мс  "
+                        f"запросов {len(queries)} (запись {writes})"
+                    )
+            transaction.set_rollback(True)
@@ -0,0 +1,101 @@
+import base64
+import io
+import json
+import os
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.parsers import MessagePackParser, ORJSONParser
+from api.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+from api.serializers import RecipeReadSerializer
+from recipes.models import Ingredient, Recipe
+
+
+def recipe_page(size):
+    """Страница списка рецептов в том виде, в каком её отдаёт API."""
+    recipes = list(Recipe.objects.all()[:size])
+    if not recipes:
+        raise CommandError(
+            "Нет рецептов: создайте их или запустите "
+            "bench_recipe_filters --seed."
+        )
+    request = Request(RequestFactory().get("/api/recipes/"))
+    request.user = AnonymousUser()
+    results = RecipeReadSerializer(
+        recipes, many=True, context={"request": request}
+    ).data
+    # Недостающие до размера страницы рецепты повторяем.
+    results = (results * (size // len(results) + 1))[:size]
+    return {"count": size, "next": None, "previous": None, "results": results}
+
+
+def recipe_write_payload(image_kb):
+    """Тело создания рецепта с base64-картинкой заданного размера."""
+    image = base64.b64encode(os.urandom(image_kb * 1024)).decode()
+    ingredients = Ingredient.objects.values_list("id", flat=True)[:15]
+    return {
+        "name": "Тестовый рецепт",
+        "text": "Описание " * 100,
+        "cooking_time": 30,
+        "image": f"data:image/png;base64,{image}",
+        "ingredients": [{"id": pk, "amount": 100} for pk in ingredients],
+    }
+
+
+def per_call_ms(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает стандартные JSONRenderer/JSONParser DRF с orjson и "
+        "MessagePack на странице списка рецептов и теле создания рецепта."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--image-kb", type=int, default=300)
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        formats = {
+            "json (DRF)": (JSONRenderer(), JSONParser()),
+            "orjson": (ORJSONRenderer(), ORJSONParser()),
+        }
+        if msgpack is not None:
+            formats["msgpack"] = (MessagePackRenderer(), MessagePackParser())
+        else:
+            self.stdout.write("msgpack не установлен — пропускаем.")
+
+        page = recipe_page(options["page_size"])
+        payload = recipe_write_payload(options["image_kb"])
+        expected = json.loads(JSONRenderer().render(page))
+        repeat = options["repeat"]
+        for name, (renderer, parser) in formats.items():
+            body = renderer.render(page)
+            parsed = parser.parse(io.BytesIO(body))
+            is_json = renderer.media_type == "application/json"
+            if is_json and parsed != expected:
+                raise CommandError(
+                    f"{name}: ответ отличается от стандартного."
+                )
+            render_ms = per_call_ms(lambda: renderer.render(page), repeat)
+            write_body = renderer.render(payload)
+            parse_ms = per_call_ms(
+                lambda: parser.parse(io.BytesIO(write_body)), repeat
+            )
+            self.stdout.write(
+                f"{name:11} страница {len(body) / 1024:8.1f} КБ "
+                f"рендер {render_ms:7.3f} мс   "
+                f"тело {len(write_body) / 1024:7.1f} КБ "
+                f"разбор {parse_ms:7.3f} мс"
+            )
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+from api.cards import refresh_missing_cards
+from recipes.management.commands.fill_test_data import (
+    fixture_path,
+    load_ingredients,
+)
+from recipes.models import BootStamp
+
+# Те же шаблоны, что collectstatic пропускает по умолчанию.
+STATIC_IGNORE_PATTERNS = ["CVS", ".*", "*~"]
+# Отметка лежит в самом STATIC_ROOT: том со статикой может быть очищен
+# независимо от БД, и тогда вместе с файлами пропадёт и она.
+STATIC_STAMP = ".boot-static"
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def static_checksum():
+    """Сумма путей и содержимого всех файлов, которые соберёт collectstatic."""
+    files = {}
+    for finder in finders.get_finders():
+        for path, storage in finder.list(STATIC_IGNORE_PATTERNS):
+            # Как и collectstatic, берём первый найденный файл с таким путём.
+            files.setdefault(path, storage.path(path))
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        digest.update(path.encode())
+        digest.update(file_checksum(files[path]).encode())
+    return digest.hexdigest()
+
+
+def read_static_stamp():
+    try:
+        with open(os.path.join(settings.STATIC_ROOT, STATIC_STAMP)) as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def write_static_stamp(checksum):
+    with open(os.path.join(settings.STATIC_ROOT, STATIC_STAMP), "w") as file:
+        file.write(checksum)
+
+
+class Command(BaseCommand):
+    help = (
+        "Подготовка контейнера к запуску: миграции, ингредиенты, статика и "
+        "карточки рецептов. "
+        "Шаг пропускается, если его входные данные не изменились с прошлого "
+        "запуска: нет неприменённых миграций, контрольная сумма "
+        "data/ingredients.json и файлов статики совпадает с сохранённой, "
+        "у всех рецептов есть карточки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Выполнить все шаги без проверок.",
+        )
+
+    def handle(self, *args, **options):
+        self.force = options["force"]
+        self.verbosity = options["verbosity"]
+        started = time.perf_counter()
+        for name, step in (
+            ("migrate", self.migrate),
+            ("ingredients", self.ingredients),
+            ("collectstatic", self.collectstatic),
+            ("recipe_cards", self.recipe_cards),
+        ):
+            step_started = time.perf_counter()
+            result = step()
+            elapsed = time.perf_counter() - step_started
+            self.stdout.write(f"{name:14} {result:40} {elapsed:6.2f} с")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Готово за {elapsed:.2f} с"))
+
+    def migrate(self):
+        executor = MigrationExecutor(connection)
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+        if not plan and not self.force:
+            return "пропущен: нет новых миграций"
+        call_command("migrate", interactive=False, verbosity=self.verbosity)
+        return f"применено миграций: {len(plan)}"
+
+    def ingredients(self):
+        path = fixture_path()
+        checksum = file_checksum(path)
+        stamp = BootStamp.objects.filter(name="ingredients").first()
+        if stamp is not None and stamp.checksum == checksum and not self.force:
+            return "пропущен: файл не изменился"
+        count = load_ingredients(path)
+        BootStamp.objects.update_or_create(
+            name="ingredients", defaults={"checksum": checksum}
+        )
+        return f"загружено записей: {count}"
+
+    def collectstatic(self):
+        checksum = static_checksum()
+        if read_static_stamp() == checksum and not self.force:
+            return "пропущен: статика не изменилась"
+        call_command(
+            "collectstatic", interactive=False, verbosity=self.verbosity
+        )
+        write_static_stamp(checksum)
+        return "собрана"
+
+    def recipe_cards(self):
+        created = refresh_missing_cards()
+        if not created:
+            return "пропущен: карточки есть у всех рецептов"
+        return f"собрано карточек: {created}"
@@ -0,0 +1,41 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.similarity import build_index, similar_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит индекс похожих рецептов и сохраняет его в "
+        "SIMILARITY['INDEX_PATH']; воркеры перечитают файл сами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=0,
+            help="После сборки замерить время N запросов похожих рецептов.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = build_index()
+        index.save(settings.SIMILARITY["INDEX_PATH"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Индекс построен: {len(index)} рецептов "
+                f"за {time.perf_counter() - started:.1f} с."
+            )
+        )
+        if not options["queries"] or not len(index):
+            return
+        sample = random.choices(index.ids, k=options["queries"])
+        started = time.perf_counter()
+        for recipe_id in sample:
+            similar_recipes(recipe_id, 10)
+        elapsed = (time.perf_counter() - started) / len(sample)
+        self.stdout.write(f"Средний запрос top-10: {elapsed * 1000:.2f} мс.")
@@ -0,0 +1,178 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from api.benchmarks import (
+    clear_catalog,
+    execution_ms,
+    explain,
+    seed_catalog,
+    table_rows,
+)
+from api.feed import feed_page
+from api.views import RecipeViewSet, UserViewSet
+from recipes.models import (
+    Favorite,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    User,
+)
+
+
+def view_queryset(viewset, user, action="list", params=None):
+    """
+    Queryset представления для GET-запроса user с параметрами params:
+    get_queryset() и фильтры (filterset_class) самого представления.
+    """
+    request = Request(RequestFactory().get("/", params or {}))
+    request.user = user
+    view = viewset(
+        request=request, action=action, args=(), kwargs={}, format_kwarg=None
+    )
+    return view.filter_queryset(view.get_queryset())
+
+
+def hot_queries(user, recipe_id, author_id, ingredient_id):
+    """
+    Основные запросы API. Списки и рецепт строят сами представления
+    (view_queryset), остальные запросы повторяют загрузчики и действия,
+    которые выполняют их сразу.
+    """
+    user_id = user.pk
+    cart = ShoppingCart.objects.filter(user_id=user_id).values("recipe_id")
+
+    def recipes(**params):
+        return view_queryset(RecipeViewSet, user, params=params)[:10]
+
+    return {
+        "список рецептов": recipes(),
+        "рецепты автора": recipes(author=author_id),
+        "is_favorited=1": recipes(is_favorited=1),
+        "is_in_shopping_cart=1": recipes(is_in_shopping_cart=1),
+        "ingredients": recipes(ingredients=ingredient_id),
+        "exclude_ingredients": recipes(exclude_ingredients=ingredient_id),
+        "cooking_time": recipes(cooking_time_min=10, cooking_time_max=20),
+        "рецепт": view_queryset(RecipeViewSet, user, "retrieve").filter(
+            pk=recipe_id
+        ),
+        "ингредиенты рецепта": RecipeIngredient.objects.filter(
+            recipe_id__in=[recipe_id]
+        )
+        .select_related("ingredient")
+        .order_by("recipe_id", "id"),
+        "флаг is_favorited": Favorite.objects.filter(
+            user_id=user_id, recipe_id__in=[recipe_id]
+        ),
+        "флаг is_in_shopping_cart": ShoppingCart.objects.filter(
+            user_id=user_id, recipe_id__in=[recipe_id]
+        ),
+        "избранное рецепта": Favorite.objects.filter(recipe_id=recipe_id),
+        "корзины с рецептом": ShoppingCart.objects.filter(recipe_id=recipe_id),
+        "список пользователей": view_queryset(UserViewSet, user)[:10],
+        "подписки": User.objects.filter(followers__user_id=user_id)[:10],
+        "подписчики автора": Subscription.objects.filter(author_id=author_id),
+        "список покупок": RecipeIngredient.objects.filter(recipe_id__in=cart)
+        .values("ingredient__name", "ingredient__measurement_unit")
+        .annotate(total_amount=Sum("amount"))
+        .order_by("ingredient__name"),
+        "лента": feed_page(user_id),
+    }
+
+
+def find_seq_scans(queries, min_rows):
+    """
+    EXPLAIN ANALYZE запросов: (имя, план, таблицы не меньше min_rows
+    строк, которые запрос читает целиком).
+    """
+    rows = table_rows()
+    for name, queryset in queries.items():
+        plan, seq_scans = explain(queryset)
+        large = [
+            table for table in seq_scans if rows.get(table, 0) >= min_rows
+        ]
+        yield name, plan, large
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверка планов горячих запросов: EXPLAIN ANALYZE на наполненной "
+        "БД, ошибка, если какой-то из них читает большую таблицу целиком "
+        "(Seq Scan). "
+        "COUNT(*) по всему списку рецептов не проверяется: он читает таблицу "
+        "по определению."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Создать N тестовых рецептов перед проверкой.",
+        )
+        parser.add_argument("--authors", type=int, default=10000)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Удалить тестовый каталог после проверки.",
+        )
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=10000,
+            help="Seq Scan по таблицам меньшего размера допустим.",
+        )
+        parser.add_argument("--verbose-plans", action="store_true")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError(
+                "Планы запросов проверяются только на PostgreSQL."
+            )
+        if options["seed"]:
+            self.stdout.write(f"Создаём {options['seed']} рецептов...")
+            seed_catalog(options["seed"], options["authors"])
+        try:
+            failures = self.check_plans(options)
+        finally:
+            if options["clear"]:
+                clear_catalog()
+        if failures:
+            raise CommandError(
+                "Seq Scan в горячих запросах: " + "; ".join(failures)
+            )
+        self.stdout.write(
+            self.style.SUCCESS("Все горячие запросы идут по индексам.")
+        )
+
+    def check_plans(self, options):
+        favorite = (
+            Favorite.objects.select_related("user").order_by("-id").first()
+        )
+        author_id = Recipe.objects.values_list("author_id", flat=True).last()
+        if favorite is None or author_id is None:
+            raise CommandError("Нет данных: запустите с --seed.")
+        ingredient_id = (
+            RecipeIngredient.objects.filter(recipe_id=favorite.recipe_id)
+            .values_list("ingredient_id", flat=True)
+            .first()
+        )
+
+        failures = []
+        queries = hot_queries(
+            favorite.user, favorite.recipe_id, author_id, ingredient_id
+        )
+        for name, plan, large in find_seq_scans(queries, options["min_rows"]):
+            if large:
+                failures.append(f"{name} ({', '.join(large)})")
+                status = self.style.ERROR(f"Seq Scan: {', '.join(large)}")
+            else:
+                status = self.style.SUCCESS("OK")
+            elapsed = execution_ms(plan) or 0
+            self.stdout.write(f"{name:26} {elapsed:9.2f} мс  {status}")
+            if options["verbose_plans"] or large:
+                self.stdout.write(plan + "\n")
+        return failures
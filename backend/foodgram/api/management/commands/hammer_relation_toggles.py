@@ -0,0 +1,164 @@
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Change,
+    Favorite,
+    Recipe,
+    ShoppingCart,
+    Subscription,
+    User,
+)
+
+STATUSES = {"post": {201, 400}, "delete": {204, 404}}
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверка добавления и удаления избранного, корзины и подписки под "
+        "нагрузкой: потоки одного пользователя одновременно добавляют и "
+        "удаляют один рецепт и одного автора. Ответы должны быть только "
+        "201/400 и 204/404, без ошибок, а итоговое состояние и журнал "
+        "изменений — сходиться с числом успешных ответов. Нужен PostgreSQL; "
+        "тестовые данные удаляются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--rounds", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Команда работает только с PostgreSQL.")
+        settings.THROTTLE["ENABLED"] = False
+        suffix = f"{time.time_ns():x}"
+        user = User.objects.create_user(
+            username=f"hammer_{suffix}", email=f"hammer_{suffix}@example.com"
+        )
+        author = User.objects.create_user(
+            username=f"hammer_author_{suffix}",
+            email=f"hammer_author_{suffix}@example.com",
+        )
+        recipe = Recipe.objects.create(
+            author=author,
+            name="Нагрузочный рецепт",
+            text="-",
+            cooking_time=1,
+            image="recipes/images/hammer.png",
+        )
+        targets = {
+            "favorite": f"/api/recipes/{recipe.pk}/favorite/",
+            "shopping_cart": f"/api/recipes/{recipe.pk}/shopping_cart/",
+            "subscribe": f"/api/users/{author.pk}/subscribe/",
+        }
+        try:
+            statuses, failures, elapsed = self._hammer(user, targets, options)
+            problems = self._check(user, author, recipe, statuses, failures)
+        finally:
+            User.objects.filter(pk__in=[user.pk, author.pk]).delete()
+            Change.objects.filter(owner__in=[user.pk, author.pk]).delete()
+
+        total = sum(statuses.values())
+        self.stdout.write(
+            f"{total} запросов за {elapsed:.2f} с "
+            f"({total / elapsed:.0f} req/s)"
+        )
+        for (target, method, code), count in sorted(statuses.items()):
+            self.stdout.write(f"{target:>14} {method:>6} {code}: {count}")
+        if problems:
+            raise CommandError("\n".join(problems))
+        self.stdout.write(self.style.SUCCESS("Состояние согласовано."))
+
+    def _hammer(self, user, targets, options):
+        statuses, failures = Counter(), []
+        lock = threading.Lock()
+        seed = options["seed"]
+
+        def worker(index):
+            rng = random.Random(None if seed is None else seed + index)
+            client = APIClient(SERVER_NAME="localhost")
+            client.force_authenticate(user)
+            local = Counter()
+            try:
+                for _ in range(options["rounds"]):
+                    target = rng.choice(list(targets))
+                    method = rng.choice(("post", "delete"))
+                    try:
+                        response = getattr(client, method)(targets[target])
+                    except Exception as error:
+                        with lock:
+                            failures.append(f"{target} {method}: {error!r}")
+                        continue
+                    local[target, method, response.status_code] += 1
+            finally:
+                connection.close()
+            with lock:
+                statuses.update(local)
+
+        threads = [
+            threading.Thread(target=worker, args=(index,))
+            for index in range(options["threads"])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses, failures, time.perf_counter() - started
+
+    def _check(self, user, author, recipe, statuses, failures):
+        problems = list(failures[:20])
+        for (target, method, code), count in statuses.items():
+            if code not in STATUSES[method]:
+                problems.append(f"{target} {method}: {count} ответов {code}")
+
+        exists = {
+            "favorite": Favorite.objects.filter(
+                user=user, recipe=recipe
+            ).exists(),
+            "shopping_cart": ShoppingCart.objects.filter(
+                user=user, recipe=recipe
+            ).exists(),
+            "subscribe": Subscription.objects.filter(
+                user=user, author=author
+            ).exists(),
+        }
+        for target, present in exists.items():
+            added = statuses[target, "post", 201]
+            removed = statuses[target, "delete", 204]
+            # Связи в начале не было: успешные добавления и удаления
+            # чередуются.
+            if added - removed != int(present):
+                problems.append(
+                    f"{target}: 201 — {added}, 204 — {removed}, "
+                    f"а связь {'есть' if present else 'отсутствует'}"
+                )
+
+        for target, kind in (
+            ("favorite", Change.FAVORITE),
+            ("shopping_cart", Change.SHOPPING_CART),
+        ):
+            logged = Counter(
+                Change.objects.filter(
+                    owner=user.pk, kind=kind, object_id=recipe.pk
+                ).values_list("action", flat=True)
+            )
+            for action, method, code in (
+                (Change.CREATED, "post", 201),
+                (Change.DELETED, "delete", 204),
+            ):
+                if logged[action] != statuses[target, method, code]:
+                    problems.append(
+                        f"{target}: в журнале {logged[action]} "
+                        f"записей {action}, "
+                        f"ответов {code} — {statuses[target, method, code]}"
+                    )
+        return problems
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.changes import purge_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет из журнала изменений записи старше "
+        "CHANGES['RETENTION_DAYS'] дней."
+    )
+
+    def handle(self, *args, **options):
+        deleted = purge_changes()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Удалено записей журнала: {deleted} "
+                f"(срок хранения {settings.CHANGES['RETENTION_DAYS']} дн.)."
+            )
+        )
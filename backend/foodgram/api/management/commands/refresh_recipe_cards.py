@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api.cards import refresh_cards_in_batches
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересобирает карточки рецептов (RecipeCard) для всех рецептов: "
+        "после первой миграции или если карточки разошлись с данными."
+    )
+
+    def handle(self, *args, **options):
+        recipe_ids = list(
+            Recipe.objects.order_by("id").values_list("id", flat=True)
+        )
+        refresh_cards_in_batches(recipe_ids)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обновлено карточек рецептов: {len(recipe_ids)}."
+            )
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.popularity import rebuild_rankings, rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Сворачивает новые добавления в избранное и корзину в почасовые "
+        "срезы и пересобирает рейтинги популярных рецептов. Запускается "
+        "периодически."
+    )
+
+    def handle(self, *args, **options):
+        buckets = rollup()
+        rebuild_rankings()
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересчитано почасовых срезов: {buckets}.")
+        )
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.feed import trim_feeds
+
+
+class Command(BaseCommand):
+    help = "Обрезает ленты подписок до FEED['MAX_LENGTH'] последних записей."
+
+    def handle(self, *args, **options):
+        deleted = trim_feeds(settings.FEED["MAX_LENGTH"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено записей ленты: {deleted}.")
+        )
@@ -0,0 +1,142 @@
+"""
+Множества подписок, избранного и корзины пользователя в памяти воркера.
+
+Флаги is_subscribed, is_favorited и is_in_shopping_cart отвечаются по
+отсортированным массивам id без запросов к БД. Множества загружаются
+тремя запросами при первом обращении и хранятся в LRU (TTLCache) не
+более чем для MEMBERSHIPS["MAX_USERS"] пользователей. Множество длиннее
+MEMBERSHIPS["MAX_IDS"] не кэшируется: для такого пользователя флаги
+страницы загружаются одним запросом (api.loaders).
+
+Актуальность между воркерами поддерживает поколение пользователя в
+SharedCounters. Воркер, изменивший связь, обновляет свой массив на месте
+и увеличивает поколение; остальные видят новое поколение и загружают
+множества заново.
+"""
+
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+from django.conf import settings
+
+from api.caches import TTLCache
+from foodgram.shared_memory import SharedCounters
+from recipes.models import Favorite, ShoppingCart, Subscription
+
+SUBSCRIPTIONS = "subscriptions"
+FAVORITES = "favorites"
+SHOPPING_CART = "shopping_cart"
+
+SOURCES = {
+    SUBSCRIPTIONS: (Subscription, "author_id"),
+    FAVORITES: (Favorite, "recipe_id"),
+    SHOPPING_CART: (ShoppingCart, "recipe_id"),
+}
+RELATION_KINDS = {Favorite: FAVORITES, ShoppingCart: SHOPPING_CART}
+
+
+class Memberships:
+    """Отсортированные массивы id (array("q")) по видам связей."""
+
+    def __init__(self, generation, sets):
+        self.generation = generation
+        self.sets = sets
+
+    def contains(self, kind, object_id):
+        """True/False или None, если множество не кэшировано."""
+        ids = self.sets[kind]
+        if ids is None:
+            return None
+        index = bisect_left(ids, object_id)
+        return index < len(ids) and ids[index] == object_id
+
+    def update(self, kind, object_id, added):
+        ids = self.sets[kind]
+        if ids is None:
+            return
+        index = bisect_left(ids, object_id)
+        present = index < len(ids) and ids[index] == object_id
+        if added == present:
+            return
+        # Копия вместо изменения на месте: потоки, читающие старый массив,
+        # не увидят его в промежуточном состоянии.
+        ids = array("q", ids)
+        if added:
+            ids.insert(index, object_id)
+        else:
+            del ids[index]
+        too_many = len(ids) > settings.MEMBERSHIPS["MAX_IDS"]
+        self.sets[kind] = None if too_many else ids
+
+
+@lru_cache(maxsize=None)
+def generations():
+    return SharedCounters("memberships")
+
+
+@lru_cache(maxsize=None)
+def _cache():
+    options = settings.MEMBERSHIPS
+    return TTLCache(options["MAX_USERS"], options["TTL"])
+
+
+def load_memberships(user_id, generation):
+    limit = settings.MEMBERSHIPS["MAX_IDS"]
+    sets = {}
+    for kind, (model, column) in SOURCES.items():
+        ids = list(
+            model.objects.filter(user_id=user_id)
+            .order_by(column)
+            .values_list(column, flat=True)[: limit + 1]
+        )
+        sets[kind] = array("q", ids) if len(ids) <= limit else None
+    return Memberships(generation, sets)
+
+
+def get_memberships(user_id):
+    # Поколение читаем до загрузки: изменение во время загрузки
+    # увеличит его, и следующий запрос загрузит множества заново.
+    generation = generations().get(user_id)
+    memberships = _cache().get(user_id)
+    if memberships is None or memberships.generation != generation:
+        memberships = load_memberships(user_id, generation)
+        _cache().set(user_id, memberships)
+    return memberships
+
+
+def request_memberships(request):
+    """Множества текущего пользователя на весь запрос; None для анонима."""
+    if request is None or not request.user.is_authenticated:
+        return None
+    if not hasattr(request, "_memberships"):
+        request._memberships = get_memberships(request.user.pk)
+    return request._memberships
+
+
+def is_member(request, kind, object_id):
+    """True/False по кэшу или None, если ответ нужно взять из БД."""
+    memberships = request_memberships(request)
+    if memberships is None:
+        return False
+    return memberships.contains(kind, object_id)
+
+
+def record_change(user_id, kind, object_id, added):
+    """Связь пользователя добавлена или удалена: обновляет кэш воркера."""
+    generation = generations().incr(user_id)
+    memberships = _cache().get(user_id)
+    if memberships is None:
+        return
+    if memberships.generation != generation - 1:
+        # Между нашей загрузкой и изменением менял другой воркер.
+        _cache().pop(user_id)
+        return
+    memberships.update(kind, object_id, added)
+    memberships.generation = generation
+
+
+def invalidate(user_id):
+    """Связи пользователя изменены массово: все воркеры загрузят их заново."""
+    generations().incr(user_id)
+    _cache().pop(user_id)
@@ -0,0 +1,86 @@
+"""
+«Что приготовить»: поиск рецептов по имеющимся ингредиентам.
+
+Инвертированный индекс «ингредиент → битовое множество рецептов» плюс
+множества рецептов по числу ингредиентов. Для набора продуктов
+поблочно складываем множества его ингредиентов в побитовый счётчик —
+получаем, сколько продуктов есть у каждого рецепта, — и сравниваем
+с размером рецепта: недостаёт size - count ингредиентов.
+"""
+
+from foodgram.bitmaps import Bitmap, add_to_counter, at_least, iter_dense
+from recipes.indexes import RecipeIndexHolder
+
+
+class PantryIndex:
+    def __init__(self):
+        self.postings = {}
+        self.sizes = {}
+        self.journal_position = 0
+
+    @classmethod
+    def build(cls, recipes):
+        index = cls()
+        for recipe_id in sorted(recipes):
+            index._insert(recipe_id, recipes[recipe_id])
+        return index
+
+    def add(self, recipe_id, ingredient_ids):
+        self.remove(recipe_id)
+        self._insert(recipe_id, ingredient_ids)
+
+    def remove(self, recipe_id):
+        # Состав рецептов не храним ради памяти: удаление проходит
+        # по всем ингредиентам, но это дёшево и бывает редко.
+        for mapping in (self.postings, self.sizes):
+            for key, bitmap in list(mapping.items()):
+                bitmap.discard(recipe_id)
+                if not bitmap:
+                    del mapping[key]
+
+    def _insert(self, recipe_id, ingredient_ids):
+        if not ingredient_ids:
+            return
+        for ingredient_id in ingredient_ids:
+            self.postings.setdefault(ingredient_id, Bitmap()).add(recipe_id)
+        self.sizes.setdefault(len(ingredient_ids), Bitmap()).add(recipe_id)
+
+    def search(self, pantry, max_missing=0):
+        """
+        Рецепты, в которых есть хотя бы один продукт из pantry и
+        недостаёт не больше max_missing ингредиентов.
+
+        Возвращает {id рецепта: сколько ингредиентов недостаёт}.
+        """
+        postings = [
+            self.postings[pk] for pk in set(pantry) if pk in self.postings
+        ]
+        keys = set().union(*(bitmap.blocks for bitmap in postings))
+        found = {}
+        for key in sorted(keys):
+            counter = []
+            for bitmap in postings:
+                add_to_counter(counter, bitmap.dense(key))
+            for size, recipes in self.sizes.items():
+                members = recipes.dense(key)
+                seen = 0
+                for missing in range(min(max_missing, size - 1) + 1):
+                    matched = members & at_least(counter, size - missing)
+                    for recipe_id in iter_dense(key, matched & ~seen):
+                        found[recipe_id] = missing
+                    seen = matched
+        return found
+
+
+_holder = RecipeIndexHolder(PantryIndex.build)
+
+
+def cookable_recipes(pantry, max_missing=0):
+    """
+    Пары (id рецепта, недостающих ингредиентов) для рецептов, которые
+    можно приготовить из pantry, докупив не больше max_missing
+    ингредиентов: сначала с меньшей нехваткой, затем новые.
+    """
+    with _holder.lock:
+        found = _holder.get().search(pantry, max_missing)
+    return sorted(found.items(), key=lambda item: (item[1], -item[0]))
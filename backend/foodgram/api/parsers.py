@@ -0,0 +1,34 @@
+"""
+Быстрые парсеры тел запросов: пара к api.renderers.
+
+Тело с base64-картинкой рецепта занимает сотни килобайт, и стандартный
+json.loads заметно дольше orjson.loads.
+"""
+
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from api.renderers import MessagePackRenderer, ORJSONRenderer, msgpack
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class MessagePackParser(BaseParser):
+    media_type = MessagePackRenderer.media_type
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(
+                stream.read(), raw=False, strict_map_key=False
+            )
+        except (ValueError, TypeError) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
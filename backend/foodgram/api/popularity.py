@@ -0,0 +1,112 @@
+"""
+Рейтинг популярных рецептов по окнам времени.
+
+Периодическая команда rollup_popularity сворачивает новые записи
+Favorite и ShoppingCart в почасовые срезы RecipePopularity и
+пересчитывает из них готовые рейтинги PopularRecipe. Запрос к API
+читает только готовый рейтинг.
+
+Срез за час пересчитывается целиком, поэтому свёртка идемпотентна:
+повторный запуск или запуск с перекрытием ничего не удваивает.
+Удаление из избранного отражается, пока его час входит в перекрытие
+(POPULARITY["LOOKBACK_HOURS"]).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from recipes.models import (
+    Favorite,
+    PopularRecipe,
+    RecipePopularity,
+    ShoppingCart,
+)
+
+WINDOWS = {
+    PopularRecipe.WINDOW_DAY: timedelta(days=1),
+    PopularRecipe.WINDOW_WEEK: timedelta(weeks=1),
+    PopularRecipe.WINDOW_ALL: None,
+}
+
+
+def _hourly_counts(model, since):
+    rows = model.objects.all()
+    if since is not None:
+        rows = rows.filter(created__gte=since)
+    return (
+        rows.annotate(hour=TruncHour("created"))
+        .values_list("recipe_id", "hour")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+
+
+def rollup(now=None):
+    """Пересчитывает почасовые срезы начиная с последнего свёрнутого часа."""
+    now = now or timezone.now()
+    last_hour = RecipePopularity.objects.aggregate(last=Max("hour"))["last"]
+    since = None
+    if last_hour is not None:
+        lookback = timedelta(hours=settings.POPULARITY["LOOKBACK_HOURS"])
+        since = min(last_hour, now.replace(minute=0, second=0, microsecond=0))
+        since -= lookback
+
+    buckets = {}
+    sources = (("favorites", Favorite), ("shopping_carts", ShoppingCart))
+    for field, model in sources:
+        for recipe_id, hour, count in _hourly_counts(model, since).iterator():
+            bucket = buckets.setdefault(
+                (recipe_id, hour),
+                RecipePopularity(recipe_id=recipe_id, hour=hour),
+            )
+            setattr(bucket, field, count)
+
+    with transaction.atomic():
+        stale = RecipePopularity.objects.all()
+        if since is not None:
+            stale = stale.filter(hour__gte=since)
+        stale.delete()
+        RecipePopularity.objects.bulk_create(buckets.values(), batch_size=1000)
+    return len(buckets)
+
+
+def rebuild_rankings(now=None):
+    """Собирает рейтинги всех окон из почасовых срезов."""
+    now = now or timezone.now()
+    weights = settings.POPULARITY["WEIGHTS"]
+    size = settings.POPULARITY["SIZE"]
+    for window, length in WINDOWS.items():
+        buckets = RecipePopularity.objects.all()
+        if length is not None:
+            buckets = buckets.filter(hour__gt=now - length)
+        top = (
+            buckets.values("recipe_id")
+            .annotate(
+                total_favorites=Sum("favorites"),
+                total_shopping_carts=Sum("shopping_carts"),
+            )
+            .annotate(
+                score=F("total_favorites") * weights["favorites"]
+                + F("total_shopping_carts") * weights["shopping_carts"]
+            )
+            .order_by("-score", "-recipe_id")[:size]
+        )
+        ranking = [
+            PopularRecipe(
+                window=window,
+                position=position,
+                recipe_id=row["recipe_id"],
+                favorites=row["total_favorites"],
+                shopping_carts=row["total_shopping_carts"],
+                score=row["score"],
+            )
+            for position, row in enumerate(top, start=1)
+        ]
+        with transaction.atomic():
+            PopularRecipe.objects.filter(window=window).delete()
+            PopularRecipe.objects.bulk_create(ranking)
@@ -0,0 +1,267 @@
+"""
+Добавление и удаление избранного, корзины и подписок одним оператором SQL.
+
+Прежняя схема (SELECT рецепта, get_or_create, а на удаление — SELECT и
+DELETE) делала несколько обращений к БД, и двойное нажатие могло упасть
+с IntegrityError между SELECT и INSERT. Здесь каждое действие — один
+оператор PostgreSQL: INSERT ... ON CONFLICT DO NOTHING RETURNING или
+DELETE ... RETURNING. Параллельный дубль просто не вставляет и не
+удаляет ничего, и ответ получается тот же, что для повторного запроса.
+
+Пакетные варианты (api.batch) так же делают одно действие над всеми id
+одним оператором; что добавлено или удалено, определяется только по
+строкам из RETURNING.
+
+Сигналы ORM на сырой SQL не срабатывают, поэтому запись журнала
+изменений (api.changes) вставляется тем же оператором, в CTE.
+"""
+
+from django.db import connection
+
+from api.changes import CHANGE_KINDS
+from recipes.models import Change, Recipe, Subscription, User
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def add_recipe_relation(model, user_id, recipe_id):
+    """
+    Добавляет рецепт в избранное или корзину (model). Возвращает
+    (рецепт или None, если его нет; создана ли связь).
+    """
+    with connection.cursor() as cursor:
+        # FOR KEY SHARE не даёт удалить рецепт до конца транзакции:
+        # вставка не упадёт на внешнем ключе.
+        cursor.execute(
+            f"""
+            WITH recipe AS (
+                SELECT id, name, image, cooking_time
+                FROM {_table(Recipe)}
+                WHERE id = %(recipe)s
+                FOR KEY SHARE
+            ), added AS (
+                INSERT INTO {_table(model)} (user_id, recipe_id, created)
+                SELECT %(user)s, id, now() FROM recipe
+                ON CONFLICT (user_id, recipe_id) DO NOTHING
+                RETURNING recipe_id
+            ), logged AS (
+                INSERT INTO {_table(Change)}
+                    (kind, action, owner, object_id, txid, created)
+                SELECT %(kind)s, %(action)s, %(user)s, recipe_id,
+                       txid_current(), now()
+                FROM added
+            )
+            SELECT id, name, image, cooking_time, EXISTS (SELECT 1 FROM added)
+            FROM recipe
+            """,
+            {
+                "recipe": recipe_id,
+                "user": user_id,
+                "kind": CHANGE_KINDS[model],
+                "action": Change.CREATED,
+            },
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None, False
+    recipe_id, name, image, cooking_time, created = row
+    recipe = Recipe(
+        id=recipe_id, name=name, image=image, cooking_time=cooking_time
+    )
+    return recipe, created
+
+
+def remove_recipe_relation(model, user_id, recipe_id):
+    """Удаляет рецепт из избранного или корзины; False, если его не было."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH removed AS (
+                DELETE FROM {_table(model)}
+                WHERE user_id = %(user)s AND recipe_id = %(recipe)s
+                RETURNING recipe_id
+            ), logged AS (
+                INSERT INTO {_table(Change)}
+                    (kind, action, owner, object_id, txid, created)
+                SELECT %(kind)s, %(action)s, %(user)s, recipe_id,
+                       txid_current(), now()
+                FROM removed
+            )
+            SELECT count(*) FROM removed
+            """,
+            {
+                "recipe": recipe_id,
+                "user": user_id,
+                "kind": CHANGE_KINDS[model],
+                "action": Change.DELETED,
+            },
+        )
+        return cursor.fetchone()[0] > 0
+
+
+def add_recipe_relations(model, user_id, recipe_ids):
+    """
+    Добавляет рецепты из recipe_ids в избранное или корзину (model).
+    Возвращает (id существующих рецептов, id рецептов, связь с которыми
+    создана этим запросом).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH recipe AS (
+                SELECT id
+                FROM {_table(Recipe)}
+                WHERE id = ANY(%(recipes)s::bigint[])
+                FOR KEY SHARE
+            ), added AS (
+                INSERT INTO {_table(model)} (user_id, recipe_id, created)
+                SELECT %(user)s, id, now() FROM recipe
+                ON CONFLICT (user_id, recipe_id) DO NOTHING
+                RETURNING recipe_id
+            ), logged AS (
+                INSERT INTO {_table(Change)}
+                    (kind, action, owner, object_id, txid, created)
+                SELECT %(kind)s, %(action)s, %(user)s, recipe_id,
+                       txid_current(), now()
+                FROM added
+            )
+            SELECT recipe.id, added.recipe_id IS NOT NULL
+            FROM recipe LEFT JOIN added ON added.recipe_id = recipe.id
+            """,
+            {
+                "recipes": list(recipe_ids),
+                "user": user_id,
+                "kind": CHANGE_KINDS[model],
+                "action": Change.CREATED,
+            },
+        )
+        rows = cursor.fetchall()
+    return {pk for pk, _ in rows}, {pk for pk, created in rows if created}
+
+
+def remove_recipe_relations(model, user_id, recipe_ids):
+    """Удаляет рецепты из избранного или корзины; возвращает id удалённых."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH removed AS (
+                DELETE FROM {_table(model)}
+                WHERE user_id = %(user)s
+                    AND recipe_id = ANY(%(recipes)s::bigint[])
+                RETURNING recipe_id
+            ), logged AS (
+                INSERT INTO {_table(Change)}
+                    (kind, action, owner, object_id, txid, created)
+                SELECT %(kind)s, %(action)s, %(user)s, recipe_id,
+                       txid_current(), now()
+                FROM removed
+            )
+            SELECT recipe_id FROM removed
+            """,
+            {
+                "recipes": list(recipe_ids),
+                "user": user_id,
+                "kind": CHANGE_KINDS[model],
+                "action": Change.DELETED,
+            },
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def add_subscription(user_id, author_id):
+    """
+    Подписывает пользователя на автора. Возвращает подписку или None,
+    если она уже была. Подписка на популярного автора (у которого уже
+    есть подписки с fan_out=False) создаётся с fan_out=False.
+    """
+    table = _table(Subscription)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (user_id, author_id, fan_out)
+            SELECT %(user)s, %(author)s, NOT EXISTS (
+                SELECT 1 FROM {table}
+                WHERE author_id = %(author)s AND NOT fan_out
+            )
+            ON CONFLICT (user_id, author_id) DO NOTHING
+            RETURNING id, fan_out
+            """,
+            {"user": user_id, "author": author_id},
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return Subscription(
+        id=row[0], user_id=user_id, author_id=author_id, fan_out=row[1]
+    )
+
+
+def remove_subscription(user_id, author_id):
+    """Отписывает пользователя от автора; False, если подписки не было."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DELETE FROM {_table(Subscription)}
+            WHERE user_id = %s AND author_id = %s
+            RETURNING id
+            """,
+            [user_id, author_id],
+        )
+        return cursor.fetchone() is not None
+
+
+def add_subscriptions(user_id, author_ids):
+    """
+    Подписывает пользователя на авторов из author_ids (кроме него самого).
+    Возвращает (id существующих авторов, созданные подписки); fan_out
+    выбирается так же, как в add_subscription.
+    """
+    table = _table(Subscription)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH author AS (
+                SELECT id
+                FROM {_table(User)}
+                WHERE id = ANY(%(authors)s::bigint[]) AND id <> %(user)s
+                FOR KEY SHARE
+            ), added AS (
+                INSERT INTO {table} (user_id, author_id, fan_out)
+                SELECT %(user)s, author.id, NOT EXISTS (
+                    SELECT 1 FROM {table}
+                    WHERE author_id = author.id AND NOT fan_out
+                )
+                FROM author
+                ON CONFLICT (user_id, author_id) DO NOTHING
+                RETURNING id, author_id, fan_out
+            )
+            SELECT author.id, added.id, added.fan_out
+            FROM author LEFT JOIN added ON added.author_id = author.id
+            """,
+            {"authors": list(author_ids), "user": user_id},
+        )
+        rows = cursor.fetchall()
+    subscriptions = [
+        Subscription(
+            id=pk, user_id=user_id, author_id=author_id, fan_out=fan_out
+        )
+        for author_id, pk, fan_out in rows
+        if pk is not None
+    ]
+    return {author_id for author_id, _, _ in rows}, subscriptions
+
+
+def remove_subscriptions(user_id, author_ids):
+    """Отписывает пользователя от авторов; возвращает id отписанных."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DELETE FROM {_table(Subscription)}
+            WHERE user_id = %s AND author_id = ANY(%s::bigint[])
+            RETURNING author_id
+            """,
+            [user_id, list(author_ids)],
+        )
+        return {row[0] for row in cursor.fetchall()}
@@ -0,0 +1,53 @@
+"""
+Быстрые рендереры ответов API.
+
+ORJSONRenderer — замена стандартного JSONRenderer на orjson: тот же
+application/json, но сериализация в разы быстрее. Типы, которые orjson
+не знает (Decimal, ленивые строки, QuerySet), и datetime передаются
+стандартному кодировщику DRF, поэтому ответ совпадает с прежним.
+
+MessagePackRenderer отдаёт application/x-msgpack клиентам, которые
+просят его в Accept. Включается настройкой API_MSGPACK и требует пакета
+msgpack.
+"""
+
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack ставится только по желанию
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+
+def to_builtin(obj):
+    """Приводит значения, неизвестные orjson и msgpack, как это делает DRF."""
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        options = self.options
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            options |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=to_builtin, option=options)
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/x-msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=to_builtin, datetime=False)
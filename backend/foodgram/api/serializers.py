@@ -1,4 +1,5 @@
-from django.db import transaction
+from django.conf import settings
+from django.db import models, transaction
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 from django.core.files.base import ContentFile
@@ -6,13 +7,16 @@ import base64
 
 from rest_framework.pagination import LimitOffsetPagination
 
+from api.feed import fan_out_recipe
+from api import loaders
+from api.memberships import FAVORITES, SHOPPING_CART, SUBSCRIPTIONS, is_member
 from api.utils import Base64ImageField
 from recipes.models import (
     User,
     Recipe,
     RecipeIngredient,
     Ingredient,
-    Favorite,
+    Change,
 )
 
 
@@ -21,6 +25,28 @@ class Pagination(LimitOffsetPagination):
     max_limit = 100  # Ограничение
 
 
+class SparseFieldsMixin:
+    """
+    Сериализатор с выбором полей: fields=("id", "name") оставляет только
+    перечисленные поля верхнего уровня. Вложенные сериализаторы не
+    затрагиваются.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.selected_fields = fields
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if self.selected_fields is None:
+            return fields
+        return {
+            name: field
+            for name, field in fields.items()
+            if name in self.selected_fields
+        }
+
+
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Сериализатор для краткого представления рецепта (используется в избранном)."""
 
@@ -31,7 +57,33 @@ class RecipeShortSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "image", "cooking_time")
 
 
-class UserProfileSerializer(UserSerializer):
+class BatchListSerializer(serializers.ListSerializer):
+    """
+    Список, который перед выводом передаёт все объекты
+    в prime(request, instances) сериализатора элемента: тот регистрирует
+    их ключи в загрузчиках запроса (api.loaders), и связанные данные
+    загружаются пакетом.
+    """
+
+    def to_representation(self, data):
+        if isinstance(data, models.Manager):
+            data = data.all()
+        instances = list(data)
+        request = self.context.get("request")
+        if request is not None:
+            self.child.prime(request, instances)
+        return super().to_representation(instances)
+
+
+def relation_flag(request, kind, loader, object_id):
+    """Флаг связи текущего пользователя: из api.memberships или загрузчика."""
+    cached = is_member(request, kind, object_id)
+    if cached is not None:
+        return cached
+    return loaders.load(request, loader, object_id)
+
+
+class UserProfileSerializer(SparseFieldsMixin, UserSerializer):
     """Сериализатор профиля пользователя с дополнительными полями."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -40,12 +92,16 @@ class UserProfileSerializer(UserSerializer):
     class Meta(UserSerializer.Meta):
         model = User
         fields = UserSerializer.Meta.fields + ("is_subscribed", "avatar")
+        list_serializer_class = BatchListSerializer
+
+    def prime(self, request, users):
+        if "is_subscribed" in self.fields:
+            loaders.prime(request, "subscribed", [user.pk for user in users])
 
     def get_is_subscribed(self, user_obj):
-        current_user = self.context["request"].user
-        if not current_user.is_authenticated:
-            return False
-        return user_obj.followers.filter(user=current_user).exists()
+        return relation_flag(
+            self.context["request"], SUBSCRIPTIONS, "subscribed", user_obj.pk
+        )
 
     def get_avatar(self, user_obj):
         if user_obj.avatar:
@@ -57,25 +113,30 @@ class UserSubscriptionSerializer(UserProfileSerializer):
     """Сериализатор подписок с поддержкой `recipes_limit`."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(source="recipes.count", read_only=True)
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = UserProfileSerializer.Meta.fields + ("recipes", "recipes_count")
+        list_serializer_class = BatchListSerializer
+
+    def prime(self, request, users):
+        super().prime(request, users)
+        author_ids = [user.pk for user in users]
+        loaders.prime(request, "author_recipes", author_ids)
+        loaders.prime(request, "recipes_count", author_ids)
 
     def get_recipes(self, obj):
         request = self.context.get("request")
-        recipes_limit = request.query_params.get("recipes_limit")
-
-        queryset = obj.recipes.all()
-
-        if recipes_limit and recipes_limit.isdigit():
-            queryset = queryset[: int(recipes_limit)]
-
         return RecipeShortSerializer(
-            queryset, many=True, context={"request": request}
+            loaders.load(request, "author_recipes", obj.pk),
+            many=True,
+            context={"request": request},
         ).data
 
+    def get_recipes_count(self, obj):
+        return loaders.load(self.context["request"], "recipes_count", obj.pk)
+
 
 class AvatarSerializer(serializers.ModelSerializer):
     avatar = serializers.CharField(write_only=True, required=True)
@@ -112,14 +173,12 @@ class AvatarSerializer(serializers.ModelSerializer):
 class IngredientInRecipeWriteSerializer(serializers.ModelSerializer):
     """
     Сериализатор для записи одного ингредиента в рецепт.
+
+    Существование ингредиентов проверяет RecipeWriteSerializer одним
+    запросом на весь список.
     """
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        required=True,
-        source="ingredient",
-        error_messages={"does_not_exist": "Ингредиент с таким ID не найден."},
-    )
+    id = serializers.IntegerField(min_value=1, source="ingredient_id")
     amount = serializers.IntegerField(min_value=1, required=True)
 
     class Meta:
@@ -156,11 +215,26 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Рецепт должен содержать хотя бы один ингредиент."
             )
-        ingredient_ids = [item["ingredient"].id for item in ingredients_data]
+        ingredient_ids = [item["ingredient_id"] for item in ingredients_data]
         if len(ingredient_ids) != len(set(ingredient_ids)):
             raise serializers.ValidationError(
                 "Ингредиенты в рецепте не должны повторяться."
             )
+        existing = set(
+            Ingredient.objects.filter(id__in=ingredient_ids).values_list(
+                "id", flat=True
+            )
+        )
+        if len(existing) != len(ingredient_ids):
+            # Ошибки по позициям, как у поля-списка.
+            raise serializers.ValidationError(
+                [
+                    {}
+                    if pk in existing
+                    else {"id": ["Ингредиент с таким ID не найден."]}
+                    for pk in ingredient_ids
+                ]
+            )
         return ingredients_data
 
     @transaction.atomic
@@ -168,6 +242,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         ingredients_data = validated_data.pop("ingredients")
         recipe = super().create(validated_data)
         self._create_recipe_ingredients(recipe, ingredients_data)
+        fan_out_recipe(recipe)
         return recipe
 
     @transaction.atomic
@@ -178,21 +253,55 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                 {"ingredients": "Поле ingredients обязательно при обновлении."}
             )
         instance = super().update(instance, validated_data)
-        if ingredients_data is not None:
-            instance.recipe_ingredients.all().delete()
-            self._create_recipe_ingredients(instance, ingredients_data)
+        self._update_recipe_ingredients(instance, ingredients_data)
         return instance
 
     def _create_recipe_ingredients(self, recipe, ingredients_data):
         RecipeIngredient.objects.bulk_create(
             RecipeIngredient(
                 recipe=recipe,
-                ingredient=item["ingredient"],
+                ingredient_id=item["ingredient_id"],
                 amount=item["amount"],
             )
             for item in ingredients_data
         )
 
+    def _update_recipe_ingredients(self, recipe, ingredients_data):
+        """
+        Применяет к ингредиентам рецепта только разницу: одним запросом
+        удаляет убранные, одним обновляет изменившиеся количества и
+        одним добавляет новые. Неизменные строки не трогаются.
+        """
+        current = {
+            row.ingredient_id: row
+            for row in recipe.recipe_ingredients.only(
+                "id", "recipe", "ingredient", "amount"
+            )
+        }
+        wanted = {
+            item["ingredient_id"]: item["amount"] for item in ingredients_data
+        }
+
+        removed = [row.pk for pk, row in current.items() if pk not in wanted]
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+        changed = []
+        for pk, amount in wanted.items():
+            row = current.get(pk)
+            if row is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ["amount"])
+        self._create_recipe_ingredients(
+            recipe,
+            [
+                item
+                for item in ingredients_data
+                if item["ingredient_id"] not in current
+            ],
+        )
+
     def to_representation(self, instance):
         return RecipeReadSerializer(instance, context=self.context).data
 
@@ -204,12 +313,10 @@ class RecipeReadSerializer(UserProfileSerializer):
     этот сериализатор к PATCH/POST/PUT-запросам.
     """
 
-    author = UserProfileSerializer(read_only=True)
-
-    # Список ингредиентов в виде массива {id, name, measurement_unit, amount}
-    ingredients = IngredientInRecipeReadSerializer(
-        many=True, read_only=True, source="recipe_ingredients"
-    )
+    # Автор и ингредиенты ({id, name, measurement_unit, amount}) берутся
+    # из карточки рецепта (api.cards), если она есть.
+    author = serializers.SerializerMethodField(read_only=True)
+    ingredients = serializers.SerializerMethodField(read_only=True)
 
     # Флаги, вычисляемые на лету
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
@@ -229,30 +336,118 @@ class RecipeReadSerializer(UserProfileSerializer):
             "cooking_time",
         )
         read_only_fields = fields
+        list_serializer_class = BatchListSerializer
+
+    def prime(self, request, recipes):
+        recipe_ids = [recipe.pk for recipe in recipes]
+        if "is_favorited" in self.fields:
+            loaders.prime(request, "favorited", recipe_ids)
+        if "is_in_shopping_cart" in self.fields:
+            loaders.prime(request, "in_shopping_cart", recipe_ids)
+        if "author" in self.fields:
+            loaders.prime(
+                request, "subscribed", [recipe.author_id for recipe in recipes]
+            )
+        # Без карточки автор и ингредиенты загружаются пакетом на страницу.
+        if "author" in self.fields or "ingredients" in self.fields:
+            without_card = [
+                recipe
+                for recipe in recipes
+                if getattr(recipe, "card", None) is None
+            ]
+            loaders.prime(
+                request, "users", [recipe.author_id for recipe in without_card]
+            )
+            loaders.prime(
+                request,
+                "recipe_ingredients",
+                [recipe.pk for recipe in without_card],
+            )
 
     def get_is_in_shopping_cart(self, obj):
-        """
-        Возвращаем True/False, есть ли этот рецепт в корзине у текущего пользователя.
-        Используем «ленивую» форму: user.is_authenticated и ...
-        """
-        user = self.context["request"].user
-        return (
-            user.is_authenticated and obj.in_shopping_carts.filter(user=user).exists()
+        """Есть ли рецепт в корзине текущего пользователя."""
+        return relation_flag(
+            self.context["request"], SHOPPING_CART, "in_shopping_cart", obj.pk
         )
 
     def get_is_favorited(self, obj):
-        """
-        Возвращаем True/False, есть ли этот рецепт в избранном у текущего пользователя.
-        Аналогичная логика.
-        """
-        user = self.context["request"].user
-        return (
-            user.is_authenticated
-            and Favorite.objects.filter(user=user, recipe=obj).exists()
+        """Есть ли рецепт в избранном текущего пользователя."""
+        return relation_flag(
+            self.context["request"], FAVORITES, "favorited", obj.pk
         )
 
+    def get_author(self, obj):
+        request = self.context["request"]
+        card = getattr(obj, "card", None)
+        if card is None:
+            author = loaders.load(request, "users", obj.author_id)
+            return UserProfileSerializer(author, context=self.context).data
+        subscribed = relation_flag(
+            request, SUBSCRIPTIONS, "subscribed", obj.author_id
+        )
+        return {
+            name: subscribed if name == "is_subscribed" else card.author[name]
+            for name in UserProfileSerializer.Meta.fields
+        }
+
+    def get_ingredients(self, obj):
+        card = getattr(obj, "card", None)
+        if card is None:
+            ingredients = loaders.load(
+                self.context["request"], "recipe_ingredients", obj.pk
+            )
+            return IngredientInRecipeReadSerializer(
+                ingredients, many=True
+            ).data
+        return card.ingredients
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ("id", "name", "measurement_unit")
+
+
+class BatchSerializer(serializers.Serializer):
+    """Пакет id для добавления и удаления: {"add": [...], "remove": [...]}."""
+
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        default=list,
+    )
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        default=list,
+    )
+
+    def validate(self, data):
+        # Повторы убираем, сохраняя порядок: результат идёт в том же порядке.
+        add = list(dict.fromkeys(data["add"]))
+        remove = list(dict.fromkeys(data["remove"]))
+        if not add and not remove:
+            raise serializers.ValidationError("Передайте id в add или remove.")
+        if len(add) + len(remove) > settings.BATCH["MAX_IDS"]:
+            raise serializers.ValidationError(
+                f"Не больше {settings.BATCH['MAX_IDS']} id за запрос."
+            )
+        both = set(add) & set(remove)
+        if both:
+            raise serializers.ValidationError(
+                f"id одновременно в add и remove: {sorted(both)}."
+            )
+        return {"add": add, "remove": remove}
+
+
+class ChangeSerializer(serializers.ModelSerializer):
+    """
+    Запись журнала изменений: id — id рецепта, owner — автор рецепта
+    или владелец связи.
+    """
+
+    id = serializers.IntegerField(source="object_id")
+
+    class Meta:
+        model = Change
+        fields = ("kind", "action", "id", "owner", "created")
@@ -0,0 +1,130 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import revoke_cached_token, revoke_cached_user
+from api.cards import (
+    USER_CARD_FIELDS,
+    refresh_author_cards,
+    refresh_cards_in_batches,
+)
+from api.changes import CHANGE_KINDS, log_change
+from recipes.indexes import recipe_changed
+from recipes.models import (
+    Change,
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    User,
+)
+
+
+@receiver(post_delete, sender=Token)
+def revoke_deleted_token(sender, instance, **kwargs):
+    """Выход (djoser token/logout) удаляет токен — сбрасываем его кэш."""
+    revoke_cached_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def revoke_saved_user(sender, instance, raw=False, **kwargs):
+    """
+    Любое сохранение пользователя (пароль, профиль, деактивация) делает
+    его копии в кэше токенов устаревшими. Поколение увеличиваем после
+    фиксации: до неё другой воркер ещё может закэшировать старую строку.
+    """
+    if raw:
+        return
+    transaction.on_commit(partial(revoke_cached_user, instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def reindex_similar_recipes(sender, instance, **kwargs):
+    # Ингредиенты записываются после самого рецепта, поэтому индекс
+    # обновляем после фиксации транзакции.
+    transaction.on_commit(partial(recipe_changed, instance.pk))
+
+
+# Журнал изменений (api.changes) пишется в транзакции самого изменения:
+# post_save и post_delete вызываются внутри неё.
+@receiver(post_save, sender=Recipe)
+def log_recipe_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    action = Change.CREATED if created else Change.UPDATED
+    log_change(Change.RECIPE, action, instance.author_id, instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def log_recipe_deleted(sender, instance, **kwargs):
+    log_change(Change.RECIPE, Change.DELETED, instance.author_id, instance.pk)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def log_relation_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        log_change(
+            CHANGE_KINDS[sender],
+            Change.CREATED,
+            instance.user_id,
+            instance.recipe_id,
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def log_relation_deleted(sender, instance, **kwargs):
+    log_change(
+        CHANGE_KINDS[sender],
+        Change.DELETED,
+        instance.user_id,
+        instance.recipe_id,
+    )
+
+
+# Карточки рецептов (api.cards) обновляются в транзакции изменения
+# профиля автора или ингредиента.
+@receiver(post_save, sender=User)
+def refresh_user_recipe_cards(
+    sender, instance, created, raw=False, update_fields=None, **kwargs
+):
+    if created or raw:
+        return
+    # Вход пользователя сохраняет только last_login.
+    if update_fields is not None and not USER_CARD_FIELDS & set(update_fields):
+        return
+    refresh_author_cards(instance)
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_ingredient_recipe_cards(
+    sender, instance, created, raw=False, **kwargs
+):
+    if created or raw:
+        return
+    refresh_cards_in_batches(
+        RecipeIngredient.objects.filter(ingredient=instance).values_list(
+            "recipe_id", flat=True
+        )
+    )
+
+
+@receiver(pre_delete, sender=Ingredient)
+def remember_ingredient_recipes(sender, instance, **kwargs):
+    # После удаления связи с рецептами уже удалены каскадом.
+    instance._card_recipe_ids = list(
+        RecipeIngredient.objects.filter(ingredient=instance).values_list(
+            "recipe_id", flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=Ingredient)
+def refresh_deleted_ingredient_cards(sender, instance, **kwargs):
+    refresh_cards_in_batches(getattr(instance, "_card_recipe_ids", ()))
@@ -0,0 +1,262 @@
+"""
+Похожие рецепты: индекс MinHash/LSH по наборам ингредиентов.
+
+Сигнатура рецепта — NUM_PERM минимумов хэшей его ингредиентов; доля
+совпавших позиций двух сигнатур оценивает коэффициент Жаккара их
+наборов. Сигнатура режется на BANDS полос, рецепты с одинаковой
+полосой попадают в одну корзину — кандидатов ищем только в корзинах
+запрашиваемого рецепта, без попарного сравнения со всем каталогом.
+Лучшие кандидаты переранжируются по точному Жаккару одним запросом.
+
+Все данные индекса лежат в плоских array: сигнатуры — подряд в порядке
+возрастания id, корзины — отсортированные ключи (хэш полосы << 32 | id).
+На миллион рецептов при настройках по умолчанию это ~270 МБ на воркер.
+
+Индекс строится командой build_similarity_index и читается воркерами
+из файла; изменения рецептов воркеры применяют из журнала (recipes.indexes).
+"""
+
+import os
+import pickle
+import random
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from heapq import nlargest
+
+from django.conf import settings
+
+from recipes.indexes import (
+    RecipeIndexHolder,
+    load_recipe_ingredients,
+    recipe_journal,
+)
+
+PRIME = (1 << 61) - 1
+SEED = 20240601
+ID_MASK = 0xFFFFFFFF
+
+
+def jaccard(first, second):
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+
+class MinHashIndex:
+    def __init__(self, num_perm, bands):
+        if num_perm % bands:
+            raise ValueError("NUM_PERM должно делиться на BANDS.")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        generator = random.Random(SEED)
+        self._coefficients = [
+            (generator.randrange(1, PRIME), generator.randrange(PRIME))
+            for _ in range(num_perm)
+        ]
+        self._ingredient_hashes = {}
+        self.ids = array("I")
+        self.signatures = array("I")
+        self.buckets = [array("Q") for _ in range(bands)]
+        self.journal_position = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, recipes, num_perm, bands):
+        """Строит индекс по {id рецепта: id ингредиентов} за один проход."""
+        index = cls(num_perm, bands)
+        keys = [[] for _ in range(bands)]
+        for recipe_id in sorted(recipes):
+            signature = index.signature(recipes[recipe_id])
+            index.ids.append(recipe_id)
+            index.signatures.extend(signature)
+            for band, key in enumerate(index._band_keys(recipe_id, signature)):
+                keys[band].append(key)
+        index.buckets = [array("Q", sorted(band_keys)) for band_keys in keys]
+        return index
+
+    def signature(self, ingredient_ids):
+        hashes = [self._hash_ingredient(pk) for pk in ingredient_ids]
+        return array("I", map(min, zip(*hashes)))
+
+    def get_signature(self, recipe_id):
+        slot = self._slot(recipe_id)
+        if slot is None:
+            return None
+        start = slot * self.num_perm
+        end = start + self.num_perm
+        return self.signatures[start:end]
+
+    def add(self, recipe_id, ingredient_ids):
+        self.remove(recipe_id)
+        if not ingredient_ids:
+            return
+        signature = self.signature(ingredient_ids)
+        slot = bisect_left(self.ids, recipe_id)
+        self.ids.insert(slot, recipe_id)
+        start = slot * self.num_perm
+        self.signatures[start:start] = signature
+        keys = self._band_keys(recipe_id, signature)
+        for bucket, key in zip(self.buckets, keys):
+            bucket.insert(bisect_left(bucket, key), key)
+
+    def remove(self, recipe_id):
+        slot = self._slot(recipe_id)
+        if slot is None:
+            return
+        start = slot * self.num_perm
+        end = start + self.num_perm
+        signature = self.signatures[start:end]
+        keys = self._band_keys(recipe_id, signature)
+        for bucket, key in zip(self.buckets, keys):
+            del bucket[bisect_left(bucket, key)]
+        del self.signatures[start:end]
+        del self.ids[slot]
+
+    def candidates(self, recipe_id, signature, max_bucket):
+        """id рецептов, совпавших с сигнатурой хотя бы в одной полосе."""
+        found = set()
+        for bucket, key in zip(self.buckets, self._band_keys(0, signature)):
+            start = bisect_left(bucket, key)
+            limit = min(len(bucket), start + max_bucket)
+            end = bisect_left(bucket, key + (1 << 32), start, limit)
+            found.update(item & ID_MASK for item in bucket[start:end])
+        found.discard(recipe_id)
+        return found
+
+    def estimate(self, signature, recipe_id):
+        other = self.get_signature(recipe_id)
+        if other is None:
+            return 0.0
+        return sum(a == b for a, b in zip(signature, other)) / self.num_perm
+
+    def _hash_ingredient(self, ingredient_id):
+        hashes = self._ingredient_hashes.get(ingredient_id)
+        if hashes is None:
+            hashes = self._ingredient_hashes[ingredient_id] = tuple(
+                (a * ingredient_id + b) % PRIME & ID_MASK
+                for a, b in self._coefficients
+            )
+        return hashes
+
+    def _band_keys(self, recipe_id, signature):
+        for start in range(0, self.num_perm, self.rows):
+            end = start + self.rows
+            rows = signature[start:end]
+            yield zlib.crc32(rows.tobytes()) << 32 | recipe_id
+
+    def _slot(self, recipe_id):
+        slot = bisect_left(self.ids, recipe_id)
+        if slot < len(self.ids) and self.ids[slot] == recipe_id:
+            return slot
+        return None
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(self, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as file:
+            return pickle.load(file)
+
+
+class _SimilarityIndexHolder(RecipeIndexHolder):
+    """Индекс из файла build_similarity_index, перечитывается после сборки."""
+
+    def __init__(self):
+        super().__init__(self._build)
+        self.mtime = None
+        self.checked_at = 0.0
+
+    def get(self):
+        with self.lock:
+            if self.index is not None and self._file_changed():
+                self.index = None
+            return super().get()
+
+    @staticmethod
+    def _build(recipes):
+        options = settings.SIMILARITY
+        return MinHashIndex.build(
+            recipes, options["NUM_PERM"], options["BANDS"]
+        )
+
+    def _file_changed(self):
+        now = time.monotonic()
+        if now - self.checked_at < settings.SIMILARITY["RELOAD_INTERVAL"]:
+            return False
+        self.checked_at = now
+        return self._mtime() != self.mtime
+
+    def _mtime(self):
+        try:
+            return os.stat(settings.SIMILARITY["INDEX_PATH"]).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def load(self):
+        options = settings.SIMILARITY
+        self.mtime = self._mtime()
+        self.checked_at = time.monotonic()
+        if self.mtime is None:
+            return self.rebuild()
+        index = MinHashIndex.load(options["INDEX_PATH"])
+        expected = (options["NUM_PERM"], options["BANDS"])
+        if (index.num_perm, index.bands) != expected:
+            return self.rebuild()
+        if index.journal_position > recipe_journal().position:
+            # Общая память очищена после сборки (перезапуск контейнера):
+            # применяем журнал с начала.
+            index.journal_position = 0
+        return index
+
+
+_holder = _SimilarityIndexHolder()
+
+
+def build_index():
+    """Строит индекс по всей таблице RecipeIngredient."""
+    return _holder.rebuild()
+
+
+def get_index():
+    return _holder.get()
+
+
+def similar_recipes(recipe_id, limit):
+    """
+    Возвращает до limit пар (id рецепта, коэффициент Жаккара)
+    по убыванию сходства.
+    """
+    options = settings.SIMILARITY
+    # Запросы к индексу не пересекаются с применением журнала
+    # в соседнем потоке.
+    with _holder.lock:
+        index = get_index()
+        signature = index.get_signature(recipe_id)
+        if signature is None:
+            ingredients = load_recipe_ingredients([recipe_id]).get(recipe_id)
+            if not ingredients:
+                return []
+            signature = index.signature(ingredients)
+        candidates = index.candidates(
+            recipe_id, signature, options["MAX_BUCKET"]
+        )
+        shortlist = nlargest(
+            limit * options["RERANK"],
+            candidates,
+            key=lambda pk: index.estimate(signature, pk),
+        )
+    recipes = load_recipe_ingredients([recipe_id, *shortlist])
+    target = recipes.pop(recipe_id, set())
+    scored = [
+        (pk, jaccard(target, ingredients))
+        for pk, ingredients in recipes.items()
+    ]
+    return nlargest(limit, scored, key=lambda item: (item[1], item[0]))
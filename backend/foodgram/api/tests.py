@@ -1 +1,482 @@
-# Create your tests here.
+import logging
+import threading
+from collections import Counter
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.utils import ConnectionRouter
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.authentication import StatelessJWTAuthentication
+from api.benchmarks import seed_catalog
+from api.management.commands.explain_hot_queries import (
+    find_seq_scans,
+    hot_queries,
+)
+from api.views import ChangeViewSet
+from foodgram.db_routers import ReplicaHealth
+
+from recipes.models import (
+    Change,
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Subscription,
+    User,
+)
+
+THREADS = 8
+ROUNDS = 40
+REPLICA = "replica_test"
+
+
+@skipUnless(
+    connection.vendor == "postgresql", "SQL api.relations — PostgreSQL"
+)
+@override_settings(THROTTLE={**settings.THROTTLE, "ENABLED": False})
+class RelationTogglesTest(TransactionTestCase):
+    """Добавление и удаление избранного, корзины и подписки (api.relations)."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="fan", email="fan@example.com"
+        )
+        self.author = User.objects.create_user(
+            username="author", email="author@example.com"
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name="Рецепт",
+            text="-",
+            cooking_time=1,
+            image="recipes/images/test.png",
+        )
+        self.urls = {
+            "favorite": f"/api/recipes/{self.recipe.pk}/favorite/",
+            "shopping_cart": f"/api/recipes/{self.recipe.pk}/shopping_cart/",
+            "subscribe": f"/api/users/{self.author.pk}/subscribe/",
+        }
+        # 400 и 404 здесь ожидаемы, не засоряем вывод.
+        request_logger = logging.getLogger("django.request")
+        self.addCleanup(request_logger.setLevel, request_logger.level)
+        request_logger.setLevel(logging.ERROR)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_repeated_requests(self):
+        client = self.client_for(self.user)
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                self.assertEqual(client.post(url).status_code, 201)
+                self.assertEqual(client.post(url).status_code, 400)
+                self.assertEqual(client.delete(url).status_code, 204)
+                self.assertEqual(client.delete(url).status_code, 404)
+
+        response = client.post(self.urls["favorite"])
+        self.assertEqual(response.data["id"], self.recipe.pk)
+        self.assertEqual(response.data["name"], self.recipe.name)
+        self.assertEqual(
+            client.post("/api/recipes/0/favorite/").status_code, 404
+        )
+        self.assertEqual(
+            client.delete("/api/users/abc/subscribe/").status_code, 404
+        )
+        self.assertEqual(
+            client.post(f"/api/users/{self.user.pk}/subscribe/").status_code,
+            400,
+        )
+
+    def test_batch(self):
+        client = self.client_for(self.user)
+        url = "/api/recipes/favorite/batch/"
+        missing = self.recipe.pk + 1000
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        response = client.post(
+            url,
+            {"add": [self.recipe.pk, missing], "remove": [missing + 1]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data,
+            {
+                "add": [
+                    {"id": self.recipe.pk, "status": "exists"},
+                    {"id": missing, "status": "not_found"},
+                ],
+                "remove": [{"id": missing + 1, "status": "absent"}],
+            },
+        )
+        response = client.post(
+            url, {"remove": [self.recipe.pk]}, format="json"
+        )
+        self.assertEqual(
+            response.data["remove"],
+            [{"id": self.recipe.pk, "status": "removed"}],
+        )
+        self.assertEqual(
+            Change.objects.filter(
+                owner=self.user.pk, kind=Change.FAVORITE
+            ).count(),
+            2,
+        )
+
+        response = client.post(
+            "/api/users/subscribe/batch/",
+            {"add": [self.author.pk, self.user.pk], "remove": [missing]},
+            format="json",
+        )
+        self.assertEqual(
+            response.data,
+            {
+                "add": [
+                    {"id": self.author.pk, "status": "added"},
+                    {"id": self.user.pk, "status": "self"},
+                ],
+                "remove": [{"id": missing, "status": "absent"}],
+            },
+        )
+        self.assertTrue(
+            Subscription.objects.filter(
+                user=self.user, author=self.author, fan_out=True
+            ).exists()
+        )
+
+    def test_concurrent_batches(self):
+        added, errors = Counter(), []
+        lock = threading.Lock()
+        url = "/api/recipes/shopping_cart/batch/"
+
+        def worker():
+            client = self.client_for(self.user)
+            local = Counter()
+            try:
+                for _ in range(ROUNDS):
+                    for key in ("add", "remove"):
+                        response = client.post(
+                            url, {key: [self.recipe.pk]}, format="json"
+                        )
+                        local[response.data[key][0]["status"]] += 1
+            except Exception as error:
+                with lock:
+                    errors.append(error)
+            finally:
+                connection.close()
+            with lock:
+                added.update(local)
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertGreater(added["added"], 0)
+        self.assertEqual(
+            added["added"] - added["removed"],
+            ShoppingCart.objects.filter(user=self.user).count(),
+        )
+        logged = Counter(
+            Change.objects.filter(
+                owner=self.user.pk, kind=Change.SHOPPING_CART
+            ).values_list("action", flat=True)
+        )
+        self.assertEqual(logged[Change.CREATED], added["added"])
+        self.assertEqual(logged[Change.DELETED], added["removed"])
+
+    def test_concurrent_toggles(self):
+        statuses, errors = Counter(), []
+        lock = threading.Lock()
+
+        def worker():
+            client = self.client_for(self.user)
+            local = Counter()
+            try:
+                for _ in range(ROUNDS):
+                    for name, url in self.urls.items():
+                        for method in ("post", "delete"):
+                            response = getattr(client, method)(url)
+                            local[name, method, response.status_code] += 1
+            except Exception as error:
+                with lock:
+                    errors.append(error)
+            finally:
+                connection.close()
+            with lock:
+                statuses.update(local)
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        allowed = {"post": {201, 400}, "delete": {204, 404}}
+        for (name, method, code), count in statuses.items():
+            self.assertIn(code, allowed[method], (name, method, count))
+
+        rows = {
+            "favorite": Favorite.objects.filter(
+                user=self.user, recipe=self.recipe
+            ),
+            "shopping_cart": ShoppingCart.objects.filter(
+                user=self.user, recipe=self.recipe
+            ),
+            "subscribe": Subscription.objects.filter(
+                user=self.user, author=self.author
+            ),
+        }
+        for name, queryset in rows.items():
+            with self.subTest(name):
+                added = statuses[name, "post", 201]
+                removed = statuses[name, "delete", 204]
+                self.assertGreater(added, 0)
+                self.assertEqual(added - removed, queryset.count())
+
+        for name, kind in (
+            ("favorite", Change.FAVORITE),
+            ("shopping_cart", Change.SHOPPING_CART),
+        ):
+            with self.subTest(name):
+                logged = Counter(
+                    Change.objects.filter(
+                        owner=self.user.pk,
+                        kind=kind,
+                        object_id=self.recipe.pk,
+                    ).values_list("action", flat=True)
+                )
+                self.assertEqual(
+                    logged[Change.CREATED], statuses[name, "post", 201]
+                )
+                self.assertEqual(
+                    logged[Change.DELETED], statuses[name, "delete", 204]
+                )
+
+
+@override_settings(
+    DATABASE_ROUTERS=["foodgram.db_routers.PrimaryReplicaRouter"],
+    DATABASE_ROUTING={
+        "REPLICAS": [REPLICA],
+        "STICKY_SECONDS": 60,
+        "HEALTH_CHECK_INTERVAL": 60,
+    },
+    THROTTLE={**settings.THROTTLE, "ENABLED": False},
+)
+class ReplicaRoutingTest(TransactionTestCase):
+    """Чтение с реплики, «липкость» после записи и возврат на primary."""
+
+    def setUp(self):
+        # Реплика — второе соединение с той же тестовой базой; роутер
+        # новый в каждом тесте, чтобы не переносить состояние реплик.
+        self.add_replica(connections["default"].settings_dict)
+        router.routers = ConnectionRouter().routers
+        self.user = User.objects.create_user(
+            username="reader", email="reader@example.com"
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user,
+            name="Рецепт",
+            text="-",
+            cooking_time=1,
+            image="recipes/images/test.png",
+        )
+        self.token = Token.objects.create(user=self.user)
+        request_logger = logging.getLogger("django.request")
+        self.addCleanup(request_logger.setLevel, request_logger.level)
+        request_logger.setLevel(logging.CRITICAL)
+
+    def add_replica(self, settings_dict):
+        if REPLICA in connections.databases:
+            connections[REPLICA].close()
+            del connections[REPLICA]
+        connections.databases[REPLICA] = dict(settings_dict)
+        self.addCleanup(self.remove_replica)
+
+    def remove_replica(self):
+        if REPLICA in connections.databases:
+            connections[REPLICA].close()
+            del connections[REPLICA]
+            del connections.databases[REPLICA]
+
+    def client_with_token(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        return client
+
+    def replica_queries(self, client, method, url):
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            response = getattr(client, method)(url)
+        return response, len(queries)
+
+    def test_safe_requests_read_from_replica(self):
+        response, reads = self.replica_queries(
+            APIClient(), "get", "/api/recipes/"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(reads, 0)
+
+        url = f"/api/recipes/{self.recipe.pk}/favorite/"
+        response, reads = self.replica_queries(
+            self.client_with_token(), "post", url
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(reads, 0)
+
+    def test_token_client_sticks_to_primary_after_write(self):
+        url = f"/api/recipes/{self.recipe.pk}/shopping_cart/"
+        response = self.client_with_token().post(url)
+        self.assertEqual(response.status_code, 201)
+
+        # Новый клиент без cookie: «липкость» определяется по токену.
+        response, reads = self.replica_queries(
+            self.client_with_token(), "get", "/api/recipes/"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(reads, 0)
+        self.assertTrue(response.data["results"][0]["is_in_shopping_cart"])
+
+        response, reads = self.replica_queries(
+            APIClient(), "get", "/api/recipes/"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(reads, 0)
+
+    def test_failed_replica_read_falls_back_to_primary(self):
+        self.add_replica(
+            {**connections["default"].settings_dict, "NAME": "missing_db"}
+        )
+        client = APIClient()
+        client.raise_request_exception = False
+        # Первая проверка считает реплику живой: ошибка случится при чтении.
+        with mock.patch.object(ReplicaHealth, "_probe", return_value=True):
+            with self.assertLogs("foodgram.middleware", "WARNING"):
+                response = client.get(f"/api/recipes/{self.recipe.pk}/")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["name"], self.recipe.name)
+            self.assertEqual(router.db_for_read(Recipe), "default")
+            (replica_router,) = router.routers
+            self.assertFalse(replica_router.health.is_healthy(REPLICA))
+
+
+@skipUnless(connection.vendor == "postgresql", "txid_current — PostgreSQL")
+@override_settings(THROTTLE={**settings.THROTTLE, "ENABLED": False})
+class ChangeLogTest(TransactionTestCase):
+    """Журнал изменений /api/changes/."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="sync", email="sync@example.com"
+        )
+        self.author = User.objects.create_user(
+            username="writer", email="writer@example.com"
+        )
+        Subscription.objects.create(user=self.user, author=self.author)
+
+    def test_stateless_jwt_user(self):
+        # В режиме AUTH_MODE=jwt на GET пользователь — TokenUser из
+        # claims токена, а не объект модели.
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+        with mock.patch.object(
+            ChangeViewSet,
+            "authentication_classes",
+            [StatelessJWTAuthentication],
+        ):
+            cursor = client.get("/api/changes/").data["cursor"]
+            recipe = Recipe.objects.create(
+                author=self.author,
+                name="Рецепт",
+                text="-",
+                cooking_time=1,
+                image="recipes/images/test.png",
+            )
+            response = client.get("/api/changes/", {"since": cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [change["id"] for change in response.data["changes"]],
+            [recipe.pk],
+        )
+
+
+class MultiGetTest(TestCase):
+    """Выборка нескольких объектов: ?ids=1,5,9."""
+
+    def test_ids(self):
+        author = User.objects.create_user(
+            username="cook", email="cook@example.com"
+        )
+        recipe = Recipe.objects.create(
+            author=author,
+            name="Рецепт",
+            text="-",
+            cooking_time=1,
+            image="recipes/images/test.png",
+        )
+        client = APIClient()
+        response = client.get("/api/recipes/", {"ids": f"{recipe.pk},0"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]], [recipe.pk]
+        )
+        self.assertEqual(response.data["missing"], [0])
+        # "²".isdigit() истинно, но int("²") — ошибка.
+        for ids in ("1,a", "", "²", "1,²"):
+            with self.subTest(ids=ids):
+                response = client.get("/api/recipes/", {"ids": ids})
+                self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN — PostgreSQL")
+class HotQueryPlansTest(TestCase):
+    """Горячие запросы (explain_hot_queries) идут по индексам."""
+
+    # Рецептов в каталоге; таблицы меньше половины этого размера
+    # планировщик вправе читать целиком.
+    ROWS = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {i}", measurement_unit="г")
+            for i in range(50)
+        )
+        # Каталог и планы одинаковы от запуска к запуску.
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT setseed(0)")
+        seed_catalog(cls.ROWS, cls.ROWS // 10)
+        cls.favorite = (
+            Favorite.objects.select_related("user").order_by("-id").first()
+        )
+        cls.author_id = Recipe.objects.values_list(
+            "author_id", flat=True
+        ).last()
+        cls.ingredient_id = Ingredient.objects.values_list(
+            "id", flat=True
+        ).first()
+
+    def test_no_seq_scans(self):
+        queries = hot_queries(
+            self.favorite.user,
+            self.favorite.recipe_id,
+            self.author_id,
+            self.ingredient_id,
+        )
+        failures = {
+            name: plan
+            for name, plan, large in find_seq_scans(queries, self.ROWS // 2)
+            if large
+        }
+        self.assertEqual(failures, {})
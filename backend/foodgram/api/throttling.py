@@ -0,0 +1,88 @@
+"""
+Ограничение частоты запросов общими для воркеров узла корзинами токенов.
+
+Лимиты задаются в THROTTLE["RATES"] для действия представления
+("recipes.list", "recipes.download_shopping_cart") и дополняют
+правило "default". Для каждого запроса проверяются до трёх корзин:
+
+- user — на пользователя (для аутентифицированных запросов);
+- ip — на адрес клиента (для анонимных);
+- route — общая на действие, защищает тяжёлые эндпоинты от всех сразу.
+
+Корзины лежат в foodgram.shared_memory, поэтому лимит общий для всех
+воркеров gunicorn узла и не требует Redis.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from foodgram import metrics
+from foodgram.shared_memory import SharedTokenBuckets
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+throttled_requests = metrics.counter(
+    "api_throttled_requests_total",
+    "Запросы, отклонённые ограничением частоты.",
+    ("route", "scope"),
+)
+
+
+@lru_cache(maxsize=None)
+def token_buckets():
+    return SharedTokenBuckets("throttle", settings.THROTTLE["SLOTS"])
+
+
+def parse_rate(rate):
+    """'60/min' → (ёмкость 60, пополнение 1 токен/с)."""
+    count, _, period = rate.partition("/")
+    count = int(count)
+    return count, count / PERIODS[period[0]]
+
+
+@lru_cache(maxsize=None)
+def route_rates(route):
+    """{scope: (ёмкость, токенов в секунду)} для действия."""
+    rates = settings.THROTTLE["RATES"]
+    rule = {**rates["default"], **rates.get(route, {})}
+    return {scope: parse_rate(rate) for scope, rate in rule.items() if rate}
+
+
+def route_name(view):
+    basename = getattr(view, "basename", None)
+    if basename and getattr(view, "action", None):
+        return f"{basename}.{view.action}"
+    return type(view).__name__
+
+
+class SharedTokenBucketThrottle(BaseThrottle):
+    def __init__(self):
+        self.wait_seconds = 0.0
+
+    def allow_request(self, request, view):
+        if not settings.THROTTLE["ENABLED"]:
+            return True
+        route = route_name(view)
+        rates = route_rates(route)
+        if request.user and request.user.is_authenticated:
+            keys = {"user": request.user.pk}
+        else:
+            keys = {"ip": self.get_ident(request)}
+        keys["route"] = ""
+
+        buckets = token_buckets()
+        for scope, ident in keys.items():
+            if scope not in rates:
+                continue
+            capacity, rate = rates[scope]
+            wait = buckets.take(f"{scope}:{ident}:{route}", capacity, rate)
+            if wait:
+                self.wait_seconds = wait
+                throttled_requests.inc(route=route, scope=scope)
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
 from api.views import (
+    ChangeViewSet,
     RecipeViewSet,
     IngredientViewSet,
     UserViewSet,
@@ -11,8 +13,12 @@ router = DefaultRouter()
 router.register(r"users", UserViewSet, basename="users")
 router.register(r"recipes", RecipeViewSet, basename="recipes")
 router.register(r"ingredients", IngredientViewSet, basename="ingredient")
+router.register(r"changes", ChangeViewSet, basename="changes")
 
 urlpatterns = [
     path("auth/", include("djoser.urls.authtoken")),
     path("", include(router.urls)),
 ]
+
+if settings.AUTH_MODE == "jwt":
+    urlpatterns.insert(1, path("auth/", include("djoser.urls.jwt")))
@@ -1,34 +1,63 @@
 from datetime import datetime
 
-from django.db.models import Sum
-from django.http import FileResponse
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Sum
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django_filters import FilterSet, NumberFilter, CharFilter
+from django_filters import BaseInFilter, FilterSet, NumberFilter, CharFilter
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.widgets import QueryArrayWidget
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet, ViewSet
 
 from recipes.models import (
     User,
-    Subscription,
     Recipe,
     Ingredient,
     ShoppingCart,
     Favorite,
     RecipeIngredient,
+    PopularRecipe,
 )
+from recipes.short_links import encode, recipe_exists
+from .batch import batch_recipe_relations, batch_subscriptions
+from .cards import refresh_recipe_card
+from .changes import CursorExpired, head_cursor, read_changes
+from .feed import (
+    backfill_feed,
+    get_feed_page,
+    remove_author_from_feed,
+)
+from .memberships import (
+    RELATION_KINDS,
+    SUBSCRIPTIONS,
+    record_change,
+)
+from .pantry import cookable_recipes
 from .permissions import IsAuthorOrReadOnly
+from .relations import (
+    add_recipe_relation,
+    add_subscription,
+    remove_recipe_relation,
+    remove_subscription,
+)
+from .similarity import similar_recipes
 from .serializers import (
     UserProfileSerializer,
     AvatarSerializer,
     Pagination,
     UserSubscriptionSerializer,
+    BatchSerializer,
+    ChangeSerializer,
     RecipeReadSerializer,
     RecipeWriteSerializer,
     RecipeShortSerializer,
@@ -36,7 +65,110 @@ from .serializers import (
 )
 
 
-class UserViewSet(DjoserUserViewSet):
+class SparseFieldsViewMixin:
+    """
+    ?fields=a,b — вернуть только эти поля, ?omit=c — все, кроме этих.
+
+    Работает для действий из sparse_fields_actions. Выбранные поля
+    передаются сериализатору, а get_queryset по ним решает, какие
+    колонки читать.
+    """
+
+    sparse_fields_actions = ("list", "retrieve")
+
+    def get_sparse_field_names(self):
+        raise NotImplementedError
+
+    def get_requested_fields(self):
+        """Множество выбранных полей или None, если параметров нет."""
+        if not hasattr(self, "_requested_fields"):
+            self._requested_fields = self._parse_requested_fields()
+        return self._requested_fields
+
+    def _parse_requested_fields(self):
+        if self.action not in self.sparse_fields_actions:
+            return None
+        params = self.request.query_params
+        if "fields" not in params and "omit" not in params:
+            return None
+        available = self.get_sparse_field_names()
+        selected = set(available)
+        errors = {}
+        for param in ("fields", "omit"):
+            if param not in params:
+                continue
+            names = {name for name in params[param].split(",") if name}
+            unknown = names - set(available)
+            if unknown:
+                listed = ", ".join(sorted(unknown))
+                errors[param] = f"Неизвестные поля: {listed}."
+            elif param == "fields":
+                selected &= names
+            else:
+                selected -= names
+        if errors:
+            raise ValidationError(errors)
+        return selected
+
+    def wants(self, field):
+        fields = self.get_requested_fields()
+        return fields is None or field in fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs["fields"] = fields
+        return super().get_serializer(*args, **kwargs)
+
+
+class MultiGetMixin:
+    """
+    ?ids=1,5,9 в списке — выборка нескольких объектов одним запросом.
+
+    Объекты берутся из get_queryset (с теми же колонками, что и список)
+    без фильтров и пагинации и возвращаются в
+    порядке id из запроса: {"results": [...], "missing": [id, ...]}.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if "ids" not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        ids = self.get_requested_ids()
+        objects = self.get_queryset().filter(pk__in=ids).order_by().in_bulk()
+        serializer = self.get_serializer(
+            [objects[pk] for pk in ids if pk in objects], many=True
+        )
+        return Response(
+            {
+                "results": serializer.data,
+                "missing": [pk for pk in ids if pk not in objects],
+            }
+        )
+
+    def get_requested_ids(self):
+        values = self.request.query_params["ids"].split(",")
+        if not all(value.isdecimal() for value in values):
+            raise ValidationError({"ids": "Передайте id через запятую."})
+        # Повторы убираем, сохраняя порядок.
+        ids = list(dict.fromkeys(int(value) for value in values))
+        if len(ids) > settings.BATCH["MAX_IDS"]:
+            raise ValidationError(
+                {"ids": f"Не больше {settings.BATCH['MAX_IDS']} id за запрос."}
+            )
+        return ids
+
+
+def user_columns(prefix=""):
+    """Колонки User, которые выводит UserProfileSerializer."""
+    names = [
+        name
+        for name in UserProfileSerializer.Meta.fields
+        if name not in ("is_subscribed",)
+    ]
+    return [prefix + name for name in names]
+
+
+class UserViewSet(MultiGetMixin, SparseFieldsViewMixin, DjoserUserViewSet):
     """
     Наследуемся от стандартного djoser.views.UserViewSet,
     чтобы переопределить/добавить нужные методы.
@@ -45,6 +177,26 @@ class UserViewSet(DjoserUserViewSet):
     pagination_class = Pagination
     queryset = User.objects.all()
     serializer_class = UserProfileSerializer
+    sparse_fields_actions = ("list", "retrieve", "me")
+
+    def get_sparse_field_names(self):
+        return UserProfileSerializer.Meta.fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ("list", "retrieve"):
+            return queryset
+        columns = [name for name in user_columns() if self.wants(name)]
+        return queryset.only("id", *columns)
+
+    def get_instance(self):
+        """
+        В режиме stateless JWT request.user — TokenUser без полей профиля,
+        поэтому для /users/me/ загружаем пользователя из БД.
+        """
+        if not isinstance(self.request.user, User):
+            return get_object_or_404(User, pk=self.request.user.pk)
+        return super().get_instance()
 
     def get_permissions(self):
         """Переопределяем разрешения для разных эндпоинтов."""
@@ -83,7 +235,7 @@ class UserViewSet(DjoserUserViewSet):
     def subscriptions(self, request):
         """Получение списка подписок текущего пользователя с поддержкой пагинации."""
         user = request.user
-        subscriptions = User.objects.filter(followers__user=user)
+        subscriptions = User.objects.filter(followers__user_id=user.pk)
 
         paginator = self.paginator
         paginated_subscriptions = paginator.paginate_queryset(subscriptions, request)
@@ -103,22 +255,25 @@ class UserViewSet(DjoserUserViewSet):
         url_path="subscribe",
     )
     def subscribe(self, request, id=None):
-        """Подписка и отписка на пользователя."""
+        """
+        Подписка и отписка на пользователя.
+
+        Подписка и отписка — по одному оператору (api.relations): повторный
+        или параллельный запрос получает 400 или 404, а не IntegrityError.
+        """
         user = request.user
-        author = self.get_object()
 
         if request.method == "POST":
+            author = self.get_object()
             if user == author:
                 return Response(
                     {"error": "Нельзя подписаться на самого себя."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            subscription, created = Subscription.objects.get_or_create(
-                user=user, author=author
-            )
+            subscription = add_subscription(user.pk, author.pk)
 
-            if not created:
+            if subscription is None:
                 return Response(
                     {
                         "error": f"Вы уже подписаны на пользователя {author.username} (ID: {author.id})."
@@ -126,14 +281,36 @@ class UserViewSet(DjoserUserViewSet):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
+            record_change(user.pk, SUBSCRIPTIONS, author.pk, added=True)
+            backfill_feed(subscription)
             serializer = UserSubscriptionSerializer(
                 author, context={"request": request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        get_object_or_404(Subscription, user=user, author=author).delete()
+        # Автора не читаем: нет ни автора, ни подписки — одинаково 404.
+        if not str(id).isdecimal():
+            raise Http404
+        if not remove_subscription(user.pk, int(id)):
+            raise Http404
+        record_change(user.pk, SUBSCRIPTIONS, int(id), added=False)
+        remove_author_from_feed(user, int(id))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[IsAuthenticated],
+        url_path="subscribe/batch",
+    )
+    def subscribe_batch(self, request):
+        """Подписка и отписка на нескольких авторов одним запросом."""
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            batch_subscriptions(request.user, **serializer.validated_data)
+        )
+
 
 class RecipePagination(PageNumberPagination):
     """Пагинация для рецептов."""
@@ -143,18 +320,112 @@ class RecipePagination(PageNumberPagination):
     max_page_size = 100
 
 
+class FeedPagination(BasePagination):
+    """
+    Keyset-пагинация ленты подписок.
+
+    ?cursor= — id последнего рецепта предыдущей страницы, ?limit= — размер.
+    """
+
+    default_limit = 10
+    max_limit = 100
+
+    def get_cursor(self, request):
+        cursor = request.query_params.get("cursor", "")
+        return int(cursor) if cursor.isdecimal() else None
+
+    def get_limit(self, request):
+        limit = request.query_params.get("limit", "")
+        if not limit.isdecimal() or int(limit) == 0:
+            return self.default_limit
+        return min(int(limit), self.max_limit)
+
+    def get_paginated_response(self, request, data, next_cursor):
+        next_url = None
+        if next_cursor is not None:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "cursor", next_cursor
+            )
+        return Response({"next": next_url, "results": data})
+
+
+class QueryListWidget(QueryArrayWidget):
+    """Список значений: ?name=1,2, ?name=1&name=2 или ?name[]=1&name[]=2."""
+
+    def value_from_datadict(self, data, files, name):
+        values = super().value_from_datadict(data, files, name)
+        return [
+            part.strip()
+            for value in values
+            for part in value.split(",")
+            if part.strip()
+        ]
+
+
+class NumberInFilter(BaseInFilter, NumberFilter):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("widget", QueryListWidget)
+        super().__init__(*args, **kwargs)
+
+
 class RecipeFilter(FilterSet):
     """
-    Фильтр для поиска рецептов по автору, избранному и корзине..
+    Фильтр для поиска рецептов по автору, ингредиентам, времени
+    приготовления, избранному и корзине.
+
+    Ингредиенты проверяются через EXISTS по индексу
+    (ingredient_id, recipe_id), время — по индексу (cooking_time, id).
     """
 
-    author = NumberFilter(field_name="author_id")
+    author = NumberInFilter(field_name="author_id")
+    ingredients = NumberInFilter(method="filter_ingredients")
+    exclude_ingredients = NumberInFilter(method="filter_exclude_ingredients")
+    cooking_time_min = NumberFilter(
+        field_name="cooking_time", lookup_expr="gte"
+    )
+    cooking_time_max = NumberFilter(
+        field_name="cooking_time", lookup_expr="lte"
+    )
     is_in_shopping_cart = NumberFilter(method="filter_in_shopping_cart")
     is_favorited = NumberFilter(method="filter_is_favorited")
 
     class Meta:
         model = Recipe
-        fields = ["author", "is_in_shopping_cart", "is_favorited"]
+        fields = [
+            "author",
+            "ingredients",
+            "exclude_ingredients",
+            "cooking_time_min",
+            "cooking_time_max",
+            "is_in_shopping_cart",
+            "is_favorited",
+        ]
+
+    @staticmethod
+    def _has_ingredient(ingredient_id):
+        return Exists(
+            RecipeIngredient.objects.filter(
+                recipe_id=OuterRef("pk"), ingredient_id=ingredient_id
+            )
+        )
+
+    def filter_ingredients(self, recipes_qs, name, value):
+        """Рецепты, в которых есть все указанные ингредиенты."""
+        for ingredient_id in set(value):
+            recipes_qs = recipes_qs.filter(self._has_ingredient(ingredient_id))
+        return recipes_qs
+
+    def filter_exclude_ingredients(self, recipes_qs, name, value):
+        """Рецепты без указанных ингредиентов."""
+        if not value:
+            return recipes_qs
+        return recipes_qs.filter(
+            ~Exists(
+                RecipeIngredient.objects.filter(
+                    recipe_id=OuterRef("pk"), ingredient_id__in=set(value)
+                )
+            )
+        )
 
     def filter_in_shopping_cart(self, recipes_qs, name, value):
         """
@@ -165,7 +436,7 @@ class RecipeFilter(FilterSet):
             return recipes_qs.none() if value == 1 else recipes_qs
 
         if value == 1:
-            return recipes_qs.filter(in_shopping_carts__user=user)
+            return recipes_qs.filter(in_shopping_carts__user_id=user.pk)
         return recipes_qs
 
     def filter_is_favorited(self, recipes_qs, name, value):
@@ -177,11 +448,11 @@ class RecipeFilter(FilterSet):
             return recipes_qs.none() if value == 1 else recipes_qs
 
         if value == 1:
-            return recipes_qs.filter(in_favorites__user=user)
+            return recipes_qs.filter(in_favorites__user_id=user.pk)
         return recipes_qs
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(MultiGetMixin, SparseFieldsViewMixin, ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = [IsAuthorOrReadOnly]
     pagination_class = RecipePagination
@@ -193,9 +464,44 @@ class RecipeViewSet(ModelViewSet):
             return RecipeReadSerializer
         return RecipeWriteSerializer
 
+    def get_sparse_field_names(self):
+        return RecipeReadSerializer.Meta.fields
+
+    def get_queryset(self):
+        """
+        Для чтения загружаем только нужные полям ответа колонки, автора и
+        ингредиенты — из карточки рецепта (api.cards) тем же запросом.
+        Флаги берутся из api.memberships или загрузчиков запроса
+        (api.loaders). Невыбранные через ?fields=/?omit= поля не стоят
+        ничего.
+        """
+        queryset = super().get_queryset()
+        if self.action not in ("list", "retrieve"):
+            return queryset
+        columns = ["id", "author_id"]
+        columns += [
+            name
+            for name in ("name", "image", "text", "cooking_time")
+            if self.wants(name)
+        ]
+        card_columns = [
+            f"card__{name}"
+            for name in ("author", "ingredients")
+            if self.wants(name)
+        ]
+        if card_columns:
+            queryset = queryset.select_related("card")
+            columns += card_columns
+        return queryset.only(*columns)
+
+    @transaction.atomic
     def perform_create(self, serializer):
         """Сохранение рецепта с автором."""
-        serializer.save(author=self.request.user)
+        refresh_recipe_card(serializer.save(author=self.request.user))
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        refresh_recipe_card(serializer.save())
 
     def toggle_relation(self, request, pk, model, error_message, success_message):
         """
@@ -209,19 +515,31 @@ class RecipeViewSet(ModelViewSet):
         - success_message: сообщение при успешном удалении
         """
         user = request.user
-        recipe = Recipe.objects.filter(pk=pk).first()
+        if not str(pk).isdecimal():
+            raise Http404
 
-        if recipe and request.method == "POST":
-            obj, created = model.objects.get_or_create(user=user, recipe=recipe)
+        # Каждая ветка — один оператор SQL (api.relations), без гонки
+        # между проверкой и вставкой при двойном нажатии.
+        if request.method == "POST":
+            recipe, created = add_recipe_relation(model, user.pk, int(pk))
+            if recipe is None:
+                raise Http404
             if not created:
                 return Response(
                     {"error": error_message.format(recipe.name)},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            serializer = RecipeShortSerializer(recipe, context={"request": request})
+            record_change(
+                user.pk, RELATION_KINDS[model], recipe.pk, added=True
+            )
+            serializer = RecipeShortSerializer(
+                recipe, context={"request": request}
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        get_object_or_404(model, user=user, recipe=recipe).delete()
+        if not remove_recipe_relation(model, user.pk, int(pk)):
+            raise Http404
+        record_change(user.pk, RELATION_KINDS[model], int(pk), added=False)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -253,6 +571,36 @@ class RecipeViewSet(ModelViewSet):
             success_message='Рецепт "{}" не найден в избранном.',
         )
 
+    def batch_relation(self, request, model):
+        """Пакетное добавление/удаление: {"add": [id], "remove": [id]}."""
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            batch_recipe_relations(
+                model, request.user, **serializer.validated_data
+            )
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="shopping_cart/batch",
+        permission_classes=[IsAuthenticated],
+    )
+    def shopping_cart_batch(self, request):
+        """Добавление/удаление нескольких рецептов в корзине одним запросом."""
+        return self.batch_relation(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="favorite/batch",
+        permission_classes=[IsAuthenticated],
+    )
+    def favorite_batch(self, request):
+        """Добавление/удаление нескольких рецептов в избранном за запрос."""
+        return self.batch_relation(request, Favorite)
+
     @action(
         detail=False,
         methods=["get"],
@@ -264,7 +612,9 @@ class RecipeViewSet(ModelViewSet):
         Формирует и скачивает список покупок в формате .txt.
         """
         user = request.user
-        cart_items = ShoppingCart.objects.filter(user=user).select_related("recipe")
+        cart_items = ShoppingCart.objects.filter(
+            user_id=user.pk
+        ).select_related("recipe")
 
         if not cart_items.exists():
             return Response({"error": "Ваша корзина пуста."}, status=400)
@@ -308,15 +658,144 @@ class RecipeViewSet(ModelViewSet):
             content_type="text/plain",
         )
 
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAuthenticated],
+    )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+        paginator = FeedPagination()
+        recipes, has_next = get_feed_page(
+            request.user,
+            before=paginator.get_cursor(request),
+            limit=paginator.get_limit(request),
+        )
+        serializer = RecipeReadSerializer(
+            recipes, many=True, context={"request": request}
+        )
+        return paginator.get_paginated_response(
+            request, serializer.data, recipes[-1].pk if has_next else None
+        )
+
+    @action(detail=False, methods=["get"], permission_classes=[AllowAny])
+    def popular(self, request):
+        """
+        Популярные рецепты за окно ?window=day|week|all (по умолчанию week).
+
+        Рейтинг заранее собирается командой rollup_popularity.
+        """
+        window = request.query_params.get("window", PopularRecipe.WINDOW_WEEK)
+        if window not in dict(PopularRecipe.WINDOWS):
+            return Response(
+                {"error": "window может быть day, week или all."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        rankings = PopularRecipe.objects.filter(window=window).select_related(
+            "recipe"
+        )
+        page = self.paginate_queryset(rankings)
+        data = []
+        for ranking in page:
+            item = RecipeShortSerializer(
+                ranking.recipe, context={"request": request}
+            ).data
+            item["favorites"] = ranking.favorites
+            item["shopping_carts"] = ranking.shopping_carts
+            data.append(item)
+        return self.get_paginated_response(data)
+
+    @action(detail=False, methods=["get"], permission_classes=[AllowAny])
+    def cookable(self, request):
+        """
+        Что приготовить из имеющихся продуктов.
+
+        ?ingredients=1,2,3 — id имеющихся ингредиентов,
+        ?max_missing= — сколько ингредиентов можно докупить (0–3).
+        """
+        values = ",".join(request.query_params.getlist("ingredients"))
+        pantry = [
+            value.strip() for value in values.split(",") if value.strip()
+        ]
+        if not pantry or not all(value.isdecimal() for value in pantry):
+            return Response(
+                {"error": "Укажите id ингредиентов: ?ingredients=1,2,3."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(pantry) > 200:
+            return Response(
+                {"error": "Можно указать не больше 200 ингредиентов."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        max_missing = request.query_params.get("max_missing", "0")
+        if not max_missing.isdecimal() or int(max_missing) > 3:
+            return Response(
+                {"error": "max_missing должен быть числом от 0 до 3."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        pantry = {int(value) for value in pantry}
+
+        paginator = self.paginator
+        page = paginator.paginate_queryset(
+            cookable_recipes(pantry, int(max_missing)), request
+        )
+        recipes = Recipe.objects.in_bulk([pk for pk, _ in page])
+        missing = {}
+        for item in RecipeIngredient.objects.filter(
+            recipe_id__in=recipes
+        ).select_related("ingredient"):
+            if item.ingredient_id not in pantry:
+                missing.setdefault(item.recipe_id, []).append(item.ingredient)
+
+        data = []
+        for recipe_id, _ in page:
+            if recipe_id not in recipes:
+                continue
+            item = RecipeShortSerializer(
+                recipes[recipe_id], context={"request": request}
+            ).data
+            item["missing_ingredients"] = IngredientSerializer(
+                missing.get(recipe_id, []), many=True
+            ).data
+            data.append(item)
+        return paginator.get_paginated_response(data)
+
+    @action(detail=True, methods=["get"], permission_classes=[AllowAny])
+    def similar(self, request, pk=None):
+        """
+        Рецепты с наиболее похожим набором ингредиентов (?limit=, до 50).
+        """
+        recipe = self.get_object()
+        limit = request.query_params.get("limit", "")
+        limit = min(int(limit), 50) if limit.isdecimal() and int(limit) else 10
+        scores = similar_recipes(recipe.pk, limit)
+        recipes = Recipe.objects.in_bulk([pk for pk, _ in scores])
+        data = []
+        for recipe_id, score in scores:
+            if recipe_id not in recipes:
+                continue
+            item = RecipeShortSerializer(
+                recipes[recipe_id], context={"request": request}
+            ).data
+            item["similarity"] = round(score, 3)
+            data.append(item)
+        return Response(data)
+
     @action(detail=True, methods=["get"], url_path="get-link")
     def get_link(self, request, pk=None):
         """
         Возвращает короткую ссылку на рецепт.
+
+        Наличие рецепта проверяется по множеству id в памяти воркера,
+        как и при переходе по ссылке, — без запроса к БД.
         """
+        if not str(pk).isdecimal() or not recipe_exists(int(pk)):
+            raise Http404
+        code = encode(int(pk))
         return Response(
             {
                 "short-link": request.build_absolute_uri(
-                    reverse("recipes:short_link", kwargs={"recipe_id": pk})
+                    reverse("recipes:short_code", kwargs={"code": code})
                 )
             },
             status=status.HTTP_200_OK,
@@ -331,7 +810,7 @@ class IngredientFilter(FilterSet):
         fields = ["name"]
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(MultiGetMixin, ReadOnlyModelViewSet):
     """API для получения списка ингредиентов с фильтрацией по началу имени."""
 
     queryset = Ingredient.objects.all()
@@ -340,3 +819,49 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter  # Используем кастомный фильтр
     pagination_class = None
+
+
+class ChangeViewSet(ViewSet):
+    """
+    Журнал изменений для синхронизации: /api/changes/?since=<курсор>.
+
+    Без since возвращает курсор на конец журнала (после полной загрузки
+    данных). Ответ — {"changes", "cursor", "has_more"}; следующий запрос
+    делается с полученным cursor. 410 — курсор устарел, нужна полная
+    синхронизация.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        since = request.query_params.get("since")
+        if not since:
+            return Response(
+                {"changes": [], "cursor": head_cursor(), "has_more": False}
+            )
+        limit = request.query_params.get("limit", "")
+        if limit.isdecimal() and int(limit) > 0:
+            limit = min(int(limit), settings.CHANGES["MAX_LIMIT"])
+        else:
+            limit = settings.CHANGES["DEFAULT_LIMIT"]
+        try:
+            changes, cursor, has_more = read_changes(
+                request.user, since, limit
+            )
+        except CursorExpired:
+            return Response(
+                {"error": "Курсор устарел: нужна полная синхронизация."},
+                status=status.HTTP_410_GONE,
+            )
+        except ValueError:
+            return Response(
+                {"error": "Неверный курсор."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            {
+                "changes": ChangeSerializer(changes, many=True).data,
+                "cursor": cursor,
+                "has_more": has_more,
+            }
+        )
@@ -9,8 +9,27 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+os.environ.setdefault("SERVER_MODE", "asgi")
 
-application = get_asgi_application()
+
+class ReadPathASGIHandler(ASGIHandler):
+    """ASGIHandler, который разрешает URL через settings.ASGI_URLCONF."""
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = settings.ASGI_URLCONF
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+
+# WhiteNoise синхронный и в ASGI сериализовал бы все запросы воркера,
+# поэтому статику отдаёт асинхронный обработчик Django.
+application = ASGIStaticFilesHandler(ReadPathASGIHandler())
@@ -0,0 +1,20 @@
+"""
+URLconf для ASGI-воркеров.
+
+Горячие эндпоинты чтения обслуживаются асинхронными обёртками из
+api.async_views, всё остальное — обычными маршрутами foodgram.urls.
+"""
+
+from django.urls import include, path
+
+from api import async_views
+
+urlpatterns = [
+    path("api/recipes/", async_views.recipe_list),
+    path("api/recipes/<int:pk>/", async_views.recipe_detail),
+    path("api/ingredients/", async_views.ingredient_list),
+    path("api/ingredients/<int:pk>/", async_views.ingredient_detail),
+    path("s/<int:recipe_id>/", async_views.short_link),
+    path("s/<str:code>/", async_views.short_code),
+    path("", include("foodgram.urls")),
+]
@@ -0,0 +1,127 @@
+"""
+Сжатые битовые множества id в духе Roaring bitmap.
+
+Id делится на старшие 16 бит (номер блока) и младшие 16 бит. Блок с
+небольшим числом элементов хранится отсортированным array("H"), плотный
+блок — целым числом Python на 65536 бит. Операции над множествами
+выполняются поблочно над плотными представлениями: AND/OR/XOR целых
+чисел идут в C и обрабатывают весь блок за раз.
+"""
+
+from array import array
+from bisect import bisect_left
+
+BLOCK_BITS = 16
+BLOCK_SIZE = 1 << BLOCK_BITS
+BLOCK_MASK = BLOCK_SIZE - 1
+FULL_BLOCK = (1 << BLOCK_SIZE) - 1
+# Порог, после которого массив занимает больше плотного блока (8 КБ).
+ARRAY_LIMIT = 4096
+
+
+class Bitmap:
+    __slots__ = ("blocks",)
+
+    def __init__(self):
+        self.blocks = {}
+
+    def add(self, value):
+        key, low = value >> BLOCK_BITS, value & BLOCK_MASK
+        block = self.blocks.get(key)
+        if block is None:
+            self.blocks[key] = array("H", [low])
+        elif isinstance(block, int):
+            self.blocks[key] = block | 1 << low
+        else:
+            position = bisect_left(block, low)
+            if position < len(block) and block[position] == low:
+                return
+            block.insert(position, low)
+            if len(block) > ARRAY_LIMIT:
+                self.blocks[key] = to_dense(block)
+
+    def discard(self, value):
+        key, low = value >> BLOCK_BITS, value & BLOCK_MASK
+        block = self.blocks.get(key)
+        if block is None:
+            return
+        if isinstance(block, int):
+            block &= ~(1 << low)
+        else:
+            position = bisect_left(block, low)
+            if position < len(block) and block[position] == low:
+                del block[position]
+        if block:
+            self.blocks[key] = block
+        else:
+            del self.blocks[key]
+
+    def __contains__(self, value):
+        block = self.blocks.get(value >> BLOCK_BITS)
+        if block is None:
+            return False
+        low = value & BLOCK_MASK
+        if isinstance(block, int):
+            return bool(block >> low & 1)
+        position = bisect_left(block, low)
+        return position < len(block) and block[position] == low
+
+    def __bool__(self):
+        return bool(self.blocks)
+
+    def dense(self, key):
+        """Блок key как целое число на 65536 бит (0, если блока нет)."""
+        block = self.blocks.get(key, 0)
+        return block if isinstance(block, int) else to_dense(block)
+
+
+def to_dense(values):
+    bits = bytearray(BLOCK_SIZE // 8)
+    for value in values:
+        bits[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(bits, "little")
+
+
+def iter_dense(key, block):
+    """Id из плотного блока key по возрастанию."""
+    if not block:
+        return
+    base = key << BLOCK_BITS
+    words = memoryview(block.to_bytes(BLOCK_SIZE // 8, "little")).cast("Q")
+    for index, word in enumerate(words):
+        while word:
+            low = word & -word
+            yield base | index << 6 | low.bit_length() - 1
+            word ^= low
+
+
+def add_to_counter(counter, block):
+    """
+    Прибавляет по единице в позициях block к побитовому счётчику.
+
+    counter — список плотных блоков, i-й хранит i-й бит счётчика каждой
+    позиции (bit-sliced): сложение — сумматор с переносом на AND/XOR.
+    """
+    carry = block
+    for index, bits in enumerate(counter):
+        if not carry:
+            return
+        counter[index], carry = bits ^ carry, bits & carry
+    if carry:
+        counter.append(carry)
+
+
+def at_least(counter, threshold):
+    """Позиции, где значение побитового счётчика не меньше threshold."""
+    if threshold <= 0:
+        return FULL_BLOCK
+    if threshold >> len(counter):
+        return 0
+    greater, equal = 0, FULL_BLOCK
+    for index in reversed(range(len(counter))):
+        if threshold >> index & 1:
+            equal &= counter[index]
+        else:
+            greater |= equal & counter[index]
+            equal &= ~counter[index]
+    return greater | equal
@@ -0,0 +1,175 @@
+"""
+Сжатие ответов API: выбор кодека по Accept-Encoding и кэш сжатых тел.
+
+Поддерживаются br (пакет brotli), zstd (пакет zstandard) и gzip; кодеки,
+пакеты которых не установлены, просто не предлагаются. Из принятых
+клиентом кодеков выбирается кодек с наибольшим q, при равных q — первый
+в COMPRESSION["ENCODINGS"].
+
+Сжатые тела ответов на GET хранятся в LRU по хэшу тела: одинаковые
+страницы (список ингредиентов, популярные рецепты) сжимаются один раз
+на воркер, а не на каждый запрос. Ключ — содержимое, а не URL, поэтому
+кэш не может отдать чужой ответ.
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from foodgram import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - кодек необязательный
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - кодек необязательный
+    zstandard = None
+
+compress_seconds = metrics.histogram(
+    "http_compression_seconds",
+    "Время сжатия тела ответа.",
+    ("encoding",),
+)
+bytes_in = metrics.counter(
+    "http_compression_bytes_in_total",
+    "Размер тел ответов до сжатия.",
+    ("encoding",),
+)
+bytes_out = metrics.counter(
+    "http_compression_bytes_out_total",
+    "Размер тел ответов после сжатия (степень сжатия — out/in).",
+    ("encoding",),
+)
+cache_requests = metrics.counter(
+    "http_compression_cache_requests_total",
+    "Обращения к кэшу сжатых тел.",
+    ("encoding", "result"),
+)
+
+
+def _compressors():
+    levels = settings.COMPRESSION["LEVELS"]
+    available = {
+        "gzip": lambda data: gzip.compress(data, compresslevel=levels["gzip"]),
+    }
+    if brotli is not None:
+        available["br"] = lambda data: brotli.compress(
+            data, quality=levels["br"]
+        )
+    if zstandard is not None:
+        available["zstd"] = lambda data: zstandard.ZstdCompressor(
+            level=levels["zstd"]
+        ).compress(data)
+    return available
+
+
+def parse_accept_encoding(header):
+    """'gzip;q=0.5, br' → {"gzip": 0.5, "br": 1.0}."""
+    accepted = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+def choose_encoding(header, encodings):
+    """
+    Кодек из encodings (в порядке предпочтения сервера) для заголовка
+    Accept-Encoding.
+    """
+    accepted = parse_accept_encoding(header)
+    default = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressedBodyCache:
+    """LRU сжатых тел с ограничением суммарного размера в байтах."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._data.get(key)
+            if body is not None:
+                self._data.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._data[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class Compressor:
+    """Сжимает тело выбранным кодеком, по возможности — из кэша."""
+
+    def __init__(self):
+        options = settings.COMPRESSION
+        available = _compressors()
+        self.compressors = available
+        self.encodings = [
+            name for name in options["ENCODINGS"] if name in available
+        ]
+        self.min_size = options["MIN_SIZE"]
+        self.content_types = tuple(options["CONTENT_TYPES"])
+        self.cache = CompressedBodyCache(options["CACHE_BYTES"])
+
+    def is_compressible(self, content_type, size):
+        return size >= self.min_size and content_type.startswith(
+            self.content_types
+        )
+
+    def compress(self, encoding, body, cacheable):
+        key = None
+        if cacheable:
+            key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+            compressed = self.cache.get(key)
+            result = "hit" if compressed is not None else "miss"
+            cache_requests.inc(encoding=encoding, result=result)
+            if compressed is not None:
+                return compressed
+        started = time.perf_counter()
+        compressed = self.compressors[encoding](body)
+        compress_seconds.observe(
+            time.perf_counter() - started, encoding=encoding
+        )
+        bytes_in.inc(len(body), encoding=encoding)
+        bytes_out.inc(len(compressed), encoding=encoding)
+        if key is not None:
+            self.cache.set(key, compressed)
+        return compressed
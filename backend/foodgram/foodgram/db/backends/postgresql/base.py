@@ -0,0 +1,277 @@
+"""
+PostgreSQL-бэкенд с проверкой постоянных соединений и пулом.
+
+- CONN_HEALTH_CHECKS: перед первым запросом в рамках HTTP-запроса
+  переиспользуемое соединение проверяется и при необходимости
+  переоткрывается (аналог настройки из Django 4.1).
+- POOL: при ENABLED=True соединения не закрываются в конце запроса,
+  а возвращаются в общий для процесса пул. Полезно для воркеров
+  с потоками (gthread) и ASGI, где соединений на поток слишком много.
+- Время получения соединения пишется в метрику
+  db_connection_acquire_seconds.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from django.db.backends.postgresql import base
+
+from foodgram import metrics
+
+acquire_seconds = metrics.histogram(
+    "db_connection_acquire_seconds",
+    "Время получения соединения с БД.",
+    ("alias", "source"),
+)
+health_check_failures = metrics.counter(
+    "db_health_check_failures_total",
+    "Соединения, не прошедшие проверку и закрытые.",
+    ("alias",),
+)
+pool_connections = metrics.gauge(
+    "db_pool_connections",
+    "Соединения в пуле по состоянию.",
+    ("alias", "state"),
+)
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Свободное соединение не появилось за POOL["TIMEOUT"] секунд."""
+
+
+class _Slot:
+    __slots__ = ("connection", "isolation_level", "created", "last_used")
+
+    def __init__(self, connection, isolation_level):
+        self.connection = connection
+        self.isolation_level = isolation_level
+        self.created = self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Потокобезопасный пул соединений psycopg2.
+
+    Выдаёт последнее возвращённое соединение (LIFO), чтобы лишние
+    соединения простаивали и закрывались по MAX_LIFETIME. Соединение,
+    простоявшее дольше HEALTH_CHECK_IDLE секунд, перед выдачей
+    проверяется запросом SELECT 1.
+    """
+
+    def __init__(self, alias, options):
+        self.alias = alias
+        self.max_size = options.get("MAX_SIZE", 10)
+        self.timeout = options.get("TIMEOUT", 5)
+        self.max_lifetime = options.get("MAX_LIFETIME", 1800)
+        self.health_check_idle = options.get("HEALTH_CHECK_IDLE", 30)
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, connect):
+        """Возвращает слот; connect() создаёт (connection, isolation_level)."""
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                slot = self._checkout(deadline)
+            if slot is None:
+                try:
+                    slot = _Slot(*connect())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                source = "new"
+            elif self._is_usable(slot):
+                source = "pool"
+            else:
+                health_check_failures.inc(alias=self.alias)
+                self.discard(slot)
+                continue
+            acquire_seconds.observe(
+                time.perf_counter() - started, alias=self.alias, source=source
+            )
+            self._report()
+            return slot
+
+    def release(self, slot):
+        connection = slot.connection
+        expired = time.monotonic() - slot.created > self.max_lifetime
+        if connection.closed or expired:
+            self.discard(slot)
+            return
+        try:
+            status = connection.get_transaction_status()
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            self.discard(slot)
+            return
+        slot.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(slot)
+            self._cond.notify()
+        self._report()
+
+    def clear(self):
+        """Закрывает простаивающие соединения (например, перед fork)."""
+        with self._cond:
+            slots, self._idle = list(self._idle), deque()
+            self._size -= len(slots)
+        for slot in slots:
+            slot.connection.close()
+        self._report()
+
+    def reset_after_fork(self):
+        # Унаследованные соединения не закрываем: PQfinish в дочернем
+        # процессе оборвал бы их и у родителя. Просто забываем о них.
+        _inherited.extend(self._idle)
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+
+    def _checkout(self, deadline):
+        """Берёт свободный слот или резервирует место под новый (None)."""
+        while True:
+            if self._idle:
+                return self._idle.pop()
+            if self._size < self.max_size:
+                self._size += 1
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolTimeout(
+                    f"Пул соединений {self.alias!r} исчерпан "
+                    f"({self.max_size} соединений, ожидание {self.timeout} с)."
+                )
+            self._cond.wait(remaining)
+
+    def _is_usable(self, slot):
+        now = time.monotonic()
+        if slot.connection.closed or now - slot.created > self.max_lifetime:
+            return False
+        if now - slot.last_used < self.health_check_idle:
+            return True
+        try:
+            with slot.connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except psycopg2.Error:
+            return False
+        return True
+
+    def discard(self, slot):
+        try:
+            slot.connection.close()
+        finally:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+        self._report()
+
+    def _report(self):
+        idle = len(self._idle)
+        pool_connections.set(idle, alias=self.alias, state="idle")
+        pool_connections.set(
+            self._size - idle, alias=self.alias, state="in_use"
+        )
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_inherited = []
+
+
+def get_pool(alias, options):
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(alias, options)
+        return _pools[alias]
+
+
+def close_pools():
+    for pool in list(_pools.values()):
+        pool.clear()
+
+
+def _reset_pools_after_fork():
+    global _pools_lock
+    _pools_lock = threading.Lock()
+    for pool in _pools.values():
+        pool.reset_after_fork()
+
+
+os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    health_check_done = False
+    _pool_slot = None
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get("CONN_HEALTH_CHECKS", False)
+
+    @property
+    def pool(self):
+        options = self.settings_dict.get("POOL") or {}
+        if not options.get("ENABLED"):
+            return None
+        return get_pool(self.alias, options)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            with acquire_seconds.time(alias=self.alias, source="new"):
+                return super().get_new_connection(conn_params)
+
+        def connect():
+            connection = super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+            return connection, self.isolation_level
+
+        self._pool_slot = pool.acquire(connect)
+        self.isolation_level = self._pool_slot.isolation_level
+        return self._pool_slot.connection
+
+    def _close(self):
+        slot, self._pool_slot = self._pool_slot, None
+        if slot is None or slot.connection is not self.connection:
+            return super()._close()
+        if self.errors_occurred and not self.is_usable():
+            health_check_failures.inc(alias=self.alias)
+            self.pool.discard(slot)
+            return None
+        self.pool.release(slot)
+        return None
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+        ):
+            return
+        if not self.is_usable():
+            health_check_failures.inc(alias=self.alias)
+            self.close()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # Вызывается на границах HTTP-запроса: следующий запрос
+        # снова проверит переиспользуемое соединение.
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
@@ -0,0 +1,118 @@
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, router
+
+# Реплики, с которых текущий запрос уже читал; None — чтение с реплик
+# запрещено. По умолчанию management-команды, shell и запросы на запись
+# работают только с primary.
+_replica_reads = ContextVar("replica_reads", default=None)
+
+
+def allow_replica_reads(allowed=True):
+    """Включает чтение с реплик в текущем контексте, возвращает токен."""
+    return _replica_reads.set(set() if allowed else None)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+def used_replicas():
+    """Реплики, которые роутер выдал для чтения в текущем контексте."""
+    return sorted(_replica_reads.get() or ())
+
+
+def mark_replica_unhealthy(alias):
+    """Исключает реплику из ротации до следующей проверки."""
+    for instance in router.routers:
+        if isinstance(instance, PrimaryReplicaRouter):
+            instance.health.mark_unhealthy(alias)
+
+
+class ReplicaHealth:
+    """
+    Кэш состояния реплик.
+
+    Реплика проверяется не чаще раза в HEALTH_CHECK_INTERVAL секунд;
+    недоступная реплика исключается из ротации до следующей проверки.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    def is_healthy(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            healthy, checked_at = self._checked.get(alias, (True, None))
+            if checked_at is not None and now - checked_at < self.interval:
+                return healthy
+            # Остальные потоки до окончания проверки видят прежнее состояние.
+            self._checked[alias] = (healthy, now)
+        healthy = self._probe(alias)
+        with self._lock:
+            self._checked[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def mark_unhealthy(self, alias):
+        with self._lock:
+            self._checked[alias] = (False, time.monotonic())
+
+    @staticmethod
+    def _probe(alias):
+        connection = connections[alias]
+        try:
+            connection.ensure_connection()
+            return connection.is_usable()
+        except DatabaseError:
+            connection.close()
+            return False
+
+
+class PrimaryReplicaRouter:
+    """
+    Роутер primary/replica.
+
+    Запись, транзакции и все запросы вне «безопасных» HTTP-запросов идут
+    в default. Чтение внутри GET/HEAD/OPTIONS распределяется по здоровым
+    репликам из DATABASE_ROUTING["REPLICAS"]; если таких нет — в default.
+    Какие запросы читают с реплик, решает ReplicaRoutingMiddleware; она же
+    после ошибки чтения вызывает mark_replica_unhealthy и повторяет запрос
+    на primary.
+    """
+
+    def __init__(self):
+        options = settings.DATABASE_ROUTING
+        self.replicas = list(options["REPLICAS"])
+        self.health = ReplicaHealth(options["HEALTH_CHECK_INTERVAL"])
+
+    def db_for_read(self, model, **hints):
+        used = _replica_reads.get()
+        if not self.replicas or used is None:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        healthy = [
+            alias for alias in self.replicas if self.health.is_healthy(alias)
+        ]
+        if not healthy:
+            return DEFAULT_DB_ALIAS
+        alias = random.choice(healthy)
+        used.add(alias)
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Все алиасы смотрят на одни и те же данные.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему через репликацию.
+        return db == DEFAULT_DB_ALIAS
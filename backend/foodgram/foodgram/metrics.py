@@ -0,0 +1,181 @@
+"""
+Простые метрики процесса в формате Prometheus.
+
+Значения хранятся в памяти текущего воркера; в ответе /metrics/
+каждая серия помечается меткой pid, чтобы данные разных воркеров
+gunicorn не смешивались при сборе.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name}: ожидались метки {self.labelnames}, "
+                f"получены {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key, extra=()):
+        pairs = [*zip(self.labelnames, key), *extra, ("pid", os.getpid())]
+        body = ",".join(f'{name}="{value}"' for name, value in pairs)
+        return "{" + body + "}"
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{self._format_labels(key)} {value}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    samples = Counter.samples
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self._values.items()
+            ]
+        for key, counts, total, count in items:
+            for bound, value in zip(self.buckets, counts):
+                labels = self._format_labels(key, [("le", bound)])
+                yield f"{self.name}_bucket{labels} {value}"
+            labels = self._format_labels(key, [("le", "+Inf")])
+            yield f"{self.name}_bucket{labels} {count}"
+            yield f"{self.name}_sum{self._format_labels(key)} {total}"
+            yield f"{self.name}_count{self._format_labels(key)} {count}"
+
+
+def _register(metric_class, name, *args, **kwargs):
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = metric_class(name, *args, **kwargs)
+        return _registry[name]
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    return _register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(
+        Histogram, name, documentation, labelnames, buckets=buckets
+    )
+
+
+def render():
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+def metrics_view(request):
+    """Отдаёт метрики воркера; доступ только с адресов из INTERNAL_IPS."""
+    if request.META.get("REMOTE_ADDR") not in settings.INTERNAL_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type="text/plain; version=0.0.4")
@@ -0,0 +1,335 @@
+import asyncio
+import logging
+import re
+import sys
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import InterfaceError, OperationalError, connections
+from django.utils.cache import patch_vary_headers
+from rest_framework.fields import Field
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer
+
+from foodgram.compression import Compressor, choose_encoding
+from foodgram.db_routers import (
+    allow_replica_reads,
+    mark_replica_unhealthy,
+    reset_replica_reads,
+    used_replicas,
+)
+from foodgram.shared_memory import SharedCounters
+
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneQueryError(Exception):
+    """Повторяющиеся запросы к БД в рамках одного HTTP-запроса."""
+
+
+class QueryInspectorMiddleware:
+    """
+    Детектор N+1 запросов для разработки и стенда.
+
+    Перехватывает весь SQL, выполненный за время запроса, группирует
+    выражения по нормализованному тексту и месту вызова в коде проекта
+    и сообщает о группах, повторившихся не менее THRESHOLD раз.
+    Для каждой группы указывается поле сериализатора, из которого
+    запрос был выполнен (например, RecipeReadSerializer.is_favorited).
+    """
+
+    _literal_re = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+    _in_list_re = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+    _spaces_re = re.compile(r"\s+")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        options = settings.QUERY_INSPECTOR
+        if not options["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.threshold = options["THRESHOLD"]
+        self.raise_errors = options["RAISE"]
+        self.header = options["HEADER"]
+        self.project_root = str(settings.BASE_DIR)
+
+    def __call__(self, request):
+        groups = {}
+        wrapper = self._make_wrapper(groups)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(wrapper))
+            response = self.get_response(request)
+
+        duplicates = [g for g in groups.values() if g["count"] >= 2]
+        if self.header:
+            total = sum(g["count"] for g in groups.values())
+            response["X-Query-Count"] = total
+            response["X-Duplicate-Queries"] = sum(
+                g["count"] - 1 for g in duplicates
+            )
+
+        offenders = [g for g in duplicates if g["count"] >= self.threshold]
+        if offenders:
+            self._report(request, offenders)
+        return response
+
+    def _make_wrapper(self, groups):
+        def wrapper(execute, sql, params, many, context):
+            started = time.monotonic()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                call_site = self._call_site()
+                key = (self.normalize(sql), call_site)
+                # Поле сериализатора ищем по стеку только для первого
+                # запроса группы: для повторов это лишняя работа.
+                if key not in groups:
+                    groups[key] = {
+                        "count": 0,
+                        "time": 0.0,
+                        "sql": key[0],
+                        "call_site": call_site,
+                        "field": self._serializer_field(),
+                    }
+                group = groups[key]
+                group["count"] += 1
+                group["time"] += time.monotonic() - started
+
+        return wrapper
+
+    @classmethod
+    def normalize(cls, sql):
+        """Приводит SQL к шаблону без литералов и с свёрнутыми IN (...)."""
+        sql = cls._literal_re.sub("?", sql)
+        sql = cls._in_list_re.sub("(%s, ...)", sql)
+        return cls._spaces_re.sub(" ", sql).strip()
+
+    def _call_site(self):
+        """Кадры стека, относящиеся к коду проекта (без site-packages)."""
+        frames = []
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if (
+                filename.startswith(self.project_root)
+                and "site-packages" not in filename
+                and filename != __file__
+            ):
+                frames.append((filename, frame.f_lineno, frame.f_code.co_name))
+            frame = frame.f_back
+        return tuple(frames)
+
+    @staticmethod
+    def _serializer_field():
+        """
+        Ищет поле сериализатора, в контексте которого выполнен запрос.
+
+        Предпочитается самое «глубокое» обычное поле (SerializerMethodField,
+        поле с source="a.b"), иначе — вложенный сериализатор с именем поля.
+        """
+        nested = None
+        frame = sys._getframe(2)
+        while frame is not None:
+            field = frame.f_locals.get("self")
+            if isinstance(field, Field) and field.field_name:
+                name = f"{type(field.parent).__name__}.{field.field_name}"
+                if not isinstance(field, BaseSerializer):
+                    return name
+                if nested is None:
+                    nested = name
+            frame = frame.f_back
+        return nested
+
+    def _report(self, request, offenders):
+        lines = [f"N+1 запросы в {request.method} {request.path}:"]
+        for group in sorted(offenders, key=lambda g: -g["count"]):
+            location = "вне кода проекта"
+            if group["call_site"]:
+                filename, lineno, func = group["call_site"][0]
+                location = f"{filename}:{lineno} в {func}()"
+            lines.append(
+                f"  {group['count']}x ({group['time'] * 1000:.1f} мс) "
+                f"поле {group['field'] or '—'}, {location}\n"
+                f"    {group['sql']}"
+            )
+        message = "\n".join(lines)
+        if self.raise_errors:
+            raise NPlusOneQueryError(message)
+        logger.warning(message)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает чтение с реплик для безопасных запросов (GET/HEAD/OPTIONS).
+
+    После успешной записи клиент в течение STICKY_SECONDS читает только
+    с primary — так пользователь сразу видит результат своих действий
+    (избранное, корзина и т.п.), несмотря на отставание реплик. Срок
+    хранится в общей памяти узла по учётным данным клиента (заголовок
+    Authorization или сессия) и дублируется в cookie для браузеров.
+
+    Если чтение упало с ошибкой соединения, реплики, с которых читал
+    запрос, исключаются из ротации, а запрос повторяется на primary.
+    """
+
+    cookie_name = "db_primary_until"
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        options = settings.DATABASE_ROUTING
+        if not options["REPLICAS"]:
+            raise MiddlewareNotUsed
+        self.sticky_seconds = options["STICKY_SECONDS"]
+        self.primary_until = SharedCounters("db-primary-until")
+        if asyncio.iscoroutinefunction(get_response):
+            # Так Django определяет, что middleware работает в async-режиме.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = allow_replica_reads(self._can_read_replicas(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_replica_reads(token)
+        if getattr(request, "failed_replicas", None):
+            token = allow_replica_reads(False)
+            try:
+                response = self.get_response(request)
+            finally:
+                reset_replica_reads(token)
+        return self._process_response(request, response)
+
+    async def __acall__(self, request):
+        token = allow_replica_reads(self._can_read_replicas(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_replica_reads(token)
+        if getattr(request, "failed_replicas", None):
+            token = allow_replica_reads(False)
+            try:
+                response = await self.get_response(request)
+            finally:
+                reset_replica_reads(token)
+        return self._process_response(request, response)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, (OperationalError, InterfaceError)):
+            return None
+        failed = used_replicas()
+        if failed:
+            # Безопасный запрос можно повторить целиком — уже на primary.
+            for alias in failed:
+                mark_replica_unhealthy(alias)
+            logger.warning(
+                "Реплики %s недоступны (%s), запрос повторяется на primary",
+                ", ".join(failed),
+                exception,
+            )
+            request.failed_replicas = failed
+        return None
+
+    def _process_response(self, request, response):
+        is_safe = request.method in SAFE_METHODS
+        if not is_safe and response.status_code < 400:
+            until = time.time() + self.sticky_seconds
+            credentials = self._credentials(request)
+            if credentials:
+                self.primary_until.set(credentials, int(until * 1000))
+            response.set_cookie(
+                self.cookie_name,
+                str(until),
+                max_age=self.sticky_seconds,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    def _can_read_replicas(self, request):
+        return request.method in SAFE_METHODS and not self._is_sticky(request)
+
+    def _is_sticky(self, request):
+        now = time.time()
+        credentials = self._credentials(request)
+        if credentials and self.primary_until.get(credentials) > now * 1000:
+            return True
+        try:
+            return float(request.COOKIES[self.cookie_name]) > now
+        except (KeyError, ValueError):
+            return False
+
+    @staticmethod
+    def _credentials(request):
+        """Токен или сессия клиента: по ним запись помечает его «липким»."""
+        return request.META.get("HTTP_AUTHORIZATION") or request.COOKIES.get(
+            settings.SESSION_COOKIE_NAME
+        )
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы br/zstd/gzip по Accept-Encoding клиента.
+
+    Сжимаются только обычные (не потоковые) ответы подходящего типа и
+    не меньше MIN_SIZE байт. Тела ответов на GET без no-store сжимаются
+    через кэш foodgram.compression, остальные — каждый раз.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.COMPRESSION["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.compressor = Compressor()
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self._process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        return self._process_response(request, response)
+
+    def _process_response(self, request, response):
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "")
+        size = len(response.content)
+        if not self.compressor.is_compressible(content_type, size):
+            return response
+        encoding = choose_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""),
+            self.compressor.encodings,
+        )
+        if encoding is None:
+            return response
+
+        cacheable = request.method in (
+            "GET",
+            "HEAD",
+        ) and "no-store" not in response.get("Cache-Control", "")
+        compressed = self.compressor.compress(
+            encoding, response.content, cacheable
+        )
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # Сжатое тело отличается от исходного побайтно.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -33,6 +34,9 @@ ALLOWED_HOSTS = [
     "foodgram-backend",
 ]
 
+# Адреса, которым доступны служебные эндпоинты (например, /metrics/).
+INTERNAL_IPS = os.getenv("INTERNAL_IPS", "127.0.0.1").split(",")
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
@@ -58,6 +62,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "foodgram.middleware.CompressionMiddleware",
+    "foodgram.middleware.ReplicaRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -65,10 +71,20 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "foodgram.middleware.QueryInspectorMiddleware",
 ]
 
 ROOT_URLCONF = "foodgram.urls"
 
+# Режим сервера: wsgi (gunicorn sync-воркеры) или asgi (uvicorn-воркеры,
+# выставляется в foodgram/asgi.py). В ASGI горячие GET-эндпоинты
+# обслуживаются асинхронно через ASGI_URLCONF.
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+ASGI_URLCONF = "foodgram.asgi_urls"
+
+if SERVER_MODE == "asgi":
+    MIDDLEWARE.remove("whitenoise.middleware.WhiteNoiseMiddleware")
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -91,17 +107,57 @@ WSGI_APPLICATION = "foodgram.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+DB_POOL_ENABLED = os.getenv("DB_POOL", "False") == "True"
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # django.db.backends.postgresql + проверка соединений и пул.
+        "ENGINE": "foodgram.db.backends.postgresql",
         "NAME": os.getenv("DB_NAME", "foodgram"),
         "USER": os.getenv("DB_USER", "postgres"),
         "PASSWORD": os.getenv("DB_PASSWORD", "postgres"),
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        # С пулом соединение возвращается в пул в конце каждого запроса.
+        "CONN_MAX_AGE": 0
+        if DB_POOL_ENABLED
+        else int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": True,
+        "POOL": {
+            "ENABLED": DB_POOL_ENABLED,
+            "MAX_SIZE": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+            "TIMEOUT": int(os.getenv("DB_POOL_TIMEOUT", "5")),
+            "MAX_LIFETIME": int(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+            "HEALTH_CHECK_IDLE": int(os.getenv("DB_POOL_HEALTH_CHECK_IDLE", "30")),
+        },
     }
 }
 
+# Реплики только для чтения: DB_REPLICA_HOSTS=replica1:5432,replica2:5432
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+    filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(",")), start=1
+):
+    host, _, port = address.strip().partition(":")
+    alias = f"replica_{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["foodgram.db_routers.PrimaryReplicaRouter"]
+
+DATABASE_ROUTING = {
+    "REPLICAS": DATABASE_REPLICAS,
+    # Сколько секунд после записи клиент читает только с primary.
+    "STICKY_SECONDS": int(os.getenv("DB_STICKY_SECONDS", "5")),
+    # Как часто перепроверять недоступную/доступную реплику.
+    "HEALTH_CHECK_INTERVAL": int(os.getenv("DB_REPLICA_CHECK_INTERVAL", "10")),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -121,15 +177,175 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# token — токены djoser (по умолчанию), jwt — дополнительно stateless JWT
+# (Bearer), которые на чтении аутентифицируются без запросов к БД.
+AUTH_MODE = os.getenv("AUTH_MODE", "token")
+# MessagePack (application/x-msgpack) для клиентов, которые просят его
+# в Accept/Content-Type; требует пакета msgpack.
+API_MSGPACK = os.getenv("API_MSGPACK", "False") == "True"
+
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
-    ),
+        ("api.authentication.StatelessJWTAuthentication",) if AUTH_MODE == "jwt" else ()
+    )
+    + ("api.authentication.CachedTokenAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # JSON через orjson; первый рендерер — ответ по умолчанию.
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ]
+    + (["api.renderers.MessagePackRenderer"] if API_MSGPACK else []),
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ]
+    + (["api.parsers.MessagePackParser"] if API_MSGPACK else []),
+    "DEFAULT_THROTTLE_CLASSES": ["api.throttling.SharedTokenBucketThrottle"],
+    # Сколько прокси перед приложением (infra/nginx.conf): IP клиента для
+    # лимитов берётся из X-Forwarded-For, которую дописал ближайший прокси.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "1")),
+}
+
+# Множества подписок, избранного и корзины пользователей в памяти воркера
+# (api.memberships): сколько пользователей держать, сколько секунд и
+# максимальный размер множества, которое ещё кэшируется.
+MEMBERSHIPS = {
+    "MAX_USERS": int(os.getenv("MEMBERSHIPS_MAX_USERS", "5000")),
+    "TTL": 600,
+    "MAX_IDS": 5000,
+}
+
+# Ограничение частоты запросов (api.throttling), общее для воркеров узла.
+# Лимит — "N/период" (s, min, h, day): корзина на N токенов, которая
+# заполняется целиком за период. Правило действия ("basename.action")
+# дополняет default; None отключает корзину.
+THROTTLE = {
+    "ENABLED": os.getenv("THROTTLE", "True") == "True",
+    "SLOTS": 65536,
+    "RATES": {
+        "default": {"user": "300/min", "ip": "120/min", "route": None},
+        "recipes.list": {"user": "120/min", "ip": "60/min", "route": "3000/min"},
+        "recipes.download_shopping_cart": {"user": "10/min", "route": "120/min"},
+        "recipes.create": {"user": "30/min"},
+        "TokenCreateView": {"ip": "20/min"},
+    },
+}
+
+SIMPLE_JWT = {
+    # Stateless-токен нельзя отозвать, поэтому срок жизни короткий.
+    "ACCESS_TOKEN_LIFETIME": timedelta(
+        minutes=int(os.getenv("JWT_ACCESS_MINUTES", "15"))
+    ),
+    "AUTH_HEADER_TYPES": ("Bearer",),
+}
+
+# Кэш «токен → пользователь» в памяти процесса.
+TOKEN_CACHE = {
+    "MAX_SIZE": int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+    "TTL": int(os.getenv("TOKEN_CACHE_TTL", "300")),
+}
+
+# Лента подписок (/api/recipes/feed/).
+FEED = {
+    # Авторы с большим числом подписчиков не разносятся по лентам,
+    # их рецепты подмешиваются при чтении.
+    "FANOUT_LIMIT": int(os.getenv("FEED_FANOUT_LIMIT", "1000")),
+    # Длина ленты после trim_feeds.
+    "MAX_LENGTH": int(os.getenv("FEED_MAX_LENGTH", "500")),
+    # Сколько последних рецептов автора добавить в ленту при подписке.
+    "BACKFILL": 20,
+}
+
+# Рейтинг популярных рецептов (/api/recipes/popular/).
+POPULARITY = {
+    # Очки рецепта в рейтинге: добавления в избранное и в список покупок.
+    "WEIGHTS": {"favorites": 1, "shopping_carts": 1},
+    # Сколько рецептов хранить в рейтинге каждого окна.
+    "SIZE": 100,
+    # Сколько последних часов пересчитывать при каждом запуске rollup_popularity.
+    "LOOKBACK_HOURS": 2,
+}
+
+# Похожие рецепты (/api/recipes/{id}/similar/).
+SIMILARITY = {
+    # Файл индекса похожих рецептов (команда build_similarity_index).
+    "INDEX_PATH": os.getenv(
+        "SIMILARITY_INDEX_PATH", os.path.join(BASE_DIR, "data", "similarity.idx")
+    ),
+    # Длина сигнатуры MinHash и число полос LSH: при 16 полосах по 2 строки
+    # кандидатами становятся рецепты с Жаккаром от ~0.25.
+    "NUM_PERM": 32,
+    "BANDS": 16,
+    # Сколько рецептов брать из одной корзины (защита от «соли и сахара»).
+    "MAX_BUCKET": 500,
+    # Во сколько раз больше кандидатов переранжировать по точному Жаккару.
+    "RERANK": 5,
+    # Как часто проверять, не пересобран ли файл индекса, с.
+    "RELOAD_INTERVAL": 60,
+}
+
+# Короткие ссылки /s/<код>/.
+SHORT_LINK = {
+    # Ключ перемешивания id в коротких кодах. При смене старые ссылки
+    # перестают открываться.
+    "SALT": os.getenv("SHORT_LINK_SALT", "foodgram"),
+    # Сколько браузеры и CDN кэшируют редирект, с.
+    "MAX_AGE": 86400,
+    # id выше известного воркеру максимума, но не дальше чем на столько,
+    # проверяются в БД: рецепт могли создать на другом узле.
+    "ID_SLACK": 10000,
+}
+
+# Пакетные операции с избранным, корзиной и подписками и выборка по ?ids=.
+BATCH = {
+    # Сколько id можно передать в одном запросе.
+    "MAX_IDS": int(os.getenv("BATCH_MAX_IDS", "100")),
+}
+
+# Журнал изменений для синхронизации клиентов (/api/changes/).
+CHANGES = {
+    # Сколько дней хранятся записи (очистка — команда purge_changes).
+    "RETENTION_DAYS": int(os.getenv("CHANGES_RETENTION_DAYS", "30")),
+    "DEFAULT_LIMIT": 100,
+    "MAX_LIMIT": 1000,
+}
+
+# Сжатие ответов (foodgram.middleware.CompressionMiddleware).
+COMPRESSION = {
+    "ENABLED": os.getenv("COMPRESSION", "True") == "True",
+    # Кодеки в порядке предпочтения; br и zstd — при установленных
+    # пакетах brotli и zstandard.
+    "ENCODINGS": ["br", "zstd", "gzip"],
+    "LEVELS": {"br": 5, "zstd": 3, "gzip": 6},
+    # Ответы меньше этого размера не сжимаются, байт.
+    "MIN_SIZE": int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+    "CONTENT_TYPES": [
+        "application/json",
+        "application/x-msgpack",
+        "application/javascript",
+        "text/",
+    ],
+    # Объём кэша сжатых тел ответов на GET в каждом воркере, байт.
+    "CACHE_BYTES": int(os.getenv("COMPRESSION_CACHE_BYTES", str(32 * 1024 * 1024))),
+}
+
+# Каталог для файлов общей памяти воркеров (mmap).
+SHARED_MEMORY_DIR = os.getenv(
+    "SHARED_MEMORY_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else "/tmp"
+)
+
+# Прогрев в мастере gunicorn перед запуском воркеров (foodgram.warmup).
+WARMUP = {
+    # Строить индексы рецептов в памяти до fork: воркеры начинают
+    # с готовыми индексами вместо сборки на первом запросе.
+    "INDEXES": os.getenv("WARMUP_INDEXES", "True")
+    == "True",
 }
 
 DJOSER = {
@@ -149,6 +365,17 @@ DJOSER = {
 
 AUTH_USER_MODEL = "recipes.User"
 
+# Детектор N+1 запросов: включать только на разработке и стенде.
+QUERY_INSPECTOR = {
+    "ENABLED": os.getenv("QUERY_INSPECTOR", "False") == "True",
+    # Сколько одинаковых запросов из одного места считать N+1.
+    "THRESHOLD": int(os.getenv("QUERY_INSPECTOR_THRESHOLD", "3")),
+    # True — падать с NPlusOneQueryError, False — писать в лог.
+    "RAISE": os.getenv("QUERY_INSPECTOR_RAISE", "False") == "True",
+    # Заголовки X-Query-Count и X-Duplicate-Queries в ответе.
+    "HEADER": True,
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
@@ -0,0 +1,182 @@
+"""
+Общая для всех воркеров узла память на основе mmap-файла.
+
+Используется там, где состояние должно быть видно всем процессам gunicorn
+без внешних сервисов: например, поколения для инвалидации кэшей
+в памяти процессов.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+class SharedFile:
+    """Файл фиксированного размера, отображённый в память (MAP_SHARED)."""
+
+    def __init__(self, name, size):
+        self.path = os.path.join(
+            settings.SHARED_MEMORY_DIR, f"foodgram-{name}.shm"
+        )
+        self.size = size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_lock = threading.Lock()
+        with self.lock():
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+        self.buffer = mmap.mmap(self._fd, size)
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    @contextmanager
+    def lock(self, offset=0, length=0):
+        """
+        Межпроцессная блокировка диапазона байт (по умолчанию всего файла).
+
+        POSIX-блокировки (lockf) принадлежат процессу, поэтому корректно
+        разделяют воркеры после fork, а потоки одного процесса
+        дополнительно разделяет обычный Lock.
+        """
+        with self._thread_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+
+    def _after_fork(self):
+        self._thread_lock = threading.Lock()
+
+
+class SharedCounters:
+    """
+    Массив 64-битных счётчиков в общей памяти.
+
+    Ключ отображается в ячейку через crc32 (hash() в Python различается
+    между процессами). Коллизии допустимы: для инвалидации они означают
+    лишь лишний промах кэша.
+    """
+
+    _format = struct.Struct("Q")
+
+    def __init__(self, name, slots=65536):
+        self.slots = slots
+        self._file = SharedFile(name, slots * self._format.size)
+
+    def _offset(self, key):
+        return (zlib.crc32(str(key).encode()) % self.slots) * self._format.size
+
+    def get(self, key):
+        offset = self._offset(key)
+        return self._format.unpack_from(self._file.buffer, offset)[0]
+
+    def incr(self, key):
+        offset = self._offset(key)
+        with self._file.lock(offset, self._format.size):
+            value = self._format.unpack_from(self._file.buffer, offset)[0] + 1
+            self._format.pack_into(self._file.buffer, offset, value)
+        return value
+
+    def set(self, key, value):
+        offset = self._offset(key)
+        with self._file.lock(offset, self._format.size):
+            self._format.pack_into(self._file.buffer, offset, value)
+
+
+class SharedJournal:
+    """
+    Кольцевой журнал 64-битных значений в общей памяти.
+
+    Писатели добавляют значения, каждый читатель хранит свою позицию
+    и забирает всё, что появилось после неё. Если читатель отстал
+    больше чем на capacity записей, часть журнала перезаписана —
+    read_since() сообщает об этом, и читатель должен пересобрать
+    своё состояние целиком.
+    """
+
+    _format = struct.Struct("Q")
+
+    def __init__(self, name, capacity=65536):
+        self.capacity = capacity
+        self._file = SharedFile(name, (capacity + 1) * self._format.size)
+
+    @property
+    def position(self):
+        return self._format.unpack_from(self._file.buffer, 0)[0]
+
+    def append(self, value):
+        with self._file.lock():
+            head = self.position
+            self._format.pack_into(self._file.buffer, self._slot(head), value)
+            self._format.pack_into(self._file.buffer, 0, head + 1)
+        return head + 1
+
+    def read_since(self, position):
+        """
+        Возвращает (новая позиция, значения) или (новая позиция, None),
+        если значения после position уже перезаписаны.
+        """
+        with self._file.lock():
+            head = self.position
+            if head < position or head - position > self.capacity:
+                return head, None
+            buffer = self._file.buffer
+            return head, [
+                self._format.unpack_from(buffer, self._slot(index))[0]
+                for index in range(position, head)
+            ]
+
+    def _slot(self, index):
+        return (index % self.capacity + 1) * self._format.size
+
+
+class SharedTokenBuckets:
+    """
+    Корзины токенов (token bucket) в общей памяти.
+
+    Ячейка хранит отпечаток ключа, число токенов и время последнего
+    обращения; блокируется только её диапазон байт. Ключ выбирает ячейку
+    через crc32, отпечаток (adler32) отличает разные ключи в одной ячейке:
+    при коллизии корзина начинается заново, то есть лимит ослабевает,
+    а не ужесточается для постороннего клиента.
+    """
+
+    _format = struct.Struct("Qdd")
+
+    def __init__(self, name, slots=65536):
+        self.slots = slots
+        self._file = SharedFile(name, slots * self._format.size)
+
+    def take(self, key, capacity, rate, now=None):
+        """
+        Забирает токен из корзины ёмкостью capacity, пополняемой на rate
+        токенов в секунду. Возвращает 0, если токен был, иначе — через
+        сколько секунд он появится.
+        """
+        data = str(key).encode()
+        offset = (zlib.crc32(data) % self.slots) * self._format.size
+        fingerprint = zlib.adler32(data) | 1 << 32
+        now = time.time() if now is None else now
+        with self._file.lock(offset, self._format.size):
+            stored, tokens, updated = self._format.unpack_from(
+                self._file.buffer, offset
+            )
+            if stored != fingerprint:
+                tokens = capacity
+            else:
+                tokens = min(capacity, tokens + max(now - updated, 0) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._format.pack_into(
+                self._file.buffer, offset, fingerprint, tokens, now
+            )
+        return wait
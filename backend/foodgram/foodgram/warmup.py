@@ -0,0 +1,70 @@
+"""
+Прогрев приложения в мастер-процессе gunicorn до запуска воркеров.
+
+При preload_app приложение загружается один раз в мастере, и воркеры
+получают его через fork уже готовым. Прогрев доделывает то, что Django
+и DRF иначе делают лениво на первых запросах каждого воркера: заполняет
+URL-резолверы, импортирует классы из настроек DRF и строит индексы
+рецептов в памяти (recipes.indexes). Индексы после fork догоняют журнал
+изменений, как обычно.
+
+Ошибка шага не мешает запуску: шаг пропускается, воркеры сделают то же
+самое при первом обращении. Перед fork соединения с БД закрываются,
+чтобы воркеры не унаследовали общий сокет.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+POOLED_ENGINE = "foodgram.db.backends.postgresql"
+
+
+def warm_urls():
+    for urlconf in {settings.ROOT_URLCONF, settings.ASGI_URLCONF}:
+        # reverse_dict заполняет резолвер и импортирует все представления.
+        get_resolver(urlconf).reverse_dict
+
+
+def warm_api_settings():
+    for name in api_settings.defaults:
+        getattr(api_settings, name)
+
+
+def warm_indexes():
+    from recipes.indexes import holders
+
+    for holder in holders:
+        holder.get()
+
+
+def close_connections():
+    connections.close_all()
+    engines = {db["ENGINE"] for db in settings.DATABASES.values()}
+    if POOLED_ENGINE in engines:
+        from foodgram.db.backends.postgresql.base import close_pools
+
+        close_pools()
+
+
+def warmup():
+    """Выполняет шаги прогрева; возвращает [(шаг, секунды)]."""
+    steps = [("urls", warm_urls), ("api_settings", warm_api_settings)]
+    if settings.WARMUP["INDEXES"]:
+        steps.append(("indexes", warm_indexes))
+    timings = []
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Прогрев: шаг %s не выполнен", name)
+        timings.append((name, time.perf_counter() - started))
+    close_connections()
+    return timings
@@ -0,0 +1,38 @@
+"""
+Конфигурация gunicorn.
+
+SERVER_MODE=asgi запускает uvicorn-воркеры с foodgram.asgi
+(асинхронный путь чтения), иначе — обычные sync-воркеры с foodgram.wsgi.
+
+Приложение загружается в мастере (preload_app) и прогревается
+foodgram.warmup до запуска воркеров; время от старта до готовности
+пишется в лог. GUNICORN_PRELOAD=False возвращает загрузку в каждом
+воркере (нужно, например, для --reload).
+"""
+
+import os
+import time
+
+BOOT_STARTED = time.monotonic()
+
+if os.getenv("SERVER_MODE", "wsgi") == "asgi":
+    wsgi_app = "foodgram.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "foodgram.wsgi:application"
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+timeout = 120
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+
+
+def when_ready(server):
+    if preload_app:
+        from foodgram.warmup import warmup
+
+        for name, seconds in warmup():
+            server.log.info("Прогрев %s: %.3f с", name, seconds)
+    server.log.info(
+        "Готов к запросам через %.2f с", time.monotonic() - BOOT_STARTED
+    )
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from api.cards import refresh_recipe_card
 from recipes.models import (
     Recipe,
     User,
@@ -58,6 +59,11 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     list_filter = ("author", "name", CookingTimeFilter)
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Автор мог смениться: карточка обновляется в транзакции админки.
+        refresh_recipe_card(obj)
+
     @admin.display(description="Автор")
     def get_author_name(self, recipe):
         return recipe.author.get_full_name() or recipe.author.username
@@ -0,0 +1,102 @@
+"""
+Общее для индексов рецептов в памяти воркера.
+
+Индексы строятся по RecipeIngredient. Изменения рецептов пишутся в общий
+для воркеров узла журнал (SharedJournal), и каждый воркер применяет их
+к своим индексам перед ответом.
+"""
+
+import threading
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+
+from foodgram.shared_memory import SharedJournal
+from recipes.models import Recipe, RecipeIngredient
+
+# Все индексы процесса: foodgram.warmup строит их до запуска воркеров.
+holders = []
+
+
+@lru_cache(maxsize=None)
+def recipe_journal():
+    return SharedJournal("recipe-journal")
+
+
+def recipe_changed(recipe_id):
+    """Отмечает рецепт как изменённый (создан, обновлён или удалён)."""
+    recipe_journal().append(recipe_id)
+
+
+def load_recipe_ids(recipe_ids=None):
+    """Возвращает {id рецепта: None} для существующих рецептов."""
+    rows = Recipe.objects.order_by("id")
+    if recipe_ids is not None:
+        rows = rows.filter(id__in=recipe_ids)
+    return dict.fromkeys(rows.values_list("id", flat=True).iterator())
+
+
+def load_recipe_ingredients(recipe_ids=None):
+    """Возвращает {id рецепта: множество id ингредиентов}."""
+    rows = RecipeIngredient.objects.order_by("recipe_id")
+    if recipe_ids is not None:
+        rows = rows.filter(recipe_id__in=recipe_ids)
+    rows = rows.values_list("recipe_id", "ingredient_id").iterator()
+    return {
+        recipe_id: {ingredient_id for _, ingredient_id in group}
+        for recipe_id, group in groupby(rows, key=itemgetter(0))
+    }
+
+
+class RecipeIndexHolder:
+    """
+    Индекс воркера, догоняющий журнал изменений рецептов.
+
+    load(recipe_ids=None) читает из БД {id рецепта: данные} (по умолчанию
+    наборы ингредиентов), build(рецепты) возвращает индекс с методами
+    add(recipe_id, данные) и remove(recipe_id) и атрибутом
+    journal_position. Если воркер отстал от журнала больше чем на его
+    ёмкость, индекс пересобирается из БД.
+    """
+
+    def __init__(self, build, load=load_recipe_ingredients):
+        self.build = build
+        self.load_recipes = load
+        self.index = None
+        self.lock = threading.RLock()
+        holders.append(self)
+
+    def get(self):
+        with self.lock:
+            if self.index is None:
+                self.index = self.load()
+            self.apply_journal()
+            return self.index
+
+    def load(self):
+        return self.rebuild()
+
+    def rebuild(self):
+        # Позицию журнала берём до чтения БД: изменения, сделанные во время
+        # сборки, применятся поверх готового индекса.
+        position = recipe_journal().position
+        index = self.build(self.load_recipes())
+        index.journal_position = position
+        return index
+
+    def apply_journal(self):
+        journal = recipe_journal()
+        position, changed = journal.read_since(self.index.journal_position)
+        if changed is None:
+            self.index = self.rebuild()
+            return
+        self.index.journal_position = position
+        if not changed:
+            return
+        changed = set(changed)
+        recipes = self.load_recipes(changed)
+        for recipe_id in changed:
+            if recipe_id in recipes:
+                self.index.add(recipe_id, recipes[recipe_id])
+            else:
+                self.index.remove(recipe_id)
@@ -5,27 +5,40 @@ from django.core.management.base import BaseCommand
 from recipes.models import Ingredient
 
 
+def fixture_path():
+    return os.path.join(
+        os.path.abspath(os.getcwd()), "data", "ingredients.json"
+    )
+
+
+def load_ingredients(path):
+    """Добавляет ингредиенты из файла; возвращает число записей в файле."""
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+
+    ingredients_to_create = [Ingredient(**item) for item in data]
+
+    Ingredient.objects.bulk_create(
+        ingredients_to_create, ignore_conflicts=True
+    )
+    return len(ingredients_to_create)
+
+
 class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         self.stdout.write(self.style.SUCCESS("Импортинг ингредиентов..."))
+        path = fixture_path()
         try:
-            base_dir = os.path.abspath(os.getcwd())
-            fixture_path = os.path.join(base_dir, "data", "ingredients.json")
-
-            with open(fixture_path, encoding="utf-8") as file:
-                data = json.load(file)
-
-            ingredients_to_create = [Ingredient(**item) for item in data]
-
-            Ingredient.objects.bulk_create(ingredients_to_create, ignore_conflicts=True)
+            count = load_ingredients(path)
 
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Импорт данных завершён! Добавлено {len(ingredients_to_create)} новых ингредиентов."
+                    "Импорт данных завершён! "
+                    f"Добавлено {count} новых ингредиентов."
                 )
             )
 
         except Exception as e:
             self.stdout.write(
-                self.style.ERROR(f"Ошибка при импорте {fixture_path}: {e}")
+                self.style.ERROR(f"Ошибка при импорте {path}: {e}")
             )
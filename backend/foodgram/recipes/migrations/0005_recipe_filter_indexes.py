@@ -0,0 +1,41 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:18
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы на больших таблицах строятся CONCURRENTLY, без блокировки
+    # записи; такие операции нельзя выполнять внутри транзакции.
+    atomic = False
+
+    dependencies = [
+        ("recipes", "0004_feed"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="recipe",
+            options={
+                "ordering": ("-cooking_time", "-id"),
+                "verbose_name": "Рецепт",
+                "verbose_name_plural": "Рецепты",
+            },
+        ),
+        AddIndexConcurrently(
+            model_name="recipe",
+            index=models.Index(fields=["author", "-id"], name="recipe_author_id_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="recipe",
+            index=models.Index(
+                fields=["cooking_time", "id"], name="recipe_cooking_time_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="recipeingredient",
+            index=models.Index(
+                fields=["ingredient", "recipe"], name="ingredient_recipe_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,164 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:22
+
+import datetime
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+# Время добавления старых записей неизвестно: относим их к началу эпохи,
+# чтобы они попали только в рейтинг за всё время.
+UNKNOWN_CREATED = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("recipes", "0005_recipe_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PopularRecipe",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "window",
+                    models.CharField(
+                        choices=[
+                            ("day", "За сутки"),
+                            ("week", "За неделю"),
+                            ("all", "За всё время"),
+                        ],
+                        max_length=8,
+                        verbose_name="Окно",
+                    ),
+                ),
+                ("position", models.PositiveIntegerField(verbose_name="Место")),
+                ("favorites", models.PositiveIntegerField(verbose_name="В избранном")),
+                (
+                    "shopping_carts",
+                    models.PositiveIntegerField(verbose_name="В списках покупок"),
+                ),
+                ("score", models.PositiveIntegerField(verbose_name="Очки")),
+            ],
+            options={
+                "verbose_name": "Популярный рецепт",
+                "verbose_name_plural": "Популярные рецепты",
+                "ordering": ("window", "position"),
+            },
+        ),
+        migrations.CreateModel(
+            name="RecipePopularity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField(verbose_name="Час")),
+                (
+                    "favorites",
+                    models.PositiveIntegerField(default=0, verbose_name="В избранном"),
+                ),
+                (
+                    "shopping_carts",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="В списках покупок"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Популярность за час",
+                "verbose_name_plural": "Популярность по часам",
+            },
+        ),
+        migrations.AddField(
+            model_name="favorite",
+            name="created",
+            field=models.DateTimeField(
+                default=UNKNOWN_CREATED, verbose_name="Добавлено"
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="favorite",
+            name="created",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="Добавлено"
+            ),
+        ),
+        migrations.AddField(
+            model_name="shoppingcart",
+            name="created",
+            field=models.DateTimeField(
+                default=UNKNOWN_CREATED, verbose_name="Добавлено"
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="shoppingcart",
+            name="created",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="Добавлено"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="favorite",
+            index=models.Index(fields=["created"], name="favorite_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="shoppingcart",
+            index=models.Index(fields=["created"], name="shoppingcart_created_idx"),
+        ),
+        migrations.AddField(
+            model_name="recipepopularity",
+            name="recipe",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="popularity",
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+        migrations.AddField(
+            model_name="popularrecipe",
+            name="recipe",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="rankings",
+                to="recipes.recipe",
+                verbose_name="Рецепт",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipepopularity",
+            index=models.Index(fields=["hour"], name="recipe_popularity_hour_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="recipepopularity",
+            constraint=models.UniqueConstraint(
+                fields=("recipe", "hour"), name="unique_recipe_popularity_hour"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="popularrecipe",
+            constraint=models.UniqueConstraint(
+                fields=("window", "position"), name="unique_popular_position"
+            ),
+        ),
+    ]
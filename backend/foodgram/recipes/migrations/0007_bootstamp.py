@@ -0,0 +1,38 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0006_popularity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BootStamp",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=64,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Шаг",
+                    ),
+                ),
+                (
+                    "checksum",
+                    models.CharField(max_length=64, verbose_name="Контрольная сумма"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Обновлено"),
+                ),
+            ],
+            options={
+                "verbose_name": "Отметка запуска",
+                "verbose_name_plural": "Отметки запуска",
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0007_bootstamp"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("recipe", "Рецепт"),
+                            ("favorite", "Избранное"),
+                            ("shopping_cart", "Список покупок"),
+                        ],
+                        max_length=16,
+                        verbose_name="Объект",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("created", "Создан"),
+                            ("updated", "Изменён"),
+                            ("deleted", "Удалён"),
+                        ],
+                        max_length=8,
+                        verbose_name="Действие",
+                    ),
+                ),
+                ("owner", models.BigIntegerField(verbose_name="Владелец")),
+                ("object_id", models.BigIntegerField(verbose_name="id объекта")),
+                (
+                    "created",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Время"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Изменение",
+                "verbose_name_plural": "Изменения",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(fields=["owner", "id"], name="change_owner_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(fields=["created"], name="change_created_idx"),
+        ),
+    ]
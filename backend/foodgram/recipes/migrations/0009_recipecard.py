@@ -0,0 +1,35 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0008_change"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeCard",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="card",
+                        serialize=False,
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                ("author", models.JSONField(verbose_name="Автор")),
+                ("ingredients", models.JSONField(verbose_name="Ингредиенты")),
+            ],
+            options={
+                "verbose_name": "Карточка рецепта",
+                "verbose_name_plural": "Карточки рецептов",
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.16 on 2026-10-19 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0009_recipecard"),
+    ]
+
+    operations = [
+        # Прежние записи уже зафиксированы: txid=0 ставит их перед новыми.
+        migrations.AddField(
+            model_name="change",
+            name="txid",
+            field=models.BigIntegerField(default=0, verbose_name="Транзакция"),
+            preserve_default=False,
+        ),
+        migrations.RemoveIndex(
+            model_name="change",
+            name="change_owner_id_idx",
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(
+                fields=["owner", "txid", "id"],
+                name="change_owner_txid_idx",
+            ),
+        ),
+    ]
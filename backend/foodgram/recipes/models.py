@@ -2,6 +2,7 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator, MinValueValidator
 from django.db import models
 from django.db.models import UniqueConstraint
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -53,6 +54,11 @@ class Subscription(models.Model):
         verbose_name="Автор",
         related_name="authors",
     )
+    fan_out = models.BooleanField(
+        "Доставлять рецепты в ленту при публикации",
+        default=True,
+        help_text="Для популярных авторов лента собирается при чтении.",
+    )
 
     class Meta:
         constraints = [
@@ -92,7 +98,17 @@ class Recipe(models.Model):
     )
 
     class Meta:
-        ordering = ("-cooking_time",)
+        ordering = ("-cooking_time", "-id")
+        indexes = [
+            # Рецепты популярных авторов в ленте подписок (keyset по id).
+            models.Index(
+                fields=["author", "-id"], name="recipe_author_id_idx"
+            ),
+            # Список рецептов в порядке по умолчанию и фильтр по времени.
+            models.Index(
+                fields=["cooking_time", "id"], name="recipe_cooking_time_idx"
+            ),
+        ]
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
 
@@ -120,6 +136,13 @@ class RecipeIngredient(models.Model):
                 fields=["recipe", "ingredient"], name="unique_recipe_ingredient"
             )
         ]
+        indexes = [
+            # Фильтры по ингредиентам: рецепты с ингредиентом без чтения
+            # таблицы.
+            models.Index(
+                fields=["ingredient", "recipe"], name="ingredient_recipe_idx"
+            ),
+        ]
 
 
 class Ingredient(models.Model):
@@ -144,6 +167,7 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         related_name="in_shopping_carts",
     )
+    created = models.DateTimeField("Добавлено", default=timezone.now)
 
     class Meta:
         constraints = [
@@ -151,6 +175,10 @@ class ShoppingCart(models.Model):
                 fields=["user", "recipe"], name="unique_user_recipe_in_shopping_cart"
             )
         ]
+        indexes = [
+            # Почасовая свёртка популярности читает только новые записи.
+            models.Index(fields=["created"], name="shoppingcart_created_idx"),
+        ]
         verbose_name = "Список покупок"
         verbose_name_plural = "Списки покупок"
 
@@ -163,6 +191,7 @@ class Favorite(models.Model):
     recipe = models.ForeignKey(
         Recipe, on_delete=models.CASCADE, related_name="in_favorites"
     )
+    created = models.DateTimeField("Добавлено", default=timezone.now)
 
     class Meta:
         constraints = [
@@ -170,7 +199,212 @@ class Favorite(models.Model):
                 fields=["user", "recipe"], name="unique_user_recipe_favorite"
             )
         ]
+        indexes = [
+            models.Index(fields=["created"], name="favorite_created_idx"),
+        ]
         ordering = ["user"]
 
     def __str__(self):
         return f"Избранное: {self.user} – {self.recipe}"
+
+
+class FeedEntry(models.Model):
+    """
+    Запись ленты подписок: рецепт автора, на которого подписан пользователь.
+
+    Создаётся при публикации рецепта (fan-out on write) для всех подписчиков
+    автора, кроме подписчиков популярных авторов (Subscription.fan_out=False).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Пользователь",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="unique_user_recipe_feed"
+            )
+        ]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Лента подписок"
+
+    def __str__(self):
+        return f"{self.user} ← {self.recipe}"
+
+
+class RecipePopularity(models.Model):
+    """
+    Почасовой срез популярности рецепта: сколько раз за час его добавили
+    в избранное и в список покупок. Заполняется командой rollup_popularity.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="popularity",
+        verbose_name="Рецепт",
+    )
+    hour = models.DateTimeField("Час")
+    favorites = models.PositiveIntegerField("В избранном", default=0)
+    shopping_carts = models.PositiveIntegerField(
+        "В списках покупок", default=0
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "hour"], name="unique_recipe_popularity_hour"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["hour"], name="recipe_popularity_hour_idx"),
+        ]
+        verbose_name = "Популярность за час"
+        verbose_name_plural = "Популярность по часам"
+
+    def __str__(self):
+        return f"{self.recipe} @ {self.hour:%Y-%m-%d %H:00}"
+
+
+class PopularRecipe(models.Model):
+    """Готовый рейтинг рецептов за окно времени (день, неделя, всё время)."""
+
+    WINDOW_DAY = "day"
+    WINDOW_WEEK = "week"
+    WINDOW_ALL = "all"
+    WINDOWS = (
+        (WINDOW_DAY, "За сутки"),
+        (WINDOW_WEEK, "За неделю"),
+        (WINDOW_ALL, "За всё время"),
+    )
+
+    window = models.CharField("Окно", max_length=8, choices=WINDOWS)
+    position = models.PositiveIntegerField("Место")
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="rankings",
+        verbose_name="Рецепт",
+    )
+    favorites = models.PositiveIntegerField("В избранном")
+    shopping_carts = models.PositiveIntegerField("В списках покупок")
+    score = models.PositiveIntegerField("Очки")
+
+    class Meta:
+        ordering = ("window", "position")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["window", "position"], name="unique_popular_position"
+            )
+        ]
+        verbose_name = "Популярный рецепт"
+        verbose_name_plural = "Популярные рецепты"
+
+    def __str__(self):
+        return f"{self.window} #{self.position}: {self.recipe}"
+
+
+class BootStamp(models.Model):
+    """Контрольная сумма входных данных шага запуска (команда boot)."""
+
+    name = models.CharField("Шаг", max_length=64, primary_key=True)
+    checksum = models.CharField("Контрольная сумма", max_length=64)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Отметка запуска"
+        verbose_name_plural = "Отметки запуска"
+
+    def __str__(self):
+        return f"{self.name}: {self.checksum[:12]}"
+
+
+class Change(models.Model):
+    """
+    Запись журнала изменений для синхронизации клиентов (/api/changes/).
+
+    Журнал только дополняется и очищается по сроку хранения. owner и
+    object_id — не внешние ключи: запись должна пережить удаление рецепта
+    или пользователя.
+    """
+
+    RECIPE = "recipe"
+    FAVORITE = "favorite"
+    SHOPPING_CART = "shopping_cart"
+    KINDS = (
+        (RECIPE, "Рецепт"),
+        (FAVORITE, "Избранное"),
+        (SHOPPING_CART, "Список покупок"),
+    )
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    ACTIONS = (
+        (CREATED, "Создан"),
+        (UPDATED, "Изменён"),
+        (DELETED, "Удалён"),
+    )
+
+    kind = models.CharField("Объект", max_length=16, choices=KINDS)
+    action = models.CharField("Действие", max_length=8, choices=ACTIONS)
+    # Автор рецепта или пользователь, добавивший рецепт в избранное/корзину.
+    owner = models.BigIntegerField("Владелец")
+    # id рецепта.
+    object_id = models.BigIntegerField("id объекта")
+    # Транзакция, записавшая строку (txid_current()): журнал читается
+    # в порядке (txid, id) и только до самой старой незавершённой транзакции.
+    txid = models.BigIntegerField("Транзакция")
+    created = models.DateTimeField("Время", default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Изменения пользователя и новые рецепты авторов после курсора.
+            models.Index(
+                fields=["owner", "txid", "id"],
+                name="change_owner_txid_idx",
+            ),
+            # Очистка по сроку хранения.
+            models.Index(fields=["created"], name="change_created_idx"),
+        ]
+        verbose_name = "Изменение"
+        verbose_name_plural = "Изменения"
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} {self.action}"
+
+
+class RecipeCard(models.Model):
+    """
+    Готовые для ответа API данные рецепта из соседних таблиц: профиль
+    автора и ингредиенты. Обновляются при записи (api.cards).
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="card",
+        verbose_name="Рецепт",
+    )
+    # Поля UserProfileSerializer, кроме is_subscribed.
+    author = models.JSONField("Автор")
+    # [{id, name, measurement_unit, amount}] в порядке добавления.
+    ingredients = models.JSONField("Ингредиенты")
+
+    class Meta:
+        verbose_name = "Карточка рецепта"
+        verbose_name_plural = "Карточки рецептов"
+
+    def __str__(self):
+        return f"Карточка {self.recipe_id}"
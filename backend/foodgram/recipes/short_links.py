@@ -0,0 +1,116 @@
+"""
+Короткие ссылки на рецепты без запросов к БД.
+
+Код — обратимое преобразование id: умножение на нечётное число по модулю
+2^32 (перестановка) и XOR с ключом, затем запись буквой и пятью знаками
+base62. Коды соседних рецептов не идут подряд, а декодирование не требует
+таблицы соответствий. Ключи выводятся из SHORT_LINK["SALT"] — при его
+смене старые коды перестают работать.
+
+Существование рецепта проверяется по битовому множеству живых id в памяти
+воркера, которое обновляется из журнала изменений рецептов. В БД идём
+только за id чуть больше известного максимума: их могли создать на
+другом узле.
+"""
+
+import hashlib
+import string
+from functools import lru_cache
+
+from django.conf import settings
+
+from foodgram.bitmaps import Bitmap
+from recipes.indexes import RecipeIndexHolder, load_recipe_ids
+from recipes.models import Recipe
+
+LETTERS = string.ascii_letters
+ALPHABET = string.digits + string.ascii_letters
+CODE_LENGTH = 6
+MODULUS = 1 << 32
+_LETTER_VALUES = {char: value for value, char in enumerate(LETTERS)}
+_ALPHABET_VALUES = {char: value for value, char in enumerate(ALPHABET)}
+
+
+@lru_cache(maxsize=None)
+def _keys():
+    digest = hashlib.blake2b(
+        settings.SHORT_LINK["SALT"].encode(), digest_size=8
+    ).digest()
+    multiplier = int.from_bytes(digest[:4], "little") | 1
+    mask = int.from_bytes(digest[4:], "little")
+    return multiplier, pow(multiplier, -1, MODULUS), mask
+
+
+def encode(recipe_id):
+    """id рецепта → код из 6 символов, первый всегда буква."""
+    multiplier, _, mask = _keys()
+    value = recipe_id * multiplier % MODULUS ^ mask
+    value, first = divmod(value, len(LETTERS))
+    chars = [LETTERS[first]]
+    for _ in range(CODE_LENGTH - 1):
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(chars)
+
+
+def decode(code):
+    """Код → id рецепта или None, если код некорректен."""
+    if len(code) != CODE_LENGTH or code[0] not in _LETTER_VALUES:
+        return None
+    value = 0
+    for char in reversed(code[1:]):
+        if char not in _ALPHABET_VALUES:
+            return None
+        value = value * len(ALPHABET) + _ALPHABET_VALUES[char]
+    value = value * len(LETTERS) + _LETTER_VALUES[code[0]]
+    if value >= MODULUS:
+        return None
+    _, inverse, mask = _keys()
+    recipe_id = (value ^ mask) * inverse % MODULUS
+    return recipe_id or None
+
+
+class LiveRecipes:
+    """Битовое множество id существующих рецептов."""
+
+    def __init__(self):
+        self.ids = Bitmap()
+        self.max_id = 0
+        self.journal_position = 0
+
+    @classmethod
+    def build(cls, recipes):
+        live = cls()
+        for recipe_id in recipes:
+            live.add(recipe_id)
+        return live
+
+    def add(self, recipe_id, data=None):
+        self.ids.add(recipe_id)
+        self.max_id = max(self.max_id, recipe_id)
+
+    def remove(self, recipe_id):
+        self.ids.discard(recipe_id)
+
+
+_holder = RecipeIndexHolder(LiveRecipes.build, load=load_recipe_ids)
+
+
+def recipe_exists(recipe_id):
+    """
+    Есть ли рецепт с таким id. Известные id и id не больше максимума
+    проверяются только по памяти; id в пределах SHORT_LINK["ID_SLACK"]
+    над максимумом — в БД (рецепт мог появиться, а журнал ещё не дошёл).
+    """
+    slack = settings.SHORT_LINK["ID_SLACK"]
+    with _holder.lock:
+        live = _holder.get()
+        if recipe_id in live.ids:
+            return True
+        if not live.max_id < recipe_id <= live.max_id + slack:
+            return False
+    exists = Recipe.objects.filter(pk=recipe_id).exists()
+    if exists:
+        with _holder.lock:
+            live.add(recipe_id)
+    return exists
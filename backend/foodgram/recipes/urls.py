@@ -1,9 +1,10 @@
 from django.urls import path
 
-from recipes.views import get_short_link
+from recipes.views import get_short_link, resolve_short_code
 
 app_name = "recipes"
 
 urlpatterns = [
     path("s/<int:recipe_id>/", get_short_link, name="short_link"),
+    path("s/<str:code>/", resolve_short_code, name="short_code"),
 ]
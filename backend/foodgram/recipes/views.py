@@ -1,11 +1,29 @@
-from django.shortcuts import redirect, get_object_or_404
+from django.conf import settings
+from django.http import Http404, HttpResponsePermanentRedirect
+from django.utils.cache import patch_cache_control
 
-from recipes.models import Recipe
+from recipes.short_links import decode, recipe_exists
+
+
+def _redirect_to_recipe(recipe_id):
+    if recipe_id is None or not recipe_exists(recipe_id):
+        raise Http404("Рецепт не найден.")
+    response = HttpResponsePermanentRedirect(f"/recipes/{recipe_id}/")
+    patch_cache_control(
+        response, public=True, max_age=settings.SHORT_LINK["MAX_AGE"]
+    )
+    return response
 
 
 def get_short_link(request, recipe_id):
     """
     Обрабатывает короткую ссылку и перенаправляет на локальный URL рецепта.
     """
-    get_object_or_404(Recipe, id=recipe_id)
-    return redirect(f"/recipes/{recipe_id}/")
+    return _redirect_to_recipe(recipe_id)
+
+
+def resolve_short_code(request, code):
+    """
+    Перенаправляет по короткому коду (/s/<код>/) без запросов к БД.
+    """
+    return _redirect_to_recipe(decode(code))